@@ -1 +1,3 @@
-print("Initializing the app package")
+import logging
+
+logging.getLogger(__name__).debug("Initializing the app package")
@@ -0,0 +1,4 @@
+from .config import load_environment
+
+# Before any submodule reads its settings from the environment.
+load_environment()
@@ -0,0 +1,61 @@
+import abc
+import asyncio
+
+
+class MicroBatcher(abc.ABC):
+    """
+    Collects requests made within `window` seconds of each other, from any
+    session, and answers them with one `resolve_many` call. Identical keys in
+    the same batch share one entry. Subclasses implement `resolve_many`,
+    which takes a list of keys and returns one result per key, in order.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pending = {}
+        self._flush_handle = None
+        # Running batches; the loop keeps only weak references to tasks.
+        self._tasks = set()
+        self.batches = 0
+        self.requests = 0
+
+    @abc.abstractmethod
+    async def resolve_many(self, keys: list) -> list:
+        """
+        Resolves a batch of keys, returning one result per key, in order.
+        """
+
+    async def submit(self, key):
+        self.requests += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        task = asyncio.ensure_future(self._resolve(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: dict) -> None:
+        keys = list(pending)
+        try:
+            results = await self.resolve_many(keys)
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, result in zip(keys, results):
+            if not pending[key].done():
+                pending[key].set_result(result)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "batches": self.batches}
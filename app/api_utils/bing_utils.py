@@ -1,14 +1,21 @@
-from dotenv import load_dotenv
-import os
-import requests
+import logging
 
-load_dotenv()
+from .cache import cached, ERROR, HIT, MISS
+from .clients import get_async_http, get_http
+from .config import get_settings
 
-api_key = os.getenv("BING_API_KEY")
+logger = logging.getLogger(__name__)
 
-def search_bing_news(api_key: str, query: str, count: int = 10) -> dict:
-   
-    endpoint = "https://api.bing.microsoft.com/v7.0/news/search"
+api_key = get_settings().bing_api_key
+
+BING_NEWS_ENDPOINT = get_settings().bing_news_endpoint
+
+def bing_outcome(result: dict) -> str:
+    if "error" in result:
+        return ERROR
+    return HIT if result.get("value") else MISS
+
+def build_news_request(api_key: str, query: str, count: int) -> tuple:
     headers = {"Ocp-Apim-Subscription-Key": api_key}
     params = {
         "q": query,
@@ -16,11 +23,39 @@ def search_bing_news(api_key: str, query: str, count: int = 10) -> dict:
         "mkt": "en-US",    
         "safeSearch": "Moderate"
     }
+    return headers, params
+
+@cached("bing_news", key=lambda api_key, query, count=10: (query, count), classify=bing_outcome)
+def search_bing_news(api_key: str, query: str, count: int = 10) -> dict:
+   
+    headers, params = build_news_request(api_key, query, count)
 
     try:
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = get_http().get(BING_NEWS_ENDPOINT, headers=headers, params=params)
         response.raise_for_status()
         return response.json()
     except Exception as e:
-        print(f"Error during Bing News Search API call: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        logger.warning("Error during Bing News Search API call: %s", e)
+        return {"error": str(e)}
+
+async def fetch_bing_news_async(api_key: str, query: str, count: int = 10) -> dict:
+    """
+    Uncached Bing News query on the shared pooled HTTP client. Errors are
+    returned as {"error": message} rather than raised.
+    """
+    headers, params = build_news_request(api_key, query, count)
+
+    try:
+        response = await get_async_http().get(BING_NEWS_ENDPOINT, headers=headers, params=params)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.warning("Error during Bing News Search API call: %s", e)
+        return {"error": str(e)}
+
+@cached("bing_news", key=lambda api_key, query, count=10: (query, count), classify=bing_outcome)
+async def search_bing_news_async(api_key: str, query: str, count: int = 10) -> dict:
+    """
+    Async variant of search_bing_news that uses the shared pooled HTTP client.
+    """
+    return await fetch_bing_news_async(api_key, query, count)
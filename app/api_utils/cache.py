@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
+
+from .semantic_cache import get_semantic_cache
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# How long a successful lookup stays fresh, per source.
+DEFAULT_TTL = 1 * DAY
+DEFAULT_TTLS = {
+    "person": 14 * DAY,
+    "term": 14 * DAY,
+    "company": 7 * DAY,
+    "wikipedia": 7 * DAY,
+    "bing_news": 10 * MINUTE
+}
+
+# How long a confirmed miss (no article, no news) is remembered, per source.
+NEGATIVE_TTLS = {
+    "wikipedia": 1 * DAY,
+    "bing_news": 5 * MINUTE
+}
+DEFAULT_NEGATIVE_TTL = 1 * HOUR
+
+HIT = "hit"
+MISS = "miss"
+ERROR = "error"
+
+
+def normalize_key(value) -> str:
+    """
+    Case- and whitespace-insensitive form of a lookup key, so
+    "  Amazon " and "amazon" share one cache entry.
+    """
+    if isinstance(value, (tuple, list)):
+        return "|".join(normalize_key(part) for part in value)
+    return " ".join(str(value).split()).casefold()
+
+
+class EnrichmentCache:
+    """
+    Two-tier cache for upstream enrichment lookups.
+
+    The front tier is an in-process LRU of at most `max_entries` items. The
+    back tier is a SQLite table that survives restarts. Entries expire after
+    a per-source TTL. Misses are cached with a shorter negative TTL, and
+    errors are never cached. Concurrent async requests for the same key share
+    one upstream call.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 4096, ttls: dict = None, negative_ttls: dict = None):
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.negative_ttls = {**NEGATIVE_TTLS, **(negative_ttls or {})}
+        self.counters = Counter()
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM enrichment_cache WHERE expires_at < ?", (time.time(),))
+
+    def get(self, source: str, key) -> tuple:
+        """
+        Returns (found, value) and records a hit or miss for `source`.
+        """
+        cache_key = f"{source}:{normalize_key(key)}"
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None and entry[0] < now:
+                del self._memory[cache_key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM enrichment_cache WHERE key = ? AND expires_at >= ?",
+                    (cache_key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], json.loads(row[0]))
+                    self._remember(cache_key, entry)
+                    self.counters[(source, "disk_hits")] += 1
+            if entry is None:
+                self.counters[(source, "misses")] += 1
+                return False, None
+            self._memory.move_to_end(cache_key)
+            self.counters[(source, "hits")] += 1
+            return True, entry[1]
+
+    def put(self, source: str, key, value, outcome: str = HIT) -> None:
+        if outcome == ERROR:
+            self.counters[(source, "errors")] += 1
+            return
+        if outcome == MISS:
+            ttl = self.negative_ttls.get(source, DEFAULT_NEGATIVE_TTL)
+            self.counters[(source, "negative_stores")] += 1
+        else:
+            ttl = self.ttls.get(source, DEFAULT_TTL)
+        cache_key = f"{source}:{normalize_key(key)}"
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._remember(cache_key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO enrichment_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (cache_key, json.dumps(value), entry[0])
+                )
+
+    def _remember(self, cache_key: str, entry: tuple) -> None:
+        self._memory[cache_key] = entry
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_or_fetch(self, source: str, key, fetch: Callable, classify: Optional[Callable] = None):
+        """
+        Returns the cached value for `key`, or awaits `fetch()` and caches it.
+        While a fetch is in flight, identical requests wait on the same task
+        instead of calling upstream again. The shared task is shielded, so a
+        caller that times out does not cancel it for the others.
+        """
+        found, value = self.get(source, key)
+        if found:
+            return value
+
+        flight_key = (source, normalize_key(key))
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[flight_key] = task
+            task.add_done_callback(functools.partial(self._settle, source, key, flight_key, classify))
+        else:
+            self.counters[(source, "coalesced")] += 1
+        return await asyncio.shield(task)
+
+    def _settle(self, source: str, key, flight_key: tuple, classify: Optional[Callable], task: asyncio.Future) -> None:
+        self._inflight.pop(flight_key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.counters[(source, "errors")] += 1
+            return
+        value = task.result()
+        self.put(source, key, value, classify(value) if classify else HIT)
+
+    def get_or_call(self, source: str, key, fetch: Callable, classify: Optional[Callable] = None):
+        """
+        Synchronous counterpart of get_or_fetch for the blocking helpers.
+        """
+        found, value = self.get(source, key)
+        if found:
+            return value
+        value = fetch()
+        self.put(source, key, value, classify(value) if classify else HIT)
+        return value
+
+    def stats(self) -> dict:
+        """
+        Returns the counters grouped by source, e.g.
+        {"wikipedia": {"hits": 10, "misses": 2}}.
+        """
+        grouped = {}
+        for (source, event), count in self.counters.items():
+            grouped.setdefault(source, {})[event] = count
+        return grouped
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_cache = None
+
+
+def get_cache() -> EnrichmentCache:
+    """
+    Returns the process-wide cache, opened on first use at
+    ENRICHMENT_CACHE_PATH. An empty path keeps it memory-only.
+    """
+    global _cache
+    if _cache is None:
+        _cache = EnrichmentCache(
+            path=os.getenv("ENRICHMENT_CACHE_PATH", "enrichment_cache.sqlite3"),
+            max_entries=int(os.getenv("ENRICHMENT_CACHE_SIZE", "4096"))
+        )
+    return _cache
+
+
+def cached(source: str, key: Optional[Callable] = None, classify: Optional[Callable] = None, semantic: bool = False):
+    """
+    Decorator that routes a lookup function through the shared cache.
+    Args:
+        source (str): Cache namespace, also used to pick the TTL.
+        key (Callable): Builds the cache key from the call's arguments.
+            Defaults to the first positional argument.
+        classify (Callable): Maps a result to HIT, MISS or ERROR.
+            Defaults to treating every result as a hit.
+        semantic (bool): On an exact-key miss, answer from the source's
+            semantic cache if a near-duplicate key ("Quantum Computer" for
+            "quantum computing") was looked up before, and remember hits there.
+    """
+    def make_key(args, kwargs):
+        return key(*args, **kwargs) if key else args[0]
+
+    def is_hit(value) -> bool:
+        return (classify(value) if classify else HIT) == HIT
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            async def fetch(cache_key, args, kwargs):
+                if semantic:
+                    found, value, _ = get_semantic_cache(source).get(cache_key)
+                    if found:
+                        return value
+                value = await func(*args, **kwargs)
+                if semantic and is_hit(value):
+                    get_semantic_cache(source).put(cache_key, value)
+                return value
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                return await get_cache().get_or_fetch(
+                    source, cache_key, lambda: fetch(cache_key, args, kwargs), classify
+                )
+            return async_wrapper
+
+        def call(cache_key, args, kwargs):
+            if semantic:
+                found, value, _ = get_semantic_cache(source).get(cache_key)
+                if found:
+                    return value
+            value = func(*args, **kwargs)
+            if semantic and is_hit(value):
+                get_semantic_cache(source).put(cache_key, value)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            return get_cache().get_or_call(
+                source, cache_key, lambda: call(cache_key, args, kwargs), classify
+            )
+        return wrapper
+
+    return decorator
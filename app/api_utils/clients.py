@@ -0,0 +1,77 @@
+from .config import get_settings
+from .http_client import ResilientAsyncClient, ResilientClient
+
+_openai = None
+_async_openai = None
+_http = None
+_async_http = None
+
+
+def get_openai():
+    """
+    Returns the process-wide blocking OpenAI client, creating it on first use.
+    The openai package takes most of a second to import, so it is only
+    imported once a client is actually needed.
+    """
+    global _openai
+    if _openai is None:
+        from openai import OpenAI
+        settings = get_settings()
+        _openai = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
+    return _openai
+
+
+def get_async_openai():
+    """
+    Returns the process-wide AsyncOpenAI client, creating it on first use.
+    """
+    global _async_openai
+    if _async_openai is None:
+        from openai import AsyncOpenAI
+        settings = get_settings()
+        _async_openai = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
+    return _async_openai
+
+
+def get_async_http() -> ResilientAsyncClient:
+    """
+    Returns the process-wide pooled HTTP client used for Wikipedia and Bing,
+    so lookups reuse keep-alive connections instead of a new TLS handshake each,
+    and a failing upstream is retried or short-circuited instead of stalling.
+    """
+    global _async_http
+    if _async_http is None:
+        _async_http = ResilientAsyncClient()
+    return _async_http
+
+
+def get_http() -> ResilientClient:
+    """
+    Blocking counterpart of get_async_http for the synchronous helpers.
+    """
+    global _http
+    if _http is None:
+        _http = ResilientClient()
+    return _http
+
+
+def http_stats() -> dict:
+    stats = {}
+    for client in (_http, _async_http):
+        if client is not None:
+            for host, counters in client.stats().items():
+                stats.setdefault(host, {}).update(counters)
+    return stats
+
+
+async def close_async_clients() -> None:
+    global _async_openai, _async_http, _http
+    if _async_http is not None:
+        await _async_http.aclose()
+        _async_http = None
+    if _http is not None:
+        _http.close()
+        _http = None
+    if _async_openai is not None:
+        await _async_openai.close()
+        _async_openai = None
@@ -0,0 +1,50 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+_environment_loaded = False
+_settings = None
+
+
+def load_environment() -> None:
+    """
+    Reads the .env file into os.environ, once per process. Runs when the
+    api_utils package is imported, before any module reads its settings.
+    """
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    _environment_loaded = True
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Credentials and endpoints of the upstream services, shared by every
+    client. Per-module tuning knobs stay next to the code they tune.
+    """
+    openai_api_key: Optional[str]
+    openai_base_url: Optional[str]
+    bing_api_key: Optional[str]
+    bing_news_endpoint: str
+    wikipedia_base_url: str
+
+    @classmethod
+    def from_environment(cls) -> "Settings":
+        return cls(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            openai_base_url=os.getenv("OPENAI_BASE_URL"),
+            bing_api_key=os.getenv("BING_API_KEY"),
+            bing_news_endpoint=os.getenv("BING_NEWS_ENDPOINT", "https://api.bing.microsoft.com/v7.0/news/search"),
+            wikipedia_base_url=os.getenv("WIKIPEDIA_BASE_URL", "https://{language}.wikipedia.org")
+        )
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        load_environment()
+        _settings = Settings.from_environment()
+    return _settings
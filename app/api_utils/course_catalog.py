@@ -0,0 +1,266 @@
+import bisect
+import csv
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import Counter
+from collections.abc import Sequence
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "All_Courses.csv")
+INDEX_FORMAT_VERSION = 2
+
+
+def normalize_course_code(code: str) -> str:
+    """
+    Canonical form used by the index: upper case with all whitespace removed,
+    so "CMPSC 130A", "cmpsc130a" and "CMPSC130A" are the same key.
+    """
+    return "".join(code.split()).upper()
+
+
+def save_npy(path: str, array: np.ndarray) -> None:
+    """
+    Writes `array` to the .npy file `path` through a temporary file in the
+    same directory. Replacing the file instead of rewriting it in place
+    leaves processes that have the old one memory-mapped a complete copy.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance between a and b, or limit + 1 once it is certain
+    the distance exceeds limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class MappedStrings(Sequence):
+    """
+    Read-only list of strings kept as one UTF-8 buffer plus offsets. Loaded
+    with `load`, both arrays are memory-mapped, so serving processes share
+    the catalog text through the page cache instead of each holding a copy
+    as Python strings.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    @classmethod
+    def pack(cls, strings) -> "MappedStrings":
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def load(cls, path: str) -> "MappedStrings":
+        return cls(np.load(f"{path}.data.npy", mmap_mode="r"), np.load(f"{path}.offsets.npy", mmap_mode="r"))
+
+    def save(self, path: str) -> None:
+        save_npy(f"{path}.data.npy", self._data)
+        save_npy(f"{path}.offsets.npy", self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes().decode("utf-8")
+
+
+class CourseCatalog:
+    """
+    In-memory index over All_Courses.csv.
+
+    Exact lookups go through a dict keyed by both the raw and the normalized
+    code. Near-misses go through a trigram index plus a bounded edit distance.
+    Prefix queries bisect a sorted code list. The parsed catalog is pickled
+    next to the CSV and reused while the CSV is unchanged; course names and
+    descriptions, the bulk of it, are saved beside the pickle as
+    MappedStrings and memory-mapped on load.
+    """
+
+    def __init__(self, csv_path: str = CATALOG_CSV_PATH, index_path: Optional[str] = None):
+        self.csv_path = csv_path
+        self.index_path = index_path or f"{os.path.splitext(csv_path)[0]}.catalog.pickle"
+        self.codes = []
+        self.names = []
+        self.descriptions = []
+        self._by_code = {}
+        self._sorted_codes = []
+        self._trigram_index = {}
+        self._load()
+
+    def _source_signature(self) -> tuple:
+        stat = os.stat(self.csv_path)
+        return INDEX_FORMAT_VERSION, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        signature = self._source_signature()
+        try:
+            with open(self.index_path, "rb") as f:
+                stored_signature, state = pickle.load(f)
+            if stored_signature == signature:
+                names = MappedStrings.load(f"{self.index_path}.names")
+                descriptions = MappedStrings.load(f"{self.index_path}.descriptions")
+                self.__dict__.update(state, names=names, descriptions=descriptions)
+                return
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass
+
+        self._build()
+        state = {
+            "codes": self.codes,
+            "_by_code": self._by_code,
+            "_sorted_codes": self._sorted_codes,
+            "_trigram_index": self._trigram_index
+        }
+        try:
+            # The pickle is written last, so a present pickle means the
+            # string tables next to it are complete.
+            MappedStrings.pack(self.names).save(f"{self.index_path}.names")
+            MappedStrings.pack(self.descriptions).save(f"{self.index_path}.descriptions")
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((signature, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning("Could not write course index cache %s: %s", self.index_path, e)
+
+    def _build(self) -> None:
+        with open(self.csv_path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                code = row["Code"].strip()
+                normalized = normalize_course_code(code)
+                if normalized in self._by_code:
+                    continue
+                index = len(self.codes)
+                self.codes.append(code)
+                self.names.append(row["Name"])
+                self.descriptions.append(row["Description"])
+                self._by_code[normalized] = index
+                self._by_code.setdefault(code, index)
+
+        normalized_codes = [normalize_course_code(code) for code in self.codes]
+        self._sorted_codes = sorted(zip(normalized_codes, range(len(normalized_codes))))
+        trigram_index = {}
+        for index, normalized in enumerate(normalized_codes):
+            for gram in _trigrams(normalized):
+                trigram_index.setdefault(gram, []).append(index)
+        self._trigram_index = {gram: tuple(ids) for gram, ids in trigram_index.items()}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def find(self, code: str) -> Optional[int]:
+        """
+        Returns the row index for an exact (normalization-insensitive) code.
+        Codes already in catalog form hit the dict without building a new string.
+        """
+        index = self._by_code.get(code)
+        if index is None:
+            index = self._by_code.get(normalize_course_code(code))
+        return index
+
+    def find_fuzzy(self, code: str, max_distance: int = 2, min_shared_trigrams: int = 2) -> Optional[int]:
+        """
+        Returns the closest catalog code within max_distance edits, preferring
+        candidates that share more trigrams. Used for codes Whisper misheard,
+        e.g. "CMPSC13A" for "CMPSC130A".
+        """
+        normalized = normalize_course_code(code)
+        shared = Counter()
+        for gram in _trigrams(normalized):
+            shared.update(self._trigram_index.get(gram, ()))
+
+        best = None
+        for index, overlap in shared.most_common(50):
+            if overlap < min_shared_trigrams:
+                break
+            distance = edit_distance(normalized, normalize_course_code(self.codes[index]), max_distance)
+            if distance <= max_distance and (best is None or (distance, -overlap) < best[0]):
+                best = ((distance, -overlap), index)
+        return best[1] if best else None
+
+    def with_prefix(self, prefix: str, limit: int = 10) -> list:
+        """
+        Returns up to `limit` row indexes whose normalized code starts with prefix.
+        """
+        prefix = normalize_course_code(prefix)
+        start = bisect.bisect_left(self._sorted_codes, (prefix, -1))
+        matches = []
+        for normalized, index in self._sorted_codes[start:start + limit]:
+            if not normalized.startswith(prefix):
+                break
+            matches.append(index)
+        return matches
+
+    def lookup(self, code: str, fuzzy: bool = True) -> Optional[tuple]:
+        """
+        Returns (code, name, description) for a course code, falling back to
+        the fuzzy index when there is no exact match.
+        """
+        index = self.find(code)
+        if index is None and fuzzy:
+            index = self.find_fuzzy(code)
+        if index is None:
+            return None
+        return self.codes[index], self.names[index], self.descriptions[index]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CourseCatalog:
+    """
+    Returns the process-wide catalog, loading it on first use.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CourseCatalog()
+    return _catalog
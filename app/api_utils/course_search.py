@@ -0,0 +1,313 @@
+"""
+Free-text search over the course catalog's names and descriptions.
+
+    python -m app.api_utils.course_search build
+    python -m app.api_utils.course_search query "intro data structures"
+
+The index is a BM25 inverted index in CSR form plus an optional matrix of
+character n-gram vectors of the course names, all stored as .npy files in a
+directory next to the CSV and memory-mapped on load. BM25 term weights are
+precomputed per posting, so a query is a gather and a bincount over the
+postings of its terms followed by a partial sort.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Optional
+import numpy as np
+
+from .course_catalog import CATALOG_CSV_PATH, CourseCatalog, get_catalog, save_npy
+from .semantic_cache import embed
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FORMAT_VERSION = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Name tokens count this many times over description tokens.
+NAME_WEIGHT = 3
+# Weight of the name-vector cosine when re-ranking BM25 candidates.
+DENSE_WEIGHT = 0.5
+# Name-vector cosine a query needs when no word of it is in the index.
+DENSE_MIN_SIMILARITY = 0.4
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "with", "will", "students", "course",
+    "class", "topics", "i", "ii", "iii", "my", "our", "your", "their", "about"
+}
+# Informal words speakers use for words course names spell out.
+QUERY_ALIASES = {
+    "intro": "introduction",
+    "algo": "algorithm",
+    "algos": "algorithms",
+    "stats": "statistics",
+    "stat": "statistics",
+    "chem": "chemistry",
+    "bio": "biology",
+    "econ": "economics",
+    "psych": "psychology",
+    "comp": "computer",
+    "sci": "science",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "os": "operating systems"
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Inflections speakers and catalog text swap freely ("computer"/"computing").
+# Only stripped from words long enough to keep a stem.
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ers", "er", "ies", "es", "ed", "s")
+
+
+def stem_word(word: str) -> str:
+    """
+    Strips one common English inflection, e.g. "computing" -> "comput".
+    """
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str, aliases: bool = False) -> list:
+    """
+    Lower-cased, stemmed content words of `text`. With `aliases`, informal
+    words are first expanded ("intro" -> "introduction").
+    """
+    words = _WORD_RE.findall(text.lower())
+    if aliases:
+        words = [expanded for word in words for expanded in QUERY_ALIASES.get(word, word).split()]
+    return [stem_word(word) for word in words if word not in STOPWORDS]
+
+
+class CourseSearchIndex:
+    """
+    Top-k course search by free text, row-aligned with a CourseCatalog.
+
+    Args:
+        catalog (CourseCatalog): Supplies names and descriptions; row i of the
+            index is row i of the catalog.
+        index_dir (str): Where the arrays live. Loaded if present and built
+            from the same CSV, otherwise built and written there.
+        dense (bool): Whether to build the name-vector matrix on a rebuild.
+        rebuild (bool): Build and write the index even if a current one exists.
+    """
+
+    def __init__(
+        self,
+        catalog: CourseCatalog,
+        index_dir: Optional[str] = None,
+        dense: bool = True,
+        rebuild: bool = False
+    ):
+        self.catalog = catalog
+        self.index_dir = index_dir or f"{os.path.splitext(catalog.csv_path)[0]}.search"
+        self.vocabulary = {}
+        self.offsets = None
+        self.postings = None
+        self.weights = None
+        self.vectors = None
+        if rebuild or not self._load():
+            self.build(dense)
+            self.save()
+
+    def _signature(self) -> list:
+        stat = os.stat(self.catalog.csv_path)
+        return [SEARCH_FORMAT_VERSION, stat.st_mtime_ns, stat.st_size, len(self.catalog)]
+
+    def _load(self) -> bool:
+        try:
+            with open(os.path.join(self.index_dir, "meta.json")) as f:
+                meta = json.load(f)
+            if meta["signature"] != self._signature():
+                logger.info("Course search index %s is stale, rebuilding", self.index_dir)
+                return False
+            arrays = {
+                name: np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode="r")
+                for name in meta["arrays"]
+            }
+        except (OSError, ValueError, KeyError):
+            return False
+        self.vocabulary = {term: term_id for term_id, term in enumerate(meta["vocabulary"])}
+        self.offsets = arrays["offsets"]
+        self.postings = arrays["postings"]
+        self.weights = arrays["weights"]
+        self.vectors = arrays.get("vectors")
+        return True
+
+    def build(self, dense: bool = True) -> None:
+        """
+        Computes the BM25 postings (and name vectors) in memory.
+        """
+        started = time.perf_counter()
+        documents = []
+        for name, description in zip(self.catalog.names, self.catalog.descriptions):
+            counts = Counter(tokenize(description))
+            for token in tokenize(name):
+                counts[token] += NAME_WEIGHT
+            documents.append(counts)
+
+        lengths = np.array([sum(counts.values()) for counts in documents], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(documents) else 0.0
+        postings = {}
+        for doc_id, counts in enumerate(documents):
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        vocabulary = sorted(postings)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[token]) for token in vocabulary])
+        entries = np.array([entry for token in vocabulary for entry in postings[token]], dtype=np.int64).reshape(-1, 2)
+        doc_ids = entries[:, 0].astype(np.int32)
+        counts = entries[:, 1].astype(np.float32)
+        frequencies = np.repeat(np.diff(offsets), np.diff(offsets)).astype(np.float32)
+        total = len(documents)
+        idf = np.log1p((total - frequencies + 0.5) / (frequencies + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_ids] / average_length)
+        weights = idf * counts * (BM25_K1 + 1) / (counts + norm)
+
+        self.vocabulary = {token: term_id for term_id, token in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.postings = doc_ids
+        self.weights = weights.astype(np.float32)
+        self.vectors = embed(self.catalog.names) if dense else None
+        logger.info(
+            "Built course search index: %d courses, %d terms, %d postings in %.2fs",
+            total, len(vocabulary), len(doc_ids), time.perf_counter() - started
+        )
+
+    def save(self) -> None:
+        arrays = {"offsets": self.offsets, "postings": self.postings, "weights": self.weights}
+        if self.vectors is not None:
+            arrays["vectors"] = self.vectors
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            for name, array in arrays.items():
+                save_npy(os.path.join(self.index_dir, f"{name}.npy"), np.ascontiguousarray(array))
+            # meta.json goes last: an index without it is rebuilt, not half-loaded.
+            tmp_path = os.path.join(self.index_dir, "meta.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"signature": self._signature(), "arrays": list(arrays), "vocabulary": vocabulary}, f)
+            os.replace(tmp_path, os.path.join(self.index_dir, "meta.json"))
+        except OSError as e:
+            logger.warning("Could not write course search index %s: %s", self.index_dir, e)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def bm25(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every course for `query`; zero where no term matches.
+        """
+        term_ids = {self.vocabulary[token] for token in tokenize(query, aliases=True) if token in self.vocabulary}
+        if not term_ids:
+            return np.zeros(len(self.catalog), dtype=np.float32)
+        slices = [slice(self.offsets[term_id], self.offsets[term_id + 1]) for term_id in term_ids]
+        doc_ids = np.concatenate([self.postings[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        return np.bincount(doc_ids, weights, minlength=len(self.catalog))
+
+    def search(self, query: str, k: int = 5) -> list:
+        """
+        Returns up to k (row_index, score) pairs, best first. BM25 picks the
+        candidates and, when the index has name vectors, their name cosine
+        breaks near-ties; a query with no indexed word at all (say, a
+        garbled one) falls back to name vectors alone.
+        """
+        scores = self.bm25(query)
+        matched = np.flatnonzero(scores)
+        if matched.size:
+            candidates = _top(scores, matched, 4 * k)
+            ranked = scores[candidates] / scores[candidates[0]]
+            if self.vectors is not None:
+                ranked = ranked + DENSE_WEIGHT * (self.vectors[candidates] @ embed([query])[0])
+        elif self.vectors is not None:
+            similarity = self.vectors @ embed([query])[0]
+            candidates = _top(similarity, np.flatnonzero(similarity >= DENSE_MIN_SIMILARITY), k)
+            ranked = similarity[candidates]
+        else:
+            return []
+        order = _top(ranked, np.arange(len(candidates)), k)
+        return [(int(candidates[i]), float(ranked[i])) for i in order]
+
+    def best_match(self, query: str, min_shared: int = 2) -> Optional[int]:
+        """
+        Returns the row of the top course if it is a confident match for a
+        spoken reference: at least `min_shared` query words, and at least
+        half of them, appear in the course name. "the intro data structures
+        class" resolves; "the history class" does not.
+        """
+        query_tokens = set(tokenize(query, aliases=True))
+        results = self.search(query, k=1)
+        if not results or not query_tokens:
+            return None
+        index = results[0][0]
+        shared = query_tokens & set(tokenize(self.catalog.names[index]))
+        if len(shared) >= min_shared and 2 * len(shared) >= len(query_tokens):
+            return index
+        return None
+
+
+def _top(scores: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    """
+    The k of `rows` with the highest scores, best first; ties keep row order.
+    """
+    if rows.size > k:
+        rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+    return rows[np.lexsort((rows, -scores[rows]))]
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def get_course_search() -> CourseSearchIndex:
+    """
+    Returns the process-wide search index over the shared catalog, loading
+    (or, the first time, building) it on first use.
+    """
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                _search = CourseSearchIndex(get_catalog())
+    return _search
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the course search index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="(re)build the index next to the catalog CSV")
+    build.add_argument("--csv", default=CATALOG_CSV_PATH)
+    build.add_argument("--output", help="index directory (default: next to the CSV)")
+    build.add_argument("--no-dense", action="store_true", help="skip the name-vector matrix")
+    query = subcommands.add_parser("query", help="print the top courses for a query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.command == "build":
+        index = CourseSearchIndex(CourseCatalog(args.csv), args.output, dense=not args.no_dense, rebuild=True)
+        print(f"Indexed {len(index)} courses ({len(index.vocabulary)} terms) in {index.index_dir}")
+        return
+
+    index = get_course_search()
+    index.search(args.text, args.k)
+    started = time.perf_counter()
+    results = index.search(args.text, args.k)
+    elapsed = time.perf_counter() - started
+    for row, score in results:
+        print(f"{score:6.3f}  {index.catalog.codes[row]:<12} {index.catalog.names[row]}")
+    print(f"({elapsed * 1000:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main()
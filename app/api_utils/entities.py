@@ -0,0 +1,49 @@
+NAMES = "Names"
+COMPANIES = "Companies"
+COURSES = "Courses"
+TERMS = "Terms"
+
+# The one entity schema shared by the extractors and the WebSocket endpoint.
+ENTITY_KEYS = (NAMES, COMPANIES, COURSES, TERMS)
+
+# Keys older prompts produced, mapped to their canonical name.
+LEGACY_KEYS = {
+    "Technical terms": TERMS
+}
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        key: {"type": "array", "items": {"type": "string"}} for key in ENTITY_KEYS
+    },
+    "required": list(ENTITY_KEYS),
+    "additionalProperties": False
+}
+
+
+def empty_entities() -> dict:
+    return {key: [] for key in ENTITY_KEYS}
+
+
+def normalize_entities(data: dict) -> dict:
+    """
+    Coerces a decoded extraction result into the canonical schema.
+    Unknown keys and non-string items are dropped. Items are stripped and
+    case-insensitive duplicates are removed.
+    """
+    entities = empty_entities()
+    if not isinstance(data, dict):
+        return entities
+    for key, values in data.items():
+        key = LEGACY_KEYS.get(key, key)
+        if key not in entities or not isinstance(values, list):
+            continue
+        seen = {value.lower() for value in entities[key]}
+        for value in values:
+            if not isinstance(value, str) or not value.strip():
+                continue
+            value = " ".join(value.split())
+            if value.lower() not in seen:
+                seen.add(value.lower())
+                entities[key].append(value)
+    return entities
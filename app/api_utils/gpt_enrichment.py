@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import os
+
+from .batching import MicroBatcher
+from .cache import cached, ERROR, HIT
+from .clients import get_async_openai, get_openai
+
+logger = logging.getLogger(__name__)
+
+PERSON = "person"
+COMPANY = "company"
+TERM = "term"
+
+# What GPT is asked for, per kind of entity. The kind doubles as the cache source.
+KIND_INSTRUCTIONS = {
+    PERSON: "a 2-3 sentence summary of the individual, similar to the first paragraph of their Wikipedia page",
+    COMPANY: "a concise 2-3 sentence summary of the company, including its primary industry, key achievements, "
+             "or global significance, similar to a Wikipedia introduction",
+    TERM: "a concise 2-3 sentence definition of the term, which could be a technical term, slang, or internet "
+          "jargon, suitable for someone seeking to understand its meaning or context"
+}
+FAILURE_MESSAGES = {
+    PERSON: "Could not fetch summary for {name}.",
+    COMPANY: "Could not fetch summary for {name}.",
+    TERM: "Could not fetch definition for {name}."
+}
+
+SUMMARY_MODEL = "gpt-4o"
+# Rough output size of one 2-3 sentence summary, used to size batches.
+SUMMARY_TOKEN_ESTIMATE = 120
+BATCH_TOKEN_BUDGET = int(os.getenv("GPT_BATCH_TOKEN_BUDGET", "2000"))
+BATCH_WINDOW_SECONDS = float(os.getenv("GPT_BATCH_WINDOW_SECONDS", "0.005"))
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You are an assistant that provides concise summaries of well-known individuals and companies, "
+    "and clear definitions of technical terms, slang, and internet jargon."
+)
+# Static so every batch request shares the same cacheable prefix.
+BATCH_SYSTEM_PROMPT = "\n".join([
+    "You are an assistant that provides concise summaries of well-known individuals and companies,",
+    "and clear definitions of technical terms, slang, and internet jargon.",
+    "The user message is a JSON list of entities, each with an id, a kind and a name. For each entity write:",
+    *[f"- {kind}: {instruction}" for kind, instruction in KIND_INSTRUCTIONS.items()],
+    "Return one summary per entity, using the entity's id."
+])
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "summaries",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "summaries": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "summary": {"type": "string"}
+                        },
+                        "required": ["id", "summary"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["summaries"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def summary_outcome(summary: str) -> str:
+    return ERROR if summary.startswith("Could not fetch") else HIT
+
+
+def failure_message(kind: str, name: str) -> str:
+    return FAILURE_MESSAGES[kind].format(name=name)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (about four characters per token for English).
+    """
+    return len(text) // 4 + 1
+
+
+def build_summary_messages(kind: str, name: str) -> list:
+    """
+    Builds the chat messages asking for one entity's summary.
+    """
+    return [
+        {
+            "role": "system",
+            "content": SUMMARY_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"Provide {KIND_INSTRUCTIONS[kind]}.\n---\nName: {name}\n---\nReply with the text only."
+        }
+    ]
+
+
+def build_batch_request(entities: list) -> dict:
+    """
+    Builds the chat completion arguments for summarizing several
+    (kind, name) entities in one structured-output call.
+    """
+    items = [{"id": i, "kind": kind, "name": name} for i, (kind, name) in enumerate(entities)]
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": BATCH_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": json.dumps(items)
+            }
+        ],
+        "response_format": BATCH_RESPONSE_FORMAT,
+        "max_tokens": sum(estimate_tokens(name) + SUMMARY_TOKEN_ESTIMATE for _, name in entities) + 64,
+        "temperature": 0
+    }
+
+
+def chunk_by_token_budget(entities: list, budget: int = BATCH_TOKEN_BUDGET) -> list:
+    """
+    Splits (kind, name) entities into chunks whose estimated output fits in
+    `budget` tokens. Every chunk holds at least one entity.
+    """
+    chunks = []
+    current, used = [], 0
+    for kind, name in entities:
+        cost = estimate_tokens(name) + SUMMARY_TOKEN_ESTIMATE
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append((kind, name))
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parse_batch_output(raw_output: str, count: int) -> dict:
+    """
+    Maps entity index -> summary from a batch response. Malformed output,
+    unknown ids and empty summaries are left out, so the caller can retry
+    exactly those entities.
+    """
+    try:
+        data = json.loads(raw_output)
+    except (TypeError, ValueError):
+        return {}
+    summaries = {}
+    for item in data.get("summaries", []) if isinstance(data, dict) else []:
+        if not isinstance(item, dict):
+            continue
+        index, summary = item.get("id"), item.get("summary")
+        if isinstance(index, int) and 0 <= index < count and isinstance(summary, str) and summary.strip():
+            summaries.setdefault(index, summary.strip())
+    return summaries
+
+
+def summarize_entity(kind: str, name: str) -> str:
+    """
+    Blocking single-entity summary, for scripts and the command line.
+    """
+    try:
+        response = get_openai().chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=build_summary_messages(kind, name)
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        logger.warning("Error fetching %s summary for %s: %s", kind, name, e)
+        return failure_message(kind, name)
+
+
+async def summarize_entity_async(kind: str, name: str, create=None) -> str:
+    """
+    Single-entity summary on the shared AsyncOpenAI client. Used for entities
+    a batch call did not answer.
+    """
+    create = create or get_async_openai().chat.completions.create
+    try:
+        response = await create(
+            model=SUMMARY_MODEL,
+            messages=build_summary_messages(kind, name)
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        logger.warning("Error fetching %s summary for %s: %s", kind, name, e)
+        return failure_message(kind, name)
+
+
+async def summarize_entities_async(entities: list, create=None) -> list:
+    """
+    Summarizes mixed (kind, name) entities with as few GPT calls as possible.
+    The entities are chunked by token budget, the chunks run concurrently,
+    and only entries a chunk failed to answer are retried one by one.
+    Args:
+        entities (list): (kind, name) pairs, kind being PERSON, COMPANY or TERM.
+        create (Callable): Chat completion coroutine; defaults to the shared client's.
+    Returns:
+        list: One summary per entity, in order.
+    """
+    create = create or get_async_openai().chat.completions.create
+
+    async def run_chunk(chunk: list) -> list:
+        try:
+            response = await create(**build_batch_request(chunk))
+            answered = parse_batch_output(response.choices[0].message.content, len(chunk))
+        except Exception as e:
+            logger.warning("Error during batch summary of %d entities: %s", len(chunk), e)
+            answered = {}
+        missing = [i for i in range(len(chunk)) if i not in answered]
+        if missing:
+            logger.debug("Batch left %d of %d entities unanswered, retrying them one by one", len(missing), len(chunk))
+            retried = await asyncio.gather(*(summarize_entity_async(*chunk[i], create) for i in missing))
+            answered.update(zip(missing, retried))
+        return [answered[i] for i in range(len(chunk))]
+
+    results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunk_by_token_budget(entities)))
+    return [summary for chunk_result in results for summary in chunk_result]
+
+
+class SummaryBatcher(MicroBatcher):
+    """
+    Answers summary requests made within a few milliseconds of each other,
+    from any session, with one summarize_entities_async call.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW_SECONDS, create=None):
+        super().__init__(window)
+        self._create = create
+
+    async def resolve_many(self, keys: list) -> list:
+        try:
+            return await summarize_entities_async(keys, self._create)
+        except Exception as e:
+            logger.warning("Error during batch summary: %s", e)
+            return [failure_message(kind, name) for kind, name in keys]
+
+    async def summarize(self, kind: str, name: str) -> str:
+        return await self.submit((kind, name))
+
+
+_batcher = None
+
+
+def get_batcher() -> SummaryBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = SummaryBatcher()
+    return _batcher
+
+
+@cached(PERSON, classify=summary_outcome, semantic=True)
+def get_person_summary(person_name: str) -> str:
+    return summarize_entity(PERSON, person_name)
+
+
+@cached(PERSON, classify=summary_outcome, semantic=True)
+async def get_person_summary_async(person_name: str) -> str:
+    return await get_batcher().summarize(PERSON, person_name)
+
+
+@cached(COMPANY, classify=summary_outcome)
+def get_company_summary(company_name: str) -> str:
+    return summarize_entity(COMPANY, company_name)
+
+
+@cached(COMPANY, classify=summary_outcome)
+async def get_company_summary_async(company_name: str) -> str:
+    return await get_batcher().summarize(COMPANY, company_name)
+
+
+@cached(TERM, classify=summary_outcome, semantic=True)
+def get_term_definition(term: str) -> str:
+    return summarize_entity(TERM, term)
+
+
+@cached(TERM, classify=summary_outcome, semantic=True)
+async def get_term_definition_async(term: str) -> str:
+    return await get_batcher().summarize(TERM, term)
+
+
+if __name__ == "__main__":
+    kind = input(f"Kind ({PERSON}, {COMPANY} or {TERM}): ").strip()
+    name = input("Name: ")
+    print(f"\n{summarize_entity(kind, name)}")
@@ -1,14 +1,12 @@
-from dotenv import load_dotenv
-import os
+import logging
 import re
+import json
 from word2number import w2n
-from openai import OpenAI
 
-load_dotenv()
+from .clients import get_async_openai, get_openai
+from .entities import COURSES, EXTRACTION_SCHEMA, empty_entities, normalize_entities
 
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+logger = logging.getLogger(__name__)
 
 MAJOR_MAP = {
     "Anthorpology": "ANTH",
@@ -76,6 +74,56 @@ MAJOR_MAP = {
     "Writing": "WRIT"
 }
 
+MAJOR_PROMPT = "\n".join([f"{major}: {short}" for major, short in MAJOR_MAP.items()])
+
+# Built once at import so every request shares an identical prefix, which lets
+# the provider's prompt caching reuse it. Only the transcription varies.
+EXTRACTION_SYSTEM_PROMPT = f"""You are an assistant that helps extract entity information from text.
+The user message is a transcription of live speech. Extract the following information:
+- Names: notable people (famous figures only)
+- Companies: company names
+- Courses: course names that include numbers or letter-number combinations, e.g., CS9 or Statistics 160A
+- Terms: technical terms, slang, and internet jargon. Technical terms should be complex enough, like amino acids or quantum computing, instead of words like scientist
+
+Notes:
+- Use the following major to course prefix mapping for converting course names to standard formats:
+{MAJOR_PROMPT}
+- If a course name contains words like "one thirty", convert it to numerical format (e.g., 130).
+- Only include valid course names that have numbers. Ignore general mentions like "Computer Science" without a number.
+- Return each entity exactly once, as it should be displayed. Use empty lists when nothing matches."""
+
+EXTRACTION_MODEL = "gpt-4o"
+EXTRACTION_MAX_TOKENS = 256
+EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "entities",
+        "strict": True,
+        "schema": EXTRACTION_SCHEMA
+    }
+}
+
+def build_extraction_request(transcription: str) -> dict:
+    """
+    Builds the chat completion arguments for a structured-output extraction.
+    """
+    return {
+        "model": EXTRACTION_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": EXTRACTION_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": transcription
+            }
+        ],
+        "response_format": EXTRACTION_RESPONSE_FORMAT,
+        "max_tokens": EXTRACTION_MAX_TOKENS,
+        "temperature": 0
+    }
+
 def extract_entities_with_gpt(transcription: str) -> dict:
     """
     Uses GPT to extract entities from the transcription text.
@@ -85,75 +133,64 @@ def extract_entities_with_gpt(transcription: str) -> dict:
       - "Courses"
       - "Terms"
     """
-    major_prompt = "\n".join([f"{major}: {short}" for major, short in MAJOR_MAP.items()])
-    
-    prompt = f"""
-    The following is a transcription text:
-    ---
-    {transcription}
-    ---
-    Please extract the following information:
-    - Names of notable people (famous figures only)
-    - Company names
-    - Course names (must include numbers or letter-number combinations, e.g., CS9 or Statistics 160A)
-    - Terms (including technical terms, slang, and internet jargon)
-    - For technical terms, it should be complex enough like amino acids or quantum computing, instead of words like scientist
-
-    Notes:
-    - Use the following major to course prefix mapping for converting course names to standard formats:
-    {major_prompt}
-    - If a course name contains words like "one thirty", convert it to numerical format (e.g., 130).
-    - Only include valid course names that have numbers. Ignore general mentions like "Computer Science" without a number.
-    - Format the output as follows:
-    Names: [name1, name2, ...]
-    Companies: [company1, company2, ...]
-    Courses: [course1, course2, ...]
-    Technical terms: [term1, term2, ...]
+    try:
+        response = get_openai().chat.completions.create(**build_extraction_request(transcription))
+
+        raw_output = response.choices[0].message.content
+        logger.debug("Raw GPT output: %s", raw_output)
+
+        return parse_extraction_output(raw_output)
+    except Exception as e:
+        logger.warning("Error during GPT processing: %s", e)
+        return empty_entities()
+
+async def extract_entities_with_gpt_async(transcription: str) -> dict:
+    """
+    Async variant of extract_entities_with_gpt built on the shared AsyncOpenAI client.
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an assistant that helps extract entity information from text."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
+        response = await get_async_openai().chat.completions.create(**build_extraction_request(transcription))
 
         raw_output = response.choices[0].message.content
-        print("[DEBUG] Raw GPT output:", raw_output)
+        logger.debug("Raw GPT output: %s", raw_output)
 
-        processed_dict = process_output_as_dict(raw_output)
-        return processed_dict
+        return parse_extraction_output(raw_output)
     except Exception as e:
-        print(f"Error during GPT processing: {e}")
-        return {
-            "Names": [],
-            "Companies": [],
-            "Courses": [],
-            "Technical terms": []
-        }
+        logger.warning("Error during GPT processing: %s", e)
+        return empty_entities()
+
+def parse_extraction_output(raw_output: str) -> dict:
+    """
+    Parses a structured (JSON) extraction result into the canonical entity
+    schema. Output that is not valid JSON, e.g. from the older free-text
+    prompt, goes through the bracket-list parser instead.
+    Courses are processed for standard formatting.
+    """
+    try:
+        data = json.loads(raw_output)
+    except (TypeError, ValueError):
+        return process_output_as_dict(raw_output or "")
+
+    entities = normalize_entities(data)
+    entities[COURSES] = [convert_course_format(course) for course in entities[COURSES]]
+    return entities
 
 def process_output_as_dict(raw_output: str) -> dict:
     """
-    Parses the GPT output string and returns a dictionary:
+    Parses the older free-text GPT output (bracketed lists) and returns a
+    dictionary in the canonical entity schema:
     {
       "Names": [...],
       "Companies": [...],
       "Courses": [...],
-      "Technical terms": [...]
+      "Terms": [...]
     }
     Courses are processed for standard formatting.
     """
-    names_str = extract_bracketed_list(raw_output, r"Names:\s*\[(.*?)\]")
-    companies_str = extract_bracketed_list(raw_output, r"Companies:\s*\[(.*?)\]")
-    courses_str = extract_bracketed_list(raw_output, r"Courses:\s*\[(.*?)\]")
-    technical_str = extract_bracketed_list(raw_output, r"Technical terms:\s*\[(.*?)\]")
+    names_str = extract_bracketed_list(raw_output, r"Names:\s*\[([^\[\]]*)\]")
+    companies_str = extract_bracketed_list(raw_output, r"Companies:\s*\[([^\[\]]*)\]")
+    courses_str = extract_bracketed_list(raw_output, r"Courses:\s*\[([^\[\]]*)\]")
+    technical_str = extract_bracketed_list(raw_output, r"(?:Technical terms|Terms):\s*\[([^\[\]]*)\]")
 
     names_list = parse_list_items(names_str)
     companies_list = parse_list_items(companies_str)
@@ -164,12 +201,12 @@ def process_output_as_dict(raw_output: str) -> dict:
         convert_course_format(course.strip()) for course in course_list if course.strip()
     ]
 
-    return {
+    return normalize_entities({
         "Names": names_list,
         "Companies": companies_list,
         "Courses": standardized_courses,
-        "Technical terms": technical_list
-    }
+        "Terms": technical_list
+    })
 
 def extract_bracketed_list(text: str, pattern: str) -> str:
     """
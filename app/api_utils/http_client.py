@@ -0,0 +1,255 @@
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))
+HTTP_BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+HTTP_BREAKER_RESET_SECONDS = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+
+HTTP_TIMEOUT = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.2
+BACKOFF_MAX_SECONDS = 2.0
+
+# HTTP/2 needs the optional h2 package; without it httpx speaks HTTP/1.1.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while a host's circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive failed requests to one host.
+    Once `reset_timeout` seconds have passed, one trial request is let
+    through: success closes the circuit, failure opens it again. Callers
+    must record an outcome for every allowed request, including ones that
+    are cancelled.
+    """
+
+    def __init__(self, threshold: int = HTTP_BREAKER_THRESHOLD, reset_timeout: float = HTTP_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class _ResiliencePolicy:
+    """
+    Retry, backoff and circuit-breaker bookkeeping shared by the blocking
+    and async clients. Requests are tracked per host.
+    """
+
+    def __init__(self, max_retries: int, per_host_limit: int, breaker_threshold: int, breaker_reset: float):
+        self.max_retries = max_retries
+        self.per_host_limit = per_host_limit
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.counters = Counter()
+        self._breakers = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers.setdefault(host, CircuitBreaker(self.breaker_threshold, self.breaker_reset))
+        return breaker
+
+    def check_circuit(self, host: str) -> None:
+        if not self.breaker(host).allow():
+            self.counters[(host, "short_circuited")] += 1
+            raise CircuitOpenError(f"Circuit open for {host}, not sending request")
+
+    def should_retry(self, host: str, attempt: int, response: httpx.Response = None) -> bool:
+        retry = attempt < self.max_retries and (response is None or response.status_code in RETRY_STATUSES)
+        if retry:
+            self.counters[(host, "retries")] += 1
+        return retry
+
+    def backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        """
+        Full-jitter exponential backoff, or the server's Retry-After when it
+        sends a short one.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def record(self, host: str, response: httpx.Response = None) -> None:
+        self.counters[(host, "requests")] += 1
+        if response is not None and response.status_code < 500 and response.status_code != 429:
+            self.breaker(host).record_success()
+        else:
+            self.counters[(host, "failures")] += 1
+            self.breaker(host).record_failure()
+
+    def stats(self) -> dict:
+        grouped = {host: {"circuit": breaker.state} for host, breaker in self._breakers.items()}
+        for (host, event), count in self.counters.items():
+            grouped.setdefault(host, {})[event] = count
+        return grouped
+
+
+class ResilientAsyncClient(_ResiliencePolicy):
+    """
+    Pooled httpx.AsyncClient with strict timeouts, jittered retries on 429,
+    5xx and transport errors, a concurrency limit per host and a circuit
+    breaker per host. Exhausted retries return the last response, or raise
+    the last transport error, just like a plain client would.
+    """
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout = HTTP_TIMEOUT,
+        limits: httpx.Limits = HTTP_LIMITS,
+        max_retries: int = HTTP_MAX_RETRIES,
+        per_host_limit: int = HTTP_PER_HOST_LIMIT,
+        breaker_threshold: int = HTTP_BREAKER_THRESHOLD,
+        breaker_reset: float = HTTP_BREAKER_RESET_SECONDS
+    ):
+        super().__init__(max_retries, per_host_limit, breaker_threshold, breaker_reset)
+        self._client = httpx.AsyncClient(timeout=timeout, limits=limits, http2=HTTP2_AVAILABLE)
+        self._host_slots = {}
+
+    def _slots(self, host: str) -> asyncio.Semaphore:
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return slots
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.check_circuit(host)
+            response = None
+            try:
+                async with self._slots(host):
+                    response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                self.record(host)
+                if not self.should_retry(host, attempt):
+                    raise
+            except BaseException:
+                # Cancelled or failed some other way: still settle the
+                # attempt, or a half-open trial would never be released.
+                self.record(host)
+                raise
+            else:
+                self.record(host, response)
+                if not self.should_retry(host, attempt, response):
+                    return response
+            await asyncio.sleep(self.backoff(attempt, response))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class ResilientClient(_ResiliencePolicy):
+    """
+    Blocking counterpart of ResilientAsyncClient for the synchronous helpers.
+    """
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout = HTTP_TIMEOUT,
+        limits: httpx.Limits = HTTP_LIMITS,
+        max_retries: int = HTTP_MAX_RETRIES,
+        per_host_limit: int = HTTP_PER_HOST_LIMIT,
+        breaker_threshold: int = HTTP_BREAKER_THRESHOLD,
+        breaker_reset: float = HTTP_BREAKER_RESET_SECONDS
+    ):
+        super().__init__(max_retries, per_host_limit, breaker_threshold, breaker_reset)
+        self._client = httpx.Client(timeout=timeout, limits=limits, http2=HTTP2_AVAILABLE)
+        self._host_slots = {}
+        self._slots_lock = threading.Lock()
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._slots_lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slots
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.check_circuit(host)
+            response = None
+            try:
+                with self._slots(host):
+                    response = self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                self.record(host)
+                if not self.should_retry(host, attempt):
+                    raise
+            except BaseException:
+                # Cancelled or failed some other way: still settle the
+                # attempt, or a half-open trial would never be released.
+                self.record(host)
+                raise
+            else:
+                self.record(host, response)
+                if not self.should_retry(host, attempt, response):
+                    return response
+            time.sleep(self.backoff(attempt, response))
+            attempt += 1
+
+    def close(self) -> None:
+        self._client.close()
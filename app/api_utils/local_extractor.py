@@ -0,0 +1,436 @@
+import os
+import re
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .course_catalog import get_catalog
+from .course_search import get_course_search
+from .entities import COURSES, empty_entities
+from .gpt_utils import MAJOR_MAP
+
+# Informal subject names that speakers use but MAJOR_MAP does not list.
+SUBJECT_ALIASES = {
+    "CS": "CMPSC",
+    "Comp Sci": "CMPSC",
+    "Stats": "PSTAT",
+    "Stat": "PSTAT",
+    "Econ": "ECON",
+    "Psych": "PSY",
+    "Poli Sci": "POL S",
+    "EE": "ECE",
+    "Chem": "CHEM",
+    "Bio": "BIOL",
+    "Mech E": "ME"
+}
+
+UNITS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9
+}
+TEENS = {
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19
+}
+TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90
+}
+NUMBER_WORDS = set(UNITS) | set(TEENS) | set(TENS) | {"hundred"}
+
+# Words that are capitalized for reasons other than being a name.
+COMMON_CAPITALIZED = {
+    "i", "i'm", "i've", "i'll", "i'd", "ok", "okay", "monday", "tuesday", "wednesday",
+    "thursday", "friday", "saturday", "sunday", "january", "february", "march", "april",
+    "may", "june", "july", "august", "september", "october", "november", "december",
+    "english", "american", "professor", "dr", "mr", "mrs", "ms"
+}
+
+# Everyday words that start sentences. Any other capitalized word at the
+# start of a sentence may be a name ("Tesla too.") and stays unexplained.
+COMMON_SENTENCE_STARTERS = {
+    "a", "an", "the", "this", "that", "these", "those", "there", "here", "it", "it's",
+    "we", "we're", "we'll", "you", "you're", "he", "she", "they", "they're", "my", "our",
+    "your", "his", "her", "their", "and", "but", "or", "so", "because", "if", "when",
+    "then", "also", "just", "well", "yeah", "yes", "no", "not", "oh", "um", "uh", "like",
+    "right", "now", "today", "tomorrow", "yesterday", "what", "why", "how", "who", "where",
+    "which", "do", "does", "did", "is", "are", "was", "were", "can", "could", "will",
+    "would", "should", "have", "has", "had", "let's", "let", "maybe", "actually", "anyway",
+    "all", "some", "any", "every", "one", "after", "before", "for", "in", "on", "at", "to",
+    "of", "with", "as", "give", "take", "make", "go", "get", "see", "look", "think",
+    "thanks", "thank", "please", "sorry", "hi", "hello", "hey", "alright", "sure", "really"
+}
+
+# Long everyday words that should not by themselves send a window to GPT.
+COMMON_LONG_WORDS = {
+    "basically", "something", "everything", "everybody", "different", "important",
+    "interesting", "understand", "definitely", "especially", "otherwise", "sometimes",
+    "somewhere", "yesterday", "questions", "remember", "actually", "probably",
+    "absolutely", "obviously", "presentation", "assignment", "assignments", "homework",
+    "everyone's", "tomorrow's", "understanding", "particular", "literally", "generally",
+    "anything", "wondering", "beginning", "following", "discussion", "information"
+}
+
+# Most names the gazetteer keeps; the least recently remembered go first.
+MAX_GAZETTEER_SIZE = int(os.getenv("LOCAL_GAZETTEER_SIZE", "4096"))
+LONG_WORD_LENGTH = 9
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'\-]*")
+_WORD_RE = re.compile(r"[A-Za-z]+")
+_NUMBER_RE = re.compile(r"(\d+)\s*-?\s*([A-Za-z]{1,2})?\b")
+# "the intro data structures class": a course referred to by what it covers.
+_COURSE_PHRASE_RE = re.compile(
+    r"\b(?:the|that|this|my|our|your|his|her|their)\s+((?:[A-Za-z][\w'-]*\s+){1,5}?)(?:class|course|lecture|seminar)s?\b",
+    re.IGNORECASE
+)
+
+
+def spoken_number_to_digits(words: list) -> str:
+    """
+    Turns spoken course numbers into digits the way people say them:
+    "one thirty" -> "130", "one thirty two" -> "132", "eight" -> "8",
+    "one hundred thirty" -> "130". Returns "" if the words are not a number.
+    """
+    if not words or any(word not in NUMBER_WORDS for word in words):
+        return ""
+
+    if "hundred" in words:
+        i = words.index("hundred")
+        head, tail = words[:i], words[i + 1:]
+        if len(head) > 1 or (head and head[0] not in UNITS):
+            return ""
+        tail_digits = spoken_number_to_digits(tail) if tail else "0"
+        if not tail_digits or int(tail_digits) >= 100:
+            return ""
+        return str((UNITS[head[0]] if head else 1) * 100 + int(tail_digits))
+
+    parts = []
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in TENS:
+            value = TENS[word]
+            if i + 1 < len(words) and UNITS.get(words[i + 1], 0) > 0:
+                value += UNITS[words[i + 1]]
+                i += 1
+            parts.append(str(value))
+        elif word in TEENS:
+            parts.append(str(TEENS[word]))
+        else:
+            parts.append(str(UNITS[word]))
+        i += 1
+    return "".join(parts)
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over lower-cased text. Each pattern carries a
+    payload; `search` yields (start, end, payload) for whole-word matches.
+    """
+
+    def __init__(self, patterns: dict):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, payload in patterns.items():
+            self._add(pattern.lower(), payload)
+        self._link()
+
+    def _add(self, pattern: str, payload) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), payload))
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def search(self, text: str):
+        lowered = text.lower()
+        state = 0
+        for end, char in enumerate(lowered, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._out[state]:
+                start = end - length
+                if (start == 0 or not lowered[start - 1].isalnum()) and (end == len(lowered) or not lowered[end].isalnum()):
+                    yield start, end, payload
+
+
+@dataclass
+class LocalExtraction:
+    entities: dict
+    conclusive: bool
+    unexplained: list = field(default_factory=list)
+
+
+class LocalEntityExtractor:
+    """
+    Deterministic entity detection that runs before GPT.
+
+    One Aho-Corasick automaton holds the course subjects (MAJOR_MAP names,
+    catalog subject codes and a few informal aliases) and a gazetteer of
+    people, companies and terms that earlier windows resolved (a second,
+    small automaton, rebuilt on a background thread so `remember` never
+    stalls the event loop). A subject
+    followed by a number (digits or spoken words) becomes a catalog-checked
+    course code, and a course described by name ("the intro data structures
+    class") is resolved through the course search index when it is a
+    confident match. The result is conclusive, and GPT can be skipped, when no
+    token in the window is left unexplained: no unmatched capitalized words,
+    no stray numbers and no long, term-like words.
+    """
+
+    def __init__(self, catalog=None, search=None, max_gazetteer_size: int = MAX_GAZETTEER_SIZE):
+        self._catalog = catalog
+        self._search = search
+        self.max_gazetteer_size = max_gazetteer_size
+        self._gazetteer = {}
+        self._gazetteer_version = 0
+        self._subject_matcher = None
+        self._gazetteer_matcher = None
+        self._gazetteer_matcher_version = 0
+        self._rebuild_thread = None
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            self._catalog = get_catalog()
+        return self._catalog
+
+    @property
+    def search(self):
+        if self._search is None:
+            self._search = get_course_search()
+        return self._search
+
+    def _subject_patterns(self) -> dict:
+        """
+        Maps every spoken or written subject form to ("subject", code, needs_upper).
+        Short catalog codes and upper-case aliases such as "ME" or "CS" only
+        count when written in capitals, so the word "me" is not a subject.
+        """
+        patterns = {}
+        for code in self.catalog.codes:
+            subject = re.match(r"[A-Za-z ]*[A-Za-z]", code)
+            if subject:
+                subject = subject.group(0)
+                patterns[subject.lower()] = ("subject", subject, len(subject) <= 3)
+        for name, short in MAJOR_MAP.items():
+            patterns[name.lower()] = ("subject", short, False)
+        for alias, short in SUBJECT_ALIASES.items():
+            patterns[alias.lower()] = ("subject", short, alias.isupper())
+        return patterns
+
+    def remember(self, entity_key: str, name: str) -> None:
+        """
+        Adds a resolved entity to the gazetteer so later windows find it
+        locally, once the background rebuild of its matcher has finished.
+        """
+        name = " ".join(name.split())
+        if len(name) < 2:
+            return
+        lowered = name.lower()
+        with self._lock:
+            if self._gazetteer.get(lowered) == (entity_key, name):
+                return
+            self._gazetteer.pop(lowered, None)
+            self._gazetteer[lowered] = (entity_key, name)
+            while len(self._gazetteer) > self.max_gazetteer_size:
+                del self._gazetteer[next(iter(self._gazetteer))]
+            self._gazetteer_version += 1
+            if self._rebuild_thread is not None:
+                # The running rebuild picks up this change before it exits.
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild_gazetteer, name="gazetteer-rebuild", daemon=True)
+        self._rebuild_thread.start()
+
+    def _rebuild_gazetteer(self) -> None:
+        while True:
+            with self._lock:
+                if self._gazetteer_matcher_version == self._gazetteer_version:
+                    self._rebuild_thread = None
+                    return
+                version = self._gazetteer_version
+                patterns = {lowered: ("entity", value) for lowered, value in self._gazetteer.items()}
+            matcher = AhoCorasick(patterns)
+            with self._lock:
+                self._gazetteer_matcher = matcher
+                self._gazetteer_matcher_version = version
+
+    def wait_for_gazetteer(self, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until names remembered so far are matched by `extract`.
+        """
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _matches(self, text: str) -> list:
+        with self._lock:
+            if self._subject_matcher is None:
+                self._subject_matcher = AhoCorasick(self._subject_patterns())
+            matchers = [self._subject_matcher, self._gazetteer_matcher]
+        matches = [match for matcher in matchers if matcher is not None for match in matcher.search(text)]
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def _course_after(self, text: str, end: int, subject: str):
+        """
+        Parses the course number that follows a subject mention, written
+        ("130A") or spoken ("one thirty a"), and checks it against the catalog.
+        Returns (catalog_code, end_of_match) or None.
+        """
+        rest = text[end:end + 48]
+        stripped = rest.lstrip()
+        offset = end + len(rest) - len(stripped)
+
+        candidates = []
+        match = _NUMBER_RE.match(stripped)
+        if match:
+            if match.group(2):
+                candidates.append((match.group(1) + match.group(2), offset + match.end(2)))
+            candidates.append((match.group(1), offset + match.end(1)))
+        else:
+            tokens = list(_WORD_RE.finditer(stripped))[:5]
+            number_tokens = []
+            for token in tokens:
+                if token.group(0).lower() not in NUMBER_WORDS:
+                    break
+                number_tokens.append(token)
+            if number_tokens and number_tokens[0].start() == 0:
+                for n in range(len(number_tokens), 0, -1):
+                    digits = spoken_number_to_digits([t.group(0).lower() for t in number_tokens[:n]])
+                    if not digits:
+                        continue
+                    if n < len(tokens) and len(tokens[n].group(0)) == 1:
+                        candidates.append((digits + tokens[n].group(0).upper(), offset + tokens[n].end()))
+                    candidates.append((digits, offset + number_tokens[n - 1].end()))
+                    break
+
+        for number, course_end in candidates:
+            index = self.catalog.find(subject + number)
+            if index is not None:
+                return self.catalog.codes[index], course_end
+        return None
+
+    def extract(self, transcription: str) -> LocalExtraction:
+        entities = empty_entities()
+        covered = []
+        course_spans = []
+        seen = set()
+        for start, end, (kind, *value) in self._matches(transcription):
+            if kind == "subject":
+                code, needs_upper = value
+                if needs_upper and not transcription[start:end].isupper():
+                    continue
+                course = self._course_after(transcription, end, code)
+                if course is None:
+                    covered.append((start, end))
+                    continue
+                code, course_end = course
+                covered.append((start, course_end))
+                course_spans.append((start, course_end))
+                if (COURSES, code) not in seen:
+                    seen.add((COURSES, code))
+                    entities[COURSES].append(code)
+            else:
+                entity_key, name = value[0]
+                covered.append((start, end))
+                if (entity_key, name) not in seen:
+                    seen.add((entity_key, name))
+                    entities.setdefault(entity_key, []).append(name)
+
+        for match in _COURSE_PHRASE_RE.finditer(transcription):
+            start, end = match.span()
+            # "the CMPSC 130A class" was already resolved by its code.
+            if any(span_start < end and start < span_end for span_start, span_end in course_spans):
+                continue
+            index = self.search.best_match(match.group(1))
+            if index is None:
+                continue
+            code = self.search.catalog.codes[index]
+            covered.append((start, end))
+            self.counters["courses_by_name"] += 1
+            if (COURSES, code) not in seen:
+                seen.add((COURSES, code))
+                entities[COURSES].append(code)
+
+        unexplained = self._unexplained_tokens(transcription, covered)
+        # Short windows get no shortcut: "Tesla too." still needs GPT.
+        conclusive = not unexplained
+        self.counters["windows"] += 1
+        self.counters["gpt_calls_avoided" if conclusive else "gpt_calls"] += 1
+        return LocalExtraction(entities, conclusive, unexplained)
+
+    def _unexplained_tokens(self, text: str, covered: list) -> list:
+        """
+        Returns the tokens outside every local match that might still be an
+        entity: capitalized words other than everyday sentence starters,
+        numbers and long words.
+        """
+        unexplained = []
+        previous_end = 0
+        for position, match in enumerate(_TOKEN_RE.finditer(text)):
+            token = match.group(0)
+            at_sentence_start = position == 0 or any(p in text[previous_end:match.start()] for p in ".!?")
+            previous_end = match.end()
+            if any(start <= match.start() and match.end() <= end for start, end in covered):
+                continue
+            lowered = token.lower()
+            if token[0].isupper() and lowered not in COMMON_CAPITALIZED and not (at_sentence_start and lowered in COMMON_SENTENCE_STARTERS):
+                unexplained.append(token)
+            elif any(char.isdigit() for char in token):
+                unexplained.append(token)
+            elif len(token) >= LONG_WORD_LENGTH and lowered not in COMMON_LONG_WORDS:
+                unexplained.append(token)
+        return unexplained
+
+    def stats(self) -> dict:
+        return dict(self.counters, gazetteer_size=len(self._gazetteer))
+
+
+def merge_entities(*results: dict) -> dict:
+    """
+    Unions several entity dicts, keeping first-seen order and dropping
+    case-insensitive duplicates.
+    """
+    merged = empty_entities()
+    for result in results:
+        for key, values in result.items():
+            bucket = merged.setdefault(key, [])
+            known = {value.lower() for value in bucket}
+            for value in values:
+                if value.lower() not in known:
+                    known.add(value.lower())
+                    bucket.append(value)
+    return merged
+
+
+_extractor = None
+
+
+def get_local_extractor() -> LocalEntityExtractor:
+    global _extractor
+    if _extractor is None:
+        _extractor = LocalEntityExtractor()
+    return _extractor
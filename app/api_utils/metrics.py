@@ -0,0 +1,179 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# OpenTelemetry spans are opt-in; without the package the timers only feed histograms.
+TRACING_ENABLED = os.getenv("OTEL_SPANS", "0") == "1"
+_tracer = None
+
+
+def _get_tracer():
+    global _tracer, TRACING_ENABLED
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            TRACING_ENABLED = False
+            return None
+        _tracer = trace.get_tracer("contextify")
+    return _tracer
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus style: per-bucket counts plus
+    the running sum and count of observed values.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile, e.g. q=0.95.
+        Values past the last bucket report as infinity.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+
+
+class StageMetrics:
+    """
+    Latency histograms keyed by pipeline stage ("asr", "extraction",
+    "enrich.wikipedia", ...). A session's metrics pass every observation on
+    to `parent`, so the global registry sees all sessions combined.
+    """
+
+    def __init__(self, parent: "StageMetrics" = None):
+        self.parent = parent
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        if self.parent is not None:
+            self.parent.observe(stage, seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Times the enclosed block as `stage`, inside an OpenTelemetry span when
+        OTEL_SPANS=1 and the opentelemetry package is installed.
+        """
+        tracer = _get_tracer() if TRACING_ENABLED else None
+        span = tracer.start_as_current_span(stage) if tracer is not None else nullcontext()
+        start = time.perf_counter()
+        with span:
+            try:
+                yield
+            finally:
+                self.observe(stage, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in sorted(self.histograms.items())}
+
+
+GLOBAL_METRICS = StageMetrics()
+_sessions = {}
+
+# The metrics of the session the current task works for. Tasks inherit it,
+# so enrichment lookups spawned by a session are attributed to that session.
+current_metrics = ContextVar("current_metrics", default=GLOBAL_METRICS)
+
+
+def stage(name: str):
+    """
+    Times a block as `name` in the current session's metrics, e.g.
+    `with stage("enrich.wikipedia"): ...`.
+    """
+    return current_metrics.get().time(name)
+
+
+def session_metrics(session_id: str) -> StageMetrics:
+    """
+    Creates the metrics for one session; they are reported by
+    session_summaries until end_session.
+    """
+    metrics = _sessions[session_id] = StageMetrics(parent=GLOBAL_METRICS)
+    return metrics
+
+
+def end_session(session_id: str) -> None:
+    _sessions.pop(session_id, None)
+
+
+def session_summaries() -> dict:
+    """
+    Latency summaries of the active sessions, keyed by session id.
+    """
+    return {session_id: metrics.summary() for session_id, metrics in list(_sessions.items())}
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _render_histograms(lines: list, name: str, metrics: StageMetrics) -> None:
+    with metrics._lock:
+        items = [(stage, list(h.counts), h.sum, h.count, h.buckets) for stage, h in sorted(metrics.histograms.items())]
+    for stage, counts, total, count, buckets in items:
+        stage_labels = f'stage="{stage}"'
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{stage_labels},le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{stage_labels}}} {total}")
+        lines.append(f"{name}_count{{{stage_labels}}} {count}")
+
+
+def render_prometheus(counters: dict = None, gauges: dict = None) -> str:
+    """
+    Renders the global stage histograms, plus any extra counters and gauges
+    ({metric_name: value}), in the Prometheus text format. Per-session
+    numbers stay on /stats: a session label would add series without bound.
+    """
+    lines = [
+        "# HELP contextify_stage_seconds Latency of each pipeline stage across all sessions.",
+        "# TYPE contextify_stage_seconds histogram"
+    ]
+    _render_histograms(lines, "contextify_stage_seconds", GLOBAL_METRICS)
+    for metric_type, values in (("counter", counters), ("gauge", gauges)):
+        for name, value in (values or {}).items():
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
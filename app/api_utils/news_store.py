@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .bing_utils import fetch_bing_news_async
+from .cache import normalize_key
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+NEWS_REFRESH_SECONDS = float(os.getenv("NEWS_REFRESH_SECONDS", "300"))
+# Companies mentioned within this window are kept fresh; older ones are dropped.
+NEWS_ACTIVE_SECONDS = float(os.getenv("NEWS_ACTIVE_SECONDS", "1800"))
+# Past this age an entry is not served at all and the next mention refetches it.
+NEWS_MAX_AGE_SECONDS = float(os.getenv("NEWS_MAX_AGE_SECONDS", "3600"))
+NEWS_BATCH_SIZE = int(os.getenv("NEWS_BATCH_SIZE", "5"))
+NEWS_REFRESH_CONCURRENCY = int(os.getenv("NEWS_REFRESH_CONCURRENCY", "4"))
+NEWS_PER_COMPANY = 2
+
+
+@dataclass
+class NewsEntry:
+    name: str
+    result: Optional[dict] = None
+    fetched_at: float = 0.0
+    last_seen: float = 0.0
+    mentions: int = 0
+
+
+def split_news(result: dict, names: list, per_company: int) -> dict:
+    """
+    Attributes the articles of one combined query to the companies it asked
+    about: an article belongs to every company named in its title or
+    description, up to `per_company` articles each.
+    """
+    split = {name: [] for name in names}
+    for article in result.get("value") or []:
+        text = f"{article.get('name', '')} {article.get('description', '')}".casefold()
+        for name in names:
+            if len(split[name]) < per_company and name.casefold() in text:
+                split[name].append(article)
+    return split
+
+
+class NewsStore:
+    """
+    Process-wide company news with freshness metadata.
+
+    Sessions read it with `get`, which returns whatever is stored, fresh or
+    stale, without waiting on Bing; only a company with nothing stored (a
+    cold miss) is fetched inline, and concurrent cold misses for the same
+    company share one request. A background task refreshes every company
+    mentioned in the last `active_seconds` once its news is older than
+    `refresh_interval`, asking for up to `batch_size` companies per Bing
+    query ("A" OR "B" OR ...), so upstream calls scale with the number of
+    distinct companies per interval rather than with mentions.
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[Callable] = None,
+        refresh_interval: float = NEWS_REFRESH_SECONDS,
+        active_seconds: float = NEWS_ACTIVE_SECONDS,
+        max_age: float = NEWS_MAX_AGE_SECONDS,
+        batch_size: int = NEWS_BATCH_SIZE,
+        per_company: int = NEWS_PER_COMPANY,
+        concurrency: int = NEWS_REFRESH_CONCURRENCY
+    ):
+        self._fetch = fetch or (lambda query, count: fetch_bing_news_async(get_settings().bing_api_key, query, count))
+        self.refresh_interval = refresh_interval
+        self.active_seconds = active_seconds
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.per_company = per_company
+        self.concurrency = concurrency
+        self.counters = Counter()
+        self._entries = {}
+        self._inflight = {}
+        self._task = None
+
+    def peek(self, company: str) -> Optional[dict]:
+        """
+        Records a mention of `company` and returns its stored news, or None
+        if there is none young enough to serve.
+        """
+        now = time.time()
+        key = normalize_key(company)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = NewsEntry(" ".join(company.split()))
+        entry.last_seen = now
+        entry.mentions += 1
+        age = now - entry.fetched_at
+        if entry.result is None or age > self.max_age:
+            return None
+        self.counters["fresh_hits" if age <= self.refresh_interval else "stale_hits"] += 1
+        return entry.result
+
+    async def get(self, company: str) -> dict:
+        """
+        Returns the company's news in Bing's response shape ({"value": [...]}),
+        fetching it only on a cold miss.
+        """
+        result = self.peek(company)
+        if result is not None:
+            return result
+        self.counters["cold_misses"] += 1
+        key = normalize_key(company)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh([key]))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded: a caller timing out must not cancel the fetch others share.
+        await asyncio.shield(task)
+        entry = self._entries.get(key)
+        if entry is None or entry.result is None:
+            return {"error": "News lookup failed"}
+        return entry.result
+
+    async def _refresh(self, keys: list) -> list:
+        """
+        Fetches news for `keys` with one query and stores it.
+        Returns:
+            list: The keys the combined results said nothing about, which
+            need a query of their own.
+        """
+        names = [self._entries[key].name for key in keys]
+        query = " OR ".join(f'"{name}"' for name in names) if len(names) > 1 else names[0]
+        self.counters["upstream_calls"] += 1
+        result = await self._fetch(query, self.per_company * len(names))
+        if "error" in result:
+            self.counters["refresh_errors"] += 1
+            return []
+        now = time.time()
+        leftovers = []
+        split = split_news(result, names, self.per_company) if len(names) > 1 else {names[0]: result.get("value") or []}
+        for key, name in zip(keys, names):
+            articles = split[name]
+            if not articles and len(names) > 1:
+                # Crowded out of the combined results, or no news at all;
+                # only a query of its own can tell.
+                leftovers.append(key)
+                continue
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.result = {"value": articles}
+                entry.fetched_at = now
+                self.counters["refreshed"] += 1
+        return leftovers
+
+    async def refresh_once(self) -> int:
+        """
+        Refreshes every active company whose news is due, and forgets
+        companies nobody mentioned for `active_seconds`.
+        Returns:
+            int: The number of companies that were due.
+        """
+        now = time.time()
+        for key in [key for key, entry in self._entries.items() if now - entry.last_seen > self.active_seconds]:
+            del self._entries[key]
+        due = sorted(
+            (key for key, entry in self._entries.items()
+             if now - entry.fetched_at >= self.refresh_interval and key not in self._inflight),
+            key=lambda key: self._entries[key].fetched_at
+        )
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def refresh_batch(batch):
+            async with slots:
+                leftovers = await self._refresh(batch)
+            await asyncio.gather(*(refresh_batch([key]) for key in leftovers))
+
+        await asyncio.gather(*(
+            refresh_batch(due[i:i + self.batch_size]) for i in range(0, len(due), self.batch_size)
+        ))
+        return len(due)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval / 4)
+            try:
+                due = await self.refresh_once()
+                if due:
+                    logger.debug("Refreshed news for %d companies", due)
+            except Exception:
+                logger.exception("News refresh failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return dict(self.counters, companies=len(self._entries))
+
+
+_news_store = None
+
+
+def get_news_store() -> NewsStore:
+    global _news_store
+    if _news_store is None:
+        _news_store = NewsStore()
+    return _news_store
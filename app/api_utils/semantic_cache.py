@@ -0,0 +1,302 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 256
+NGRAM = 3
+# Minimum cosine similarity for a lookup to be answered from the cache, per
+# source. Names need to be closer than terms: "Jon Smith" is not "John Smith".
+DEFAULT_THRESHOLD = 0.85
+THRESHOLDS = {
+    "person": 0.92,
+    "term": 0.85
+}
+
+# Words keep "+", "#" and inner dots, so "C++", "C#", "C" and "Node.js"
+# stay distinct terms.
+_WORD_RE = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+# Two keys only match when their stemmed word sets overlap at least this
+# much (Jaccard), however close their trigram vectors are.
+MIN_TOKEN_OVERLAP = 0.8
+# Inflections that usually leave the thing named unchanged ("quantum
+# computer"/"quantum computing"). Only stripped from words long enough to
+# keep a stem.
+_INFLECTIONS = ("ations", "ation", "ings", "ing", "ers", "er", "ies", "es", "ed", "s")
+# Part of the file names: rows embedded another way are not comparable.
+CACHE_FORMAT_VERSION = 2
+
+
+def stem_word(word: str) -> str:
+    """
+    Strips a plural "s", e.g. "networks" -> "network".
+    """
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def inflection_stem(word: str) -> str:
+    """
+    Strips one common English inflection, e.g. "computing" -> "comput". On
+    its own this also joins different terms ("encoder"/"encoding"), see
+    words_match.
+    """
+    for suffix in _INFLECTIONS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str, stem=stem_word) -> list:
+    """
+    Case-folded words of `text`, each passed through `stem`.
+    """
+    return [stem(word) for word in _WORD_RE.findall(str(text).casefold())]
+
+
+def token_overlap(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def key_words(text: str) -> tuple:
+    """
+    The (plural-stemmed, inflection-stemmed) word sets words_match compares.
+    """
+    return frozenset(tokenize(text)), frozenset(tokenize(text, inflection_stem))
+
+
+def words_match(a: tuple, b: tuple) -> bool:
+    """
+    Whether two key_words name the same thing: their inflection stems
+    overlap by MIN_TOKEN_OVERLAP and at least one word matches up to its
+    plural. "Quantum computer" matches "quantum computing" through
+    "quantum"; "encoder" and "encoding" share only a stem and do not match.
+    """
+    (words_a, stems_a), (words_b, stems_b) = a, b
+    return token_overlap(stems_a, stems_b) >= MIN_TOKEN_OVERLAP and bool(words_a & words_b)
+
+
+def embed(texts: list, dim: int = EMBEDDING_DIM, stem=stem_word) -> np.ndarray:
+    """
+    Hashes the character trigrams of each tokenized text into a signed bag
+    of `dim` buckets and L2-normalizes it, so a dot product of two rows is
+    their cosine similarity. CRC32 keeps the hashing stable across
+    processes, which the persisted matrix relies on.
+    Args:
+        stem (Callable): Applied to each word before hashing.
+    Returns:
+        np.ndarray: float32 array of shape (len(texts), dim).
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {' '.join(tokenize(text, stem))} "
+        if len(padded) < NGRAM:
+            continue
+        hashes = np.fromiter(
+            (zlib.crc32(padded[i:i + NGRAM].encode()) for i in range(len(padded) - NGRAM + 1)),
+            dtype=np.uint32
+        )
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vectors[row], hashes % dim, signs)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup for one enrichment source.
+
+    Keys are embedded from their inflection stems into rows of a fixed-size
+    float32 matrix, and a lookup is one matrix-vector product over the live
+    rows: the best match above `threshold` whose words also match the
+    query's (see words_match) answers it. When full, the least recently used
+    row is evicted. With a `path`, the matrix is a memory-mapped .npy file
+    and keys, values and expiry times go to an append-only JSON-lines log
+    next to it, so a restart maps the matrix instead of re-embedding.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        capacity: int = 2048,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl: float = 14 * 24 * 3600,
+        dim: int = EMBEDDING_DIM
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._keys = [None] * capacity
+        self._words = [None] * capacity
+        self._values = [None] * capacity
+        self._expires = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._slots = {}
+        self._clock = 0
+        self._log = None
+        self._log_path = None
+        self._owner = None
+        if path:
+            self._owner = open(f"{path}.lock", "w")
+            try:
+                fcntl.flock(self._owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another serving process owns the files; slots are assigned
+                # per process, so this one keeps its entries in memory.
+                logger.info("Semantic cache %s is in use by another process, keeping it in memory", path)
+                self._owner.close()
+                self._owner = None
+                path = None
+        if path:
+            self._open(path)
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+    def _open(self, path: str) -> None:
+        path = f"{path}.v{CACHE_FORMAT_VERSION}"
+        matrix_path = f"{path}.npy"
+        self._log_path = f"{path}.jsonl"
+        if os.path.exists(matrix_path):
+            self._vectors = np.load(matrix_path, mmap_mode="r+")
+            if self._vectors.shape != (self.capacity, self.dim):
+                logger.warning("Discarding semantic cache %s with shape %s", matrix_path, self._vectors.shape)
+                self._vectors = None
+        else:
+            self._vectors = None
+        if self._vectors is None:
+            self._vectors = np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.float32, shape=(self.capacity, self.dim))
+            if os.path.exists(self._log_path):
+                os.remove(self._log_path)
+
+        entries = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path) as f:
+                for line in f:
+                    try:
+                        slot, key, value, expires = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; everything before it is intact.
+                        continue
+                    self._store(slot, key, value, expires)
+                    entries += 1
+        if entries > 2 * self.capacity:
+            self._compact()
+        self._log = open(self._log_path, "a")
+        logger.debug("Loaded %d semantic cache entries from %s", len(self._slots), path)
+
+    def _store(self, slot: int, key: str, value, expires: float) -> None:
+        previous = self._keys[slot]
+        if previous is not None and self._slots.get(previous) == slot:
+            del self._slots[previous]
+        self._keys[slot] = key
+        self._words[slot] = key_words(key)
+        self._values[slot] = value
+        self._expires[slot] = expires
+        self._clock += 1
+        self._last_used[slot] = self._clock
+        self._slots[key] = slot
+
+    def _compact(self) -> None:
+        with open(self._log_path + ".tmp", "w") as f:
+            for key, slot in self._slots.items():
+                f.write(json.dumps([slot, key, self._values[slot], self._expires[slot]]) + "\n")
+        os.replace(self._log_path + ".tmp", self._log_path)
+
+    def get(self, key: str) -> tuple:
+        """
+        Returns (found, value, matched_key) for the most similar live entry.
+        """
+        query = embed([key], self.dim, inflection_stem)[0]
+        words = key_words(key)
+        with self._lock:
+            live = np.flatnonzero(self._expires > time.time())
+            if live.size and query.any():
+                scores = self._vectors[live] @ query
+                candidates = np.flatnonzero(scores >= self.threshold)
+                for best in candidates[np.argsort(-scores[candidates], kind="stable")]:
+                    slot = int(live[best])
+                    if not words_match(words, self._words[slot]):
+                        continue
+                    self._clock += 1
+                    self._last_used[slot] = self._clock
+                    self.hits += 1
+                    return True, self._values[slot], self._keys[slot]
+            self.misses += 1
+            return False, None, None
+
+    def put(self, key: str, value) -> None:
+        vector = embed([key], self.dim, inflection_stem)[0]
+        if not vector.any():
+            return
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                # A free or expired row if there is one, else the least recently used.
+                candidates = np.where(self._expires > time.time(), self._last_used, -1.0)
+                slot = int(np.argmin(candidates))
+            self._vectors[slot] = vector
+            expires = time.time() + self.ttl
+            self._store(slot, key, value, expires)
+            if self._log is not None:
+                self._log.write(json.dumps([slot, key, value, expires]) + "\n")
+                self._log.flush()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires > time.time()))
+
+    def stats(self) -> dict:
+        return {"entries": len(self), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+
+_semantic_caches = {}
+
+
+def get_semantic_cache(source: str) -> SemanticCache:
+    """
+    Returns the process-wide semantic cache for `source`, persisted under
+    SEMANTIC_CACHE_PATH (empty keeps it in memory only).
+    """
+    cache = _semantic_caches.get(source)
+    if cache is None:
+        prefix = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache")
+        cache = SemanticCache(
+            path=f"{prefix}.{source}" if prefix else None,
+            capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "2048")),
+            threshold=THRESHOLDS.get(source, DEFAULT_THRESHOLD)
+        )
+        _semantic_caches[source] = cache
+    return cache
+
+
+def semantic_stats() -> dict:
+    return {source: cache.stats() for source, cache in _semantic_caches.items()}
+
+
+def close_semantic_caches() -> None:
+    for cache in _semantic_caches.values():
+        cache.close()
+    _semantic_caches.clear()
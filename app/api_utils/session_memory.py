@@ -0,0 +1,86 @@
+from collections import Counter
+
+from .entities import NAMES, COMPANIES, COURSES, TERMS, empty_entities
+
+ID_PREFIXES = {
+    NAMES: "person",
+    COMPANIES: "company",
+    COURSES: "course",
+    TERMS: "term"
+}
+
+
+def memory_key(entity_key: str, name: str) -> tuple:
+    return entity_key, "".join(name.split()).casefold()
+
+
+class SessionMemory:
+    """
+    Entities one WebSocket session has already enriched and sent.
+
+    Each entity gets a stable id the first time it is seen, e.g. "person-1".
+    `split` separates a window's entities into new ones, which still need
+    enrichment, and repeats, which the client already has (or is about to
+    receive) and are referenced by id only. Failed lookups are forgotten so a
+    later mention retries them under the same id.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._sent = set()
+        self._in_flight = set()
+        self._id_sequences = Counter()
+        self.counters = Counter()
+
+    def entity_id(self, entity_key: str, name: str) -> str:
+        key = memory_key(entity_key, name)
+        entity_id = self._ids.get(key)
+        if entity_id is None:
+            self._id_sequences[entity_key] += 1
+            entity_id = f"{ID_PREFIXES.get(entity_key, 'entity')}-{self._id_sequences[entity_key]}"
+            self._ids[key] = entity_id
+        return entity_id
+
+    def knows(self, entity_key: str, name: str) -> bool:
+        """
+        Whether the entity was already sent, or is being enriched, in this session.
+        """
+        key = memory_key(entity_key, name)
+        return key in self._sent or key in self._in_flight
+
+    def split(self, extracted_entities: dict) -> tuple:
+        """
+        Returns (new_entities, repeated_ids). New entities are marked in flight
+        so concurrent windows mentioning them do not enrich them again.
+        """
+        new_entities = empty_entities()
+        repeated_ids = []
+        for entity_key, names in extracted_entities.items():
+            for name in names:
+                key = memory_key(entity_key, name)
+                if key in self._sent or key in self._in_flight:
+                    repeated_ids.append(self.entity_id(entity_key, name))
+                    self.counters["reused"] += 1
+                else:
+                    self._in_flight.add(key)
+                    new_entities.setdefault(entity_key, []).append(name)
+        return new_entities, repeated_ids
+
+    def record(self, entity_key: str, name: str, resolved: bool = True) -> str:
+        """
+        Marks an entity as sent and returns its id. Unresolved entities are
+        not remembered, so they are looked up again when mentioned next.
+        """
+        key = memory_key(entity_key, name)
+        self._in_flight.discard(key)
+        if resolved:
+            self._sent.add(key)
+            self.counters["enriched"] += 1
+        return self.entity_id(entity_key, name)
+
+    def stats(self) -> dict:
+        return {
+            "known": len(self._sent),
+            "enriched": self.counters["enriched"],
+            "reused": self.counters["reused"]
+        }
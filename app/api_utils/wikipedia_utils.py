@@ -1,29 +1,64 @@
-import requests
+import asyncio
+import logging
+import os
 import re
 
+from .batching import MicroBatcher
+from .cache import cached, ERROR, MISS, HIT
+from .clients import get_async_http, get_http
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_MESSAGE = "Error: Could not fetch Wikipedia information."
+FETCH_ERROR_MESSAGE = "Error: Wikipedia lookup failed."
+# Overridable so tests and benchmarks can point lookups at a local server.
+WIKIPEDIA_BASE_URL = get_settings().wikipedia_base_url
+# MediaWiki returns at most 20 intro extracts per request.
+EXTRACTS_PER_REQUEST = 20
+BATCH_WINDOW_SECONDS = float(os.getenv("WIKIPEDIA_BATCH_WINDOW_SECONDS", "0.005"))
+_SENTENCE_END = re.compile(r'(?<=[.!?。！？‥])\s+')
+
+def wikipedia_outcome(summary: str) -> str:
+    if summary == FETCH_ERROR_MESSAGE:
+        return ERROR
+    return MISS if summary == NOT_FOUND_MESSAGE else HIT
+
+def summary_url(search_term: str, language: str = "en") -> str:
+    return f"{WIKIPEDIA_BASE_URL.format(language=language)}/api/rest_v1/page/summary/{search_term}"
+
+def parse_summary(data: dict):
+    """
+    Pulls the extract out of a REST summary response.
+    Returns "DISAMBIGUATION" for disambiguation pages.
+    """
+    if data.get("type") == "disambiguation":
+        return "DISAMBIGUATION"
+    return data.get("extract", None)
+
+def is_valid_for_company_suffix(query: str) -> bool:
+    return len(query) > 3 and any(c.isalpha() for c in query)
+
+def first_two_sentences(summary: str) -> str:
+    sentences = _SENTENCE_END.split(summary, maxsplit=2)
+    return ' '.join(sentences[:2])
+
+@cached("wikipedia", key=lambda query, language="en": (language, query), classify=wikipedia_outcome)
 def search_wikipedia(query: str, language="en") -> str:
     """
     Searches Wikipedia for a given query and returns the first two sentences of the article.
     If the query fails and seems like a company name, it retries by appending '(company)'.
     """
-    
-    def is_valid_for_company_suffix(query):
-        return len(query) > 3 and any(c.isalpha() for c in query)
 
     def fetch_summary(search_term):
-        url = f"https://{language}.wikipedia.org/api/rest_v1/page/summary/{search_term}"
         try:
-            response = requests.get(url)
+            response = get_http().get(summary_url(search_term, language))
             if response.status_code == 404:
                 return None
             response.raise_for_status()
-            data = response.json()
-            if data.get("type") == "disambiguation":
-                return "DISAMBIGUATION"
-
-            return data.get("extract", None)
+            return parse_summary(response.json())
         except Exception as e:
-            print(f"Error during Wikipedia search for '{search_term}': {e}")
+            logger.warning("Error during Wikipedia search for '%s': %s", search_term, e)
             return None
         
     summary = fetch_summary(query)
@@ -35,9 +70,139 @@ def search_wikipedia(query: str, language="en") -> str:
         summary = fetch_summary(f"{query} (company)")
 
     if summary is None:
-        return "Error: Could not fetch Wikipedia information."
+        return NOT_FOUND_MESSAGE
+
+    return first_two_sentences(summary)
+
+def query_url(language: str = "en") -> str:
+    return f"{WIKIPEDIA_BASE_URL.format(language=language)}/w/api.php"
+
+def build_extracts_params(titles: list) -> dict:
+    """
+    MediaWiki query for the plain-text intro of several pages at once,
+    following redirects and flagging disambiguation pages.
+    """
+    return {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "extracts|pageprops",
+        "ppprop": "disambiguation",
+        "exintro": "1",
+        "explaintext": "1",
+        "exlimit": "max",
+        "redirects": "1",
+        "titles": "|".join(titles)
+    }
+
+def parse_extracts(data: dict, titles: list) -> dict:
+    """
+    Maps each requested title to its intro extract, "DISAMBIGUATION", or None
+    for missing pages, following the normalizations and redirects MediaWiki
+    applied to the titles.
+    """
+    query = data.get("query", {})
+    renamed = {}
+    for step in (query.get("normalized", []), query.get("redirects", [])):
+        for entry in step:
+            renamed[entry["from"]] = entry["to"]
+    pages = {page.get("title"): page for page in query.get("pages", [])}
 
-    sentences = re.split(r'(?<=[.!?。！？‥])\s+', summary)
-    first_two_sentences = ' '.join(sentences[:2])
+    results = {}
+    for title in titles:
+        resolved = title
+        for _ in range(3):
+            if resolved not in renamed:
+                break
+            resolved = renamed[resolved]
+        page = pages.get(resolved)
+        if page is None or page.get("missing") or page.get("invalid"):
+            results[title] = None
+        elif "disambiguation" in page.get("pageprops", {}):
+            results[title] = "DISAMBIGUATION"
+        else:
+            results[title] = page.get("extract") or None
+    return results
 
-    return first_two_sentences
\ No newline at end of file
+async def fetch_extracts_async(titles: list, language: str = "en") -> dict:
+    """
+    Fetches intro extracts for up to EXTRACTS_PER_REQUEST titles in one request.
+    """
+    response = await get_async_http().get(query_url(language), params=build_extracts_params(titles))
+    response.raise_for_status()
+    return parse_extracts(response.json(), titles)
+
+def company_variant(query: str) -> str:
+    return f"{query} (company)"
+
+def choose_summary(query: str, extracts: dict):
+    """
+    Applies the same fallback as search_wikipedia to already-fetched extracts:
+    the "(company)" page replaces a disambiguation page, and a missing page
+    when the query looks like a company name.
+    """
+    summary = extracts.get(query)
+    if summary == "DISAMBIGUATION" or (summary is None and is_valid_for_company_suffix(query)):
+        summary = extracts.get(company_variant(query))
+    if summary is None or summary == "DISAMBIGUATION":
+        return NOT_FOUND_MESSAGE
+    return first_two_sentences(summary)
+
+async def search_wikipedia_batch_async(queries: list, language: str = "en") -> dict:
+    """
+    Resolves many queries with as few requests as possible. Each query's
+    plain title and its "(company)" variant go into the same MediaWiki
+    request, so the fallback costs no extra round-trip; queries beyond one
+    request's extract limit are split across requests that run concurrently.
+    Returns:
+        dict: query -> first two sentences, NOT_FOUND_MESSAGE or FETCH_ERROR_MESSAGE.
+    """
+    queries = list(dict.fromkeys(queries))
+    step = EXTRACTS_PER_REQUEST // 2
+    chunks = [queries[i:i + step] for i in range(0, len(queries), step)]
+    responses = await asyncio.gather(
+        *(fetch_extracts_async([title for q in chunk for title in (q, company_variant(q))], language) for chunk in chunks),
+        return_exceptions=True
+    )
+
+    results = {}
+    for chunk, extracts in zip(chunks, responses):
+        if isinstance(extracts, BaseException):
+            logger.warning("Error during Wikipedia batch search for %s: %s", chunk, extracts)
+            results.update((query, FETCH_ERROR_MESSAGE) for query in chunk)
+        else:
+            results.update((query, choose_summary(query, extracts)) for query in chunk)
+    return results
+
+class WikipediaBatcher(MicroBatcher):
+    """
+    Coalesces single-query lookups made within a few milliseconds of each
+    other into one search_wikipedia_batch_async call per language.
+    """
+
+    async def resolve_many(self, keys: list) -> list:
+        by_language = {}
+        for language, query in keys:
+            by_language.setdefault(language, []).append(query)
+        results = {}
+        for language, summaries in zip(by_language, await asyncio.gather(
+            *(search_wikipedia_batch_async(queries, language) for queries in by_language.values())
+        )):
+            results.update(((language, query), summary) for query, summary in summaries.items())
+        return [results[key] for key in keys]
+
+_batcher = None
+
+def get_wikipedia_batcher() -> WikipediaBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = WikipediaBatcher(BATCH_WINDOW_SECONDS)
+    return _batcher
+
+@cached("wikipedia", key=lambda query, language="en": (language, query), classify=wikipedia_outcome)
+async def search_wikipedia_async(query: str, language="en") -> str:
+    """
+    Async variant of search_wikipedia. Concurrent lookups, e.g. every company
+    in a window, are sent together as one batch request.
+    """
+    return await get_wikipedia_batcher().submit((language, query))
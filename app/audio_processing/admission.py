@@ -0,0 +1,118 @@
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+NORMAL = "normal"
+DEGRADED = "degraded"
+CRITICAL = "critical"
+LEVELS = (NORMAL, DEGRADED, CRITICAL)
+
+
+@dataclass(frozen=True)
+class LoadPolicy:
+    """
+    What a session does per window at one load level.
+    Args:
+        level (str): normal, degraded or critical.
+        hop_scale (float): Multiplier on the streaming hop, so fewer and
+            longer windows are sent to ASR.
+        partials (bool): Whether partial windows are transcribed at all.
+        fast_model (bool): Whether windows may go to the fast fallback model.
+        gpt_extraction (bool): Whether GPT is asked when local extraction
+            is inconclusive.
+        enrichment (bool): Whether people, companies and terms are looked up
+            upstream. Courses come from the local catalog and are always sent.
+    """
+    level: str
+    hop_scale: float
+    partials: bool
+    fast_model: bool
+    gpt_extraction: bool
+    enrichment: bool
+
+
+POLICIES = {
+    NORMAL: LoadPolicy(NORMAL, hop_scale=1.0, partials=True, fast_model=False, gpt_extraction=True, enrichment=True),
+    DEGRADED: LoadPolicy(DEGRADED, hop_scale=2.0, partials=True, fast_model=True, gpt_extraction=False, enrichment=True),
+    CRITICAL: LoadPolicy(CRITICAL, hop_scale=4.0, partials=False, fast_model=True, gpt_extraction=False, enrichment=False)
+}
+
+
+class AdmissionController:
+    """
+    Caps concurrent sessions and maps ASR queue latency to a load level.
+
+    The level rises as soon as the smoothed queue latency crosses
+    `degraded_latency` or `critical_latency` and only falls once it is back
+    under `recovery` times the threshold, so sessions do not flap between
+    policies around a threshold.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 32,
+        degraded_latency: float = 1.5,
+        critical_latency: float = 4.0,
+        recovery: float = 0.5
+    ):
+        self.max_sessions = max_sessions
+        self.thresholds = {DEGRADED: degraded_latency, CRITICAL: critical_latency}
+        self.recovery = recovery
+        self.level = NORMAL
+        self.queue_latency = 0.0
+        self.rejected = 0
+        self.level_changes = 0
+        self._sessions = set()
+
+    @property
+    def policy(self) -> LoadPolicy:
+        return POLICIES[self.level]
+
+    @property
+    def active_sessions(self) -> int:
+        return len(self._sessions)
+
+    def admit(self, session_id: str) -> bool:
+        """
+        Registers a new session. Returns False if the server is full.
+        """
+        if len(self._sessions) >= self.max_sessions:
+            self.rejected += 1
+            logger.warning("Rejecting session %s: %d sessions active", session_id, len(self._sessions))
+            return False
+        self._sessions.add(session_id)
+        return True
+
+    def release(self, session_id: str) -> None:
+        self._sessions.discard(session_id)
+
+    def update(self, queue_latency: float) -> LoadPolicy:
+        """
+        Re-evaluates the load level from the scheduler's queue latency.
+        Returns:
+            LoadPolicy: The policy for the (possibly new) level.
+        """
+        self.queue_latency = queue_latency
+        level = NORMAL
+        for candidate in (DEGRADED, CRITICAL):
+            threshold = self.thresholds[candidate]
+            if LEVELS.index(self.level) >= LEVELS.index(candidate):
+                threshold *= self.recovery
+            if queue_latency >= threshold:
+                level = candidate
+        if level != self.level:
+            logger.warning("Load level %s -> %s (queue latency %.2fs)", self.level, level, queue_latency)
+            self.level = level
+            self.level_changes += 1
+        return self.policy
+
+    def stats(self) -> dict:
+        return {
+            "level": self.level,
+            "queue_latency": self.queue_latency,
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "rejected_sessions": self.rejected,
+            "level_changes": self.level_changes
+        }
@@ -0,0 +1,195 @@
+import importlib
+import os
+from functools import lru_cache
+import numpy as np
+
+from .audio_utils import load_audio_file
+
+NO_SPEECH_THRESHOLD = 0.6
+# One second of near-silent room tone at 16 kHz, shipped with the package.
+WARM_UP_CLIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup.wav")
+
+
+@lru_cache(maxsize=1)
+def warm_up_audio() -> np.ndarray:
+    return load_audio_file(WARM_UP_CLIP)
+
+
+class AsrBackend:
+    """
+    One way of loading and running a Whisper model on CPU.
+
+    `load()` returns a model handle and `transcribe_batch(model, audios, prompts)`
+    has the signature the InferenceScheduler expects, so a backend can be
+    swapped without touching the streaming code. Heavy libraries are imported
+    inside `load()` so only the selected backend needs to be installed.
+    """
+
+    name = "base"
+
+    def __init__(self, model_size: str = "small", threads: int = 0, beam_size: int = None):
+        self.model_size = model_size
+        self.threads = threads
+        self.beam_size = beam_size
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe_batch(self, model, audios: list, prompts: list) -> list:
+        raise NotImplementedError
+
+    def warm_up(self, model) -> None:
+        """
+        Runs the bundled silent clip through the model so kernels, caches
+        and lazy allocations are ready before the first real request.
+        """
+        self.transcribe_batch(model, [warm_up_audio()], [None])
+
+    def describe(self) -> dict:
+        return {
+            "backend": self.name,
+            "model_size": self.model_size,
+            "threads": self.threads,
+            "beam_size": self.beam_size
+        }
+
+
+class WhisperBackend(AsrBackend):
+    """
+    The reference openai-whisper model in fp32 PyTorch, with one batched
+    encoder pass per scheduler batch. With `shared_weights_dir`, weights are
+    memory-mapped from a checkpoint there and shared by every process that
+    serves the same model.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = "small", threads: int = 0, beam_size: int = None, shared_weights_dir: str = None):
+        super().__init__(model_size, threads, beam_size)
+        self.shared_weights_dir = shared_weights_dir
+
+    def _load_torch_model(self):
+        import torch
+        import whisper
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if self.shared_weights_dir:
+            from .shared_weights import load_shared_whisper
+            return load_shared_whisper(self.model_size, self.shared_weights_dir)
+        return whisper.load_model(self.model_size, device="cpu")
+
+    def load(self):
+        return self._load_torch_model()
+
+    def transcribe_batch(self, model, audios: list, prompts: list) -> list:
+        from .whisper_batch import transcribe_batch
+        return transcribe_batch(model, audios, prompts, beam_size=self.beam_size)
+
+    def describe(self) -> dict:
+        description = super().describe()
+        if self.shared_weights_dir:
+            description["shared_weights_dir"] = self.shared_weights_dir
+        return description
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """
+    openai-whisper with its Linear layers dynamically quantized to int8.
+    Weights are stored as int8 and activations are quantized on the fly,
+    which cuts memory per model copy and speeds up the matmul-heavy decoder
+    on CPU. Convolutions and embeddings stay in fp32. The quantized weights
+    are private to each process even when the fp32 ones are shared.
+    """
+
+    name = "whisper-int8"
+
+    def load(self):
+        import torch
+        from whisper.model import Linear as WhisperLinear
+
+        model = self._load_torch_model()
+        # whisper's Linear only adds a dtype cast for fp16; torch's quantizer
+        # matches exact module types, so present those layers as plain Linear.
+        for module in model.modules():
+            if isinstance(module, WhisperLinear):
+                module.__class__ = torch.nn.Linear
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class FasterWhisperBackend(AsrBackend):
+    """
+    CTranslate2 through faster-whisper with int8 weights. Requires the
+    optional `faster-whisper` package. Windows are decoded one at a time,
+    since faster-whisper takes a single initial prompt per call.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = "small", threads: int = 0, beam_size: int = None, compute_type: str = "int8"):
+        super().__init__(model_size, threads, beam_size)
+        self.compute_type = compute_type
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        return WhisperModel(
+            self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads
+        )
+
+    def transcribe_batch(self, model, audios: list, prompts: list) -> list:
+        texts = []
+        for audio, prompt in zip(audios, prompts):
+            segments, _ = model.transcribe(
+                np.asarray(audio, dtype=np.float32),
+                language="en",
+                beam_size=self.beam_size or 1,
+                initial_prompt=prompt,
+                condition_on_previous_text=False,
+                without_timestamps=True,
+                vad_filter=False
+            )
+            texts.append(" ".join(
+                segment.text.strip() for segment in segments
+                if segment.no_speech_prob <= NO_SPEECH_THRESHOLD
+            ).strip())
+        return texts
+
+    def describe(self) -> dict:
+        return dict(super().describe(), compute_type=self.compute_type)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+
+def make_backend(name: str = None) -> AsrBackend:
+    """
+    Builds the ASR backend selected by ASR_BACKEND ("whisper", "whisper-int8"
+    or "faster-whisper", or "module:Class" for an AsrBackend defined
+    elsewhere, such as the benchmarks' stand-in), configured from
+    ASR_MODEL_SIZE, ASR_THREADS (0 keeps the library default) and
+    ASR_BEAM_SIZE (unset means greedy). For the openai-whisper backends,
+    ASR_SHARED_WEIGHTS_DIR memory-maps the weights from a shared checkpoint.
+    """
+    name = name or os.getenv("ASR_BACKEND", "whisper")
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+    elif name.lower() in BACKENDS:
+        backend_class = BACKENDS[name.lower()]
+    else:
+        raise ValueError(f"Unknown ASR_BACKEND {name!r}, expected one of {sorted(BACKENDS)} or module:Class")
+    beam_size = os.getenv("ASR_BEAM_SIZE")
+    options = {}
+    if issubclass(backend_class, WhisperBackend):
+        options["shared_weights_dir"] = os.getenv("ASR_SHARED_WEIGHTS_DIR") or None
+    return backend_class(
+        model_size=os.getenv("ASR_MODEL_SIZE", "small"),
+        threads=int(os.getenv("ASR_THREADS", "0")),
+        beam_size=int(beam_size) if beam_size else None,
+        **options
+    )
@@ -1,11 +1,212 @@
+import logging
+import os
 import tempfile
-from pydub import AudioSegment
-# import noisereduce as nr
+import wave
+from functools import lru_cache
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+SOURCE_SAMPLE_RATE = 44100
+SOURCE_SAMPLE_WIDTH = 4
+TARGET_SAMPLE_RATE = 16000
+
+_FIR_TAPS = 63
+
+
+def pcm_to_float32(pcm: bytes, sample_width: int = SOURCE_SAMPLE_WIDTH, big_endian: bool = False) -> np.ndarray:
+    """
+    Decodes raw signed PCM bytes into float32 samples in the range [-1, 1].
+    Trailing bytes that do not make up a whole sample are ignored.
+    Args:
+        pcm (bytes): Raw mono PCM data, e.g. straight from the WebSocket.
+        sample_width (int): Bytes per sample (2 for int16, 4 for int32).
+        big_endian (bool): Whether the PCM data is in big-endian byte order.
+    Returns:
+        np.ndarray: 1-D float32 array of samples.
+    """
+    dtype = np.dtype(f"{'>' if big_endian else '<'}i{sample_width}")
+    count = len(pcm) // sample_width
+    samples = np.frombuffer(pcm, dtype=dtype, count=count)
+    scale = np.float32(1.0 / (1 << (8 * sample_width - 1)))
+    return samples.astype(np.float32) * scale
+
+
+@lru_cache(maxsize=8)
+def _lowpass_kernel(orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Builds a Hamming-windowed sinc low-pass filter that removes content above
+    the target Nyquist frequency before decimation.
+    """
+    cutoff = 0.45 * target_sr / orig_sr
+    n = np.arange(_FIR_TAPS) - (_FIR_TAPS - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(_FIR_TAPS)
+    kernel /= kernel.sum()
+    return kernel.astype(np.float32)
+
+
+def resample(samples: np.ndarray, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resamples a float32 signal with an anti-aliasing FIR filter followed by
+    vectorized linear interpolation.
+    Args:
+        samples (np.ndarray): 1-D float32 samples at orig_sr.
+        orig_sr (int): Sample rate of the input.
+        target_sr (int): Desired sample rate.
+    Returns:
+        np.ndarray: 1-D float32 samples at target_sr.
+    """
+    if orig_sr == target_sr or samples.size == 0:
+        return samples.astype(np.float32, copy=False)
+
+    if target_sr < orig_sr:
+        samples = np.convolve(samples, _lowpass_kernel(orig_sr, target_sr), mode="same")
+
+    n_out = int(samples.size * target_sr // orig_sr)
+    positions = np.arange(n_out, dtype=np.float64) * (orig_sr / target_sr)
+    resampled = np.interp(positions, np.arange(samples.size), samples)
+    return resampled.astype(np.float32)
+
+
+class StreamResampler:
+    """
+    Incremental `resample`: feeding a signal in pieces and then calling
+    flush() yields the same samples as resampling it in one call. The
+    filter's input history and the read position carry over between
+    pieces, so block edges neither drift nor drop samples.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE):
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self._step = orig_sr / target_sr
+        self._kernel = _lowpass_kernel(orig_sr, target_sr) if target_sr < orig_sr else None
+        self._half = (_FIR_TAPS - 1) // 2 if self._kernel is not None else 0
+        # Unfiltered input, starting `_half` samples before the next sample
+        # to filter; zeros before the stream start, like np.convolve pads.
+        self._raw = np.zeros(self._half, dtype=np.float32)
+        self._filtered = np.zeros(0, dtype=np.float32)
+        self._filtered_start = 0
+        self._received = 0
+        self._emitted = 0
+
+    def _filter(self, samples: np.ndarray) -> None:
+        self._raw = np.concatenate((self._raw, samples))
+        if self._kernel is None:
+            filtered, self._raw = self._raw, self._raw[:0]
+        elif self._raw.size >= _FIR_TAPS:
+            filtered = np.convolve(self._raw, self._kernel, mode="valid")
+            self._raw = self._raw[filtered.size:]
+        else:
+            return
+        self._filtered = np.concatenate((self._filtered, filtered.astype(np.float32, copy=False)))
+
+    def _emit(self, final: bool) -> np.ndarray:
+        end = self._filtered_start + self._filtered.size
+        if final:
+            count = int(self._received * self.target_sr // self.orig_sr)
+        else:
+            count = int(np.ceil((end - 1) / self._step))
+        positions = np.arange(self._emitted, max(count, self._emitted), dtype=np.float64) * self._step
+        if not final:
+            # Only positions whose right neighbour is filtered already.
+            positions = positions[positions < end - 1]
+        if not positions.size:
+            return np.zeros(0, dtype=np.float32)
+        resampled = np.interp(positions - self._filtered_start, np.arange(self._filtered.size), self._filtered)
+        self._emitted += positions.size
+        drop = min(int(self._emitted * self._step), end) - self._filtered_start
+        self._filtered = self._filtered[drop:]
+        self._filtered_start += drop
+        return resampled.astype(np.float32)
+
+    def resample(self, samples: np.ndarray) -> np.ndarray:
+        self._received += samples.size
+        self._filter(samples.astype(np.float32, copy=False))
+        return self._emit(final=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        Resamples the input held back for the filter, padding the end with
+        zeros as `resample` does.
+        """
+        self._filter(np.zeros(self._half, dtype=np.float32))
+        return self._emit(final=True)
+
+
+def decode_pcm(pcm: bytes, big_endian: bool = False) -> np.ndarray:
+    """
+    Converts the client's raw 32-bit 44.1 kHz mono PCM into the 16 kHz float32
+    array Whisper expects, entirely in memory.
+    Args:
+        pcm (bytes): Raw PCM data.
+        big_endian (bool): Whether the PCM data is in big-endian byte order.
+    Returns:
+        np.ndarray: 1-D float32 samples at 16 kHz, ready for model.transcribe.
+    """
+    samples = pcm_to_float32(pcm, SOURCE_SAMPLE_WIDTH, big_endian)
+    return resample(samples, SOURCE_SAMPLE_RATE, TARGET_SAMPLE_RATE)
+
+
+RAW_PCM_EXTENSIONS = (".pcm", ".raw")
+
+
+def load_audio_file(path: str, big_endian: bool = False) -> np.ndarray:
+    """
+    Reads a whole recording into 16 kHz float32 samples, in memory.
+    Raw .pcm/.raw files are taken to be in the client's format and go
+    through decode_pcm like the live stream; 16/32-bit WAV files are read
+    with the standard library; anything else (FLAC, Opus, MP3, M4A, ...)
+    is decoded with PyAV, which must then be installed.
+    Args:
+        path (str): Path to the recording.
+        big_endian (bool): Byte order of raw PCM files.
+    Returns:
+        np.ndarray: 1-D float32 samples at 16 kHz.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in RAW_PCM_EXTENSIONS:
+        with open(path, "rb") as f:
+            return decode_pcm(f.read(), big_endian=big_endian)
+
+    if extension == ".wav":
+        with wave.open(path, "rb") as wav_file:
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            sample_rate = wav_file.getframerate()
+            frames = wav_file.readframes(wav_file.getnframes())
+        if sample_width in (2, 4):
+            samples = pcm_to_float32(frames, sample_width)
+            if channels > 1:
+                samples = samples[:samples.size - samples.size % channels].reshape(-1, channels).mean(axis=1)
+            return resample(samples, sample_rate)
+
+    import av
+    chunks = []
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_SAMPLE_RATE)
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame))
+    chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(None))
+    return np.concatenate(chunks).astype(np.float32, copy=False) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def write_wav(samples: np.ndarray, wav_path: str, sample_rate: int = TARGET_SAMPLE_RATE) -> None:
+    """
+    Writes float32 samples to a 16-bit mono WAV file.
+    """
+    pcm16 = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(wav_path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm16.tobytes())
+
+
 def process_audio(raw_path: str, big_endian: bool = False) -> str:
     """
     Converts raw PCM data to WAV format, with optional byte order adjustment.
+    Kept for callers that still work with files; the live path uses decode_pcm.
     Args:
         raw_path (str): Path to the raw PCM file.
         big_endian (bool): Whether the PCM data is in big-endian byte order.
@@ -13,63 +214,16 @@ def process_audio(raw_path: str, big_endian: bool = False) -> str:
         str: Path to the final WAV file.
     """
     try:
-        if big_endian:
-            print("[DEBUG] Converting PCM data from big-endian to little-endian...")
-            with open(raw_path, 'rb') as f:
-                raw_data = f.read()
-            
-            converted_data = bytearray()
-            for i in range(0, len(raw_data), 4):
-                chunk = raw_data[i:i+4]
-                converted_data.extend(chunk[::-1])
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".raw") as temp_file:
-                temp_file.write(converted_data)
-                temp_file.flush()
-                raw_path = temp_file.name
-            print(f"[DEBUG] Byte order conversion complete: {raw_path}")
-
-        audio_segment = AudioSegment.from_raw(
-            file=raw_path,
-            sample_width=4,
-            frame_rate=44100,
-            channels=1
-        )
-        print("[DEBUG] Successfully parsed raw PCM to AudioSegment")
-
-        print("[DEBUG] Starting resampling...")
-        audio_segment = (
-            audio_segment
-            .set_frame_rate(16000)
-            .set_channels(1)
-            .set_sample_width(2)
-        )
-
-        # samples = np.array(audio_segment.get_array_of_samples())
-        # sr = audio_segment.frame_rate
-        # samples_float = samples.astype(np.float32)
-
-        # reduced_samples = nr.reduce_noise(y=samples_float, sr=sr)
-        # print("[DEBUG] Noise reduction complete.")
-
-        # reduced_int16 = reduced_samples.astype(np.int16)
-
-        # denoised_segment = AudioSegment(
-        #     data=reduced_int16.tobytes(),
-        #     sample_width=2,
-        #     frame_rate=sr,
-        #     channels=1
-        # )
-
-        # audio_segment = denoised_segment
+        with open(raw_path, 'rb') as f:
+            samples = decode_pcm(f.read(), big_endian=big_endian)
 
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as wav_file:
             wav_path = wav_file.name
-        audio_segment.export(wav_path, format="wav")
-        print(f"[DEBUG] Exported PCM to WAV: {wav_path}")
+        write_wav(samples, wav_path)
+        logger.debug("Exported PCM to WAV: %s", wav_path)
 
         return wav_path
 
     except Exception as e:
-        print(f"Error during PCM to WAV conversion: {e}")
-        raise
\ No newline at end of file
+        logger.error("Error during PCM to WAV conversion: %s", e)
+        raise
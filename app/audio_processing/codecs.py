@@ -0,0 +1,220 @@
+import logging
+import numpy as np
+
+from .audio_utils import SOURCE_SAMPLE_RATE, SOURCE_SAMPLE_WIDTH, TARGET_SAMPLE_RATE, StreamResampler, pcm_to_float32
+
+logger = logging.getLogger(__name__)
+
+PCM_S32LE_44K = "pcm_s32le_44k"
+PCM_S16LE_16K = "pcm_s16le_16k"
+FLAC = "flac"
+OPUS = "opus"
+DEFAULT_CODEC = PCM_S32LE_44K
+
+_EMPTY = np.zeros(0, dtype=np.float32)
+
+
+class UnsupportedCodecError(ValueError):
+    pass
+
+
+class PcmStreamDecoder:
+    """
+    Decodes raw little-endian PCM messages into 16 kHz float32 samples.
+    Bytes of a sample split across messages are carried over, and input that
+    needs resampling is collected into blocks of `block_seconds` first so the
+    resampling filter does not run on tiny chunks. The resampler keeps its
+    state between blocks, so the stream decodes to the same samples as
+    `decode_pcm` on the whole recording.
+    """
+
+    def __init__(self, sample_rate: int, sample_width: int, block_seconds: float = 1.0):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._block_bytes = 0 if sample_rate == TARGET_SAMPLE_RATE else int(block_seconds * sample_rate) * sample_width
+        self._resampler = None if sample_rate == TARGET_SAMPLE_RATE else StreamResampler(sample_rate, TARGET_SAMPLE_RATE)
+        self._pending = bytearray()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        self._pending += data
+        if len(self._pending) < max(self._block_bytes, self.sample_width):
+            return _EMPTY
+        return self._drain()
+
+    def flush(self) -> np.ndarray:
+        samples = self._drain() if len(self._pending) >= self.sample_width else _EMPTY
+        if self._resampler is None:
+            return samples
+        return np.concatenate((samples, self._resampler.flush()))
+
+    def _drain(self) -> np.ndarray:
+        usable = len(self._pending) - len(self._pending) % self.sample_width
+        samples = pcm_to_float32(bytes(self._pending[:usable]), self.sample_width)
+        del self._pending[:usable]
+        return samples if self._resampler is None else self._resampler.resample(samples)
+
+
+def _crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def _flac_header_length(data: bytes, start: int) -> int:
+    """
+    Length of the FLAC frame header at `start` (sync code through CRC-8),
+    or 0 if there is no valid header there. -1 if more bytes are needed.
+    """
+    if len(data) - start < 6:
+        return -1
+    if data[start] != 0xFF or data[start + 1] & 0xFE != 0xF8:
+        return 0
+    block_code = data[start + 2] >> 4
+    rate_code = data[start + 2] & 0x0F
+    if block_code == 0 or rate_code == 15 or data[start + 3] & 0x01:
+        return 0
+    # The frame or sample number is UTF-8 coded: the leading ones of its
+    # first byte give its length.
+    first = data[start + 4]
+    number_length = 1 if first < 0x80 else 8 - (first ^ 0xFF).bit_length()
+    if not 1 <= number_length <= 7 or 0x80 <= first < 0xC0:
+        return 0
+    length = 4 + number_length
+    length += {6: 1, 7: 2}.get(block_code, 0)
+    length += {12: 1, 13: 2, 14: 2}.get(rate_code, 0)
+    if len(data) - start < length + 1:
+        return -1
+    return length + 1 if _crc8(data[start:start + length]) == data[start + length] else 0
+
+
+def split_flac_stream(data: bytearray) -> tuple:
+    """
+    Splits the start of a buffered FLAC byte stream.
+    Returns:
+        tuple: (streaminfo, frames, consumed). streaminfo is the 34-byte
+        STREAMINFO block if `data` starts with a complete stream header,
+        frames holds the complete frames found (every frame followed by the
+        start of another), and consumed is how many bytes of `data` those
+        account for.
+    """
+    streaminfo = None
+    position = 0
+    if data[:4] == b"fLaC":
+        position = 4
+        while True:
+            if len(data) < position + 4:
+                return None, b"", 0
+            last = data[position] & 0x80
+            block_type = data[position] & 0x7F
+            length = int.from_bytes(data[position + 1:position + 4], "big")
+            if len(data) < position + 4 + length:
+                return None, b"", 0
+            if block_type == 0:
+                streaminfo = bytes(data[position + 4:position + 4 + length])
+            position += 4 + length
+            if last:
+                break
+
+    start = position
+    last_frame = None
+    scan = start
+    while True:
+        scan = data.find(b"\xff", scan)
+        if scan < 0:
+            break
+        header = _flac_header_length(data, scan)
+        if header < 0:
+            break
+        if header:
+            last_frame = scan
+        scan += 1
+    end = last_frame if last_frame is not None and last_frame > start else start
+    return streaminfo, bytes(data[start:end]), end
+
+
+class AvStreamDecoder:
+    """
+    Decodes FLAC or Opus in-process with PyAV (the optional `av` package)
+    and resamples to 16 kHz mono float32 with a stateful resampler, so
+    packets can be decoded one message at a time without temp files.
+
+    Opus messages are single raw Opus packets. FLAC messages are arbitrary
+    slices of a native FLAC stream starting with its "fLaC" header; frames
+    are decoded as soon as the next frame's header has arrived.
+    """
+
+    def __init__(self, codec: str):
+        try:
+            import av
+        except ImportError as e:
+            raise UnsupportedCodecError(f"{codec} needs the optional 'av' package") from e
+        self._av = av
+        self.codec = codec
+        self._context = av.CodecContext.create(codec, "r")
+        if codec == OPUS:
+            self._context.sample_rate = 48000
+            self._context.layout = "mono"
+        self._resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_SAMPLE_RATE)
+        self._pending = bytearray()
+        self._header_seen = codec != FLAC
+        self.errors = 0
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self.codec == OPUS:
+            return self._decode_packet(data)
+        self._pending += data
+        streaminfo, frames, consumed = split_flac_stream(self._pending)
+        if streaminfo is not None:
+            self._context.extradata = streaminfo
+            self._header_seen = True
+        del self._pending[:consumed]
+        if not frames or not self._header_seen:
+            return _EMPTY
+        return self._decode_packet(frames)
+
+    def flush(self) -> np.ndarray:
+        tail = bytes(self._pending) if self.codec == FLAC and self._header_seen else b""
+        self._pending.clear()
+        return self._decode_packet(tail) if tail else _EMPTY
+
+    def _decode_packet(self, data: bytes) -> np.ndarray:
+        chunks = []
+        try:
+            for frame in self._context.decode(self._av.Packet(data)):
+                for resampled in self._resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+        except self._av.error.FFmpegError as e:
+            # A corrupt packet costs its own audio, not the session.
+            self.errors += 1
+            logger.warning("Dropping undecodable %s packet (%d bytes): %s", self.codec, len(data), e)
+        if not chunks:
+            return _EMPTY
+        return np.concatenate(chunks).astype(np.float32, copy=False)
+
+
+CODECS = (PCM_S32LE_44K, PCM_S16LE_16K, FLAC, OPUS)
+
+
+def make_decoder(codec: str = None, block_seconds: float = 1.0):
+    """
+    Builds the incremental decoder for a codec negotiated at handshake.
+    Args:
+        codec (str): One of CODECS; None or "" selects the raw 32-bit
+            44.1 kHz PCM the macOS client sends.
+        block_seconds (float): Resampling block for 44.1 kHz PCM.
+    Returns:
+        An object whose decode(bytes) returns 16 kHz float32 samples.
+    Raises:
+        UnsupportedCodecError: For unknown codecs, or FLAC/Opus without PyAV.
+    """
+    codec = (codec or DEFAULT_CODEC).lower()
+    if codec == PCM_S32LE_44K:
+        return PcmStreamDecoder(SOURCE_SAMPLE_RATE, SOURCE_SAMPLE_WIDTH, block_seconds)
+    if codec == PCM_S16LE_16K:
+        return PcmStreamDecoder(TARGET_SAMPLE_RATE, 2, block_seconds)
+    if codec in (FLAC, OPUS):
+        return AvStreamDecoder(codec)
+    raise UnsupportedCodecError(f"Unknown codec {codec!r}, expected one of {list(CODECS)}")
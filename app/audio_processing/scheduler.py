@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import numpy as np
+
+from .audio_utils import TARGET_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+# Merged windows must still fit in Whisper's 30 s input.
+MAX_MERGED_SAMPLES = 28 * TARGET_SAMPLE_RATE
+
+
+@dataclass
+class TranscriptionJob:
+    session_id: str
+    audio: np.ndarray
+    prompt: Optional[str]
+    future: asyncio.Future = field(repr=False)
+    is_final: bool = True
+    fast: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class InferenceScheduler:
+    """
+    Runs ASR off the event loop and shares the model(s) between sessions.
+
+    Each model is owned by one worker thread. Sessions submit windows with
+    `transcribe`. Pending windows are queued per session and drained round-robin,
+    at most one window per session per batch, so a busy session cannot starve
+    the others. Each worker runs a whole batch through `transcribe_batch` in
+    one call.
+
+    A session that falls behind does not pile up work: a queued partial
+    window is superseded by the session's next window, and consecutive
+    queued final windows are merged into one decode, served by the later
+    window. Superseded and merged windows resolve to None. Windows marked `fast` may also be served by the
+    optional `fast_models` (e.g. a smaller model size used under load).
+    """
+
+    def __init__(self, models: list, transcribe_batch: Callable, max_batch_size: int = 8, fast_models: list = ()):
+        if not models:
+            raise ValueError("InferenceScheduler needs at least one model")
+        self._models = models
+        self._fast_models = list(fast_models)
+        self._transcribe_batch = transcribe_batch
+        self.max_batch_size = max_batch_size
+        self._pending = OrderedDict()
+        self._wakeup = asyncio.Condition()
+        self._executor = None
+        self._workers = []
+        self.batches_run = 0
+        self.windows_run = 0
+        self.counters = Counter()
+        # Smoothed seconds a window waits in the queue before a worker takes it.
+        self.queue_latency = 0.0
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self._models) + len(self._fast_models),
+            thread_name_prefix="asr-worker"
+        )
+        self._workers = [
+            asyncio.create_task(self._worker(model, fast_only=False)) for model in self._models
+        ] + [
+            asyncio.create_task(self._worker(model, fast_only=True)) for model in self._fast_models
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for session_id in list(self._pending):
+            self.drop_session(session_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def session_queue_depth(self, session_id: str) -> int:
+        return len(self._pending.get(session_id, ()))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "sessions_waiting": len(self._pending),
+            "workers": len(self._workers),
+            "fast_workers": len(self._fast_models),
+            "batches_run": self.batches_run,
+            "windows_run": self.windows_run,
+            "avg_batch_size": self.windows_run / self.batches_run if self.batches_run else 0.0,
+            "queue_latency": self.queue_latency,
+            **self.counters
+        }
+
+    async def transcribe(
+        self,
+        session_id: str,
+        audio: np.ndarray,
+        prompt: Optional[str] = None,
+        is_final: bool = True,
+        fast: bool = False,
+        overlap: int = 0
+    ) -> Optional[str]:
+        """
+        Queues a window for transcription and waits for its text.
+        Args:
+            is_final (bool): Partial windows are dropped when a newer window
+                of the same session arrives before they start.
+            fast (bool): Allow the fast models to serve this window.
+            overlap (int): Leading samples that repeat the end of the
+                session's previous window, left out when the two are merged.
+        Returns:
+            str: The text, or None if the window was superseded or merged
+            into a later one.
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = TranscriptionJob(session_id, audio, prompt, future, is_final, fast)
+        async with self._wakeup:
+            jobs = self._pending.setdefault(session_id, deque())
+            while jobs and not jobs[-1].is_final:
+                self._resolve_skipped(jobs.pop(), "superseded")
+            overlap = min(overlap, audio.size)
+            if jobs and is_final and jobs[-1].audio.size + audio.size - overlap <= MAX_MERGED_SAMPLES:
+                # The later window takes over the queued one, so its text is
+                # reported with the later stream position.
+                previous = jobs[-1]
+                job.audio = np.concatenate((previous.audio, audio[overlap:]))
+                job.fast = previous.fast or fast
+                job.enqueued_at = previous.enqueued_at
+                jobs[-1] = job
+                self._resolve_skipped(previous, "merged")
+            else:
+                jobs.append(job)
+            # Fast-only workers wait on the same condition, so a single
+            # notify could wake one that cannot take this window.
+            self._wakeup.notify_all()
+        return await future
+
+    def _resolve_skipped(self, job: TranscriptionJob, reason: str) -> None:
+        self.counters[reason] += 1
+        if not job.future.done():
+            job.future.set_result(None)
+
+    def drop_session(self, session_id: str) -> None:
+        """
+        Cancels every window a session still has queued, e.g. on disconnect.
+        """
+        for job in self._pending.pop(session_id, ()):
+            if not job.future.done():
+                job.future.cancel()
+
+    def _has_work(self, fast_only: bool) -> bool:
+        if not fast_only:
+            return bool(self._pending)
+        return any(jobs[0].fast for jobs in self._pending.values())
+
+    def _take_batch(self, fast_only: bool = False) -> list:
+        batch = []
+        now = time.monotonic()
+        for session_id in list(self._pending):
+            if len(batch) >= self.max_batch_size:
+                break
+            jobs = self._pending[session_id]
+            if fast_only and not jobs[0].fast:
+                continue
+            del self._pending[session_id]
+            job = jobs.popleft()
+            if jobs:
+                # Re-queue behind the sessions that were not served this round.
+                self._pending[session_id] = jobs
+            if not job.future.done():
+                self.queue_latency = 0.8 * self.queue_latency + 0.2 * (now - job.enqueued_at)
+                batch.append(job)
+        return batch
+
+    async def _worker(self, model, fast_only: bool = False) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._has_work(fast_only))
+                batch = self._take_batch(fast_only)
+                if self._pending:
+                    # Another worker may be able to take what this one skipped.
+                    self._wakeup.notify_all()
+            if not batch:
+                continue
+
+            try:
+                texts = await loop.run_in_executor(
+                    self._executor,
+                    self._transcribe_batch,
+                    model,
+                    [job.audio for job in batch],
+                    [job.prompt for job in batch]
+                )
+            except Exception as e:
+                logger.exception("Error during batched transcription")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.windows_run += len(batch)
+            for job, text in zip(batch, texts):
+                if not job.future.done():
+                    job.future.set_result(text)
@@ -0,0 +1,55 @@
+import fcntl
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def shared_weights_path(directory: str, model_size: str) -> str:
+    return os.path.join(directory, f"whisper-{model_size}.pt")
+
+
+def export_whisper_weights(model_size: str, path: str) -> None:
+    """
+    Writes the openai-whisper checkpoint for `model_size` as a plain
+    {"dims", "state_dict"} file that torch can memory-map.
+    """
+    from dataclasses import asdict
+    import torch
+    import whisper
+
+    model = whisper.load_model(model_size, device="cpu")
+    tmp_path = f"{path}.tmp"
+    torch.save({"dims": asdict(model.dims), "state_dict": model.state_dict()}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_shared_whisper(model_size: str, directory: str):
+    """
+    Returns a Whisper model whose parameters are views of a memory-mapped
+    checkpoint in `directory`. Inference only reads the weights, so every
+    process (and every model copy in a process) that maps the same file
+    shares one copy in the page cache. The first process to get here
+    exports the checkpoint; the others wait on a file lock.
+    """
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    os.makedirs(directory, exist_ok=True)
+    path = shared_weights_path(directory, model_size)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            logger.info("Exporting whisper %s weights to %s", model_size, path)
+            export_whisper_weights(model_size, path)
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    # assign=True keeps the mapped tensors instead of copying them into the
+    # freshly initialized parameters, which are freed.
+    model.load_state_dict(checkpoint["state_dict"], assign=True)
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_size)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return model.eval()
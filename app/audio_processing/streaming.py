@@ -0,0 +1,242 @@
+import re
+import numpy as np
+
+from .audio_utils import TARGET_SAMPLE_RATE
+from .vad import last_pause, speech_bounds
+
+
+class RingBuffer:
+    """
+    Fixed-capacity circular buffer of float32 samples that keeps the most
+    recent audio and drops the oldest once full.
+    """
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._data.size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, samples: np.ndarray) -> None:
+        capacity = self._data.size
+        if samples.size >= capacity:
+            self._data[:] = samples[-capacity:]
+            self._start = 0
+            self._size = capacity
+            return
+
+        end = (self._start + self._size) % capacity
+        first = min(samples.size, capacity - end)
+        self._data[end:end + first] = samples[:first]
+        self._data[:samples.size - first] = samples[first:]
+
+        overflow = max(0, self._size + samples.size - capacity)
+        self._start = (self._start + overflow) % capacity
+        self._size = min(capacity, self._size + samples.size)
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Returns a contiguous copy of the buffered samples, oldest first.
+        """
+        end = self._start + self._size
+        if end <= self._data.size:
+            return self._data[self._start:end].copy()
+        return np.concatenate((self._data[self._start:], self._data[:end - self._data.size]))
+
+    def keep_last(self, count: int) -> None:
+        """
+        Discards everything except the newest `count` samples.
+        """
+        count = min(count, self._size)
+        self._start = (self._start + self._size - count) % self._data.size
+        self._size = count
+
+
+_WORD_RE = re.compile(r"[^\w']+")
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_RE.sub("", word.lower())
+
+
+MERGE_MAX_WORDS = 16
+
+
+def merge_overlap(previous: str, new: str, max_words: int = MERGE_MAX_WORDS) -> str:
+    """
+    Removes the leading words of `new` that repeat the tail of `previous`.
+    Whisper transcribes the overlapped audio twice, so the start of each
+    window usually restates the end of the last committed text.
+    Args:
+        previous (str): Text that has already been sent to the client.
+        new (str): Transcription of the latest window.
+        max_words (int): Longest overlap to look for.
+    Returns:
+        str: The part of `new` that has not been emitted yet.
+    """
+    prev_words = [_normalize_word(w) for w in previous.split()]
+    new_raw = new.split()
+    new_words = [_normalize_word(w) for w in new_raw]
+
+    for k in range(min(max_words, len(prev_words), len(new_words)), 0, -1):
+        if prev_words[-k:] == new_words[:k]:
+            return " ".join(new_raw[k:])
+    return " ".join(new_raw)
+
+
+class StreamingTranscriber:
+    """
+    Sliding-window transcription state for one audio stream.
+
+    Audio is fed in as 16 kHz float32 samples. Every `hop_seconds` a window
+    is ready: while the window is still filling it yields a partial result,
+    and once `window_seconds` of audio has built up it yields a final result,
+    after which only the last `overlap_seconds` are kept so words that
+    straddle the boundary are heard again by the next window.
+
+    With a `vad`, windows without speech are skipped, leading and trailing
+    silence is trimmed, and windows are closed at speech pauses: a pause of
+    `pause_seconds` after at least `min_final_seconds` of audio finalizes
+    early, and a full window is cut at its last pause instead of mid-word.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 10.0,
+        hop_seconds: float = 1.0,
+        overlap_seconds: float = 1.0,
+        prompt_chars: int = 200,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        vad=None,
+        pause_seconds: float = 0.6,
+        min_speech_seconds: float = 0.3,
+        min_final_seconds: float = 2.0
+    ):
+        if not 0 <= overlap_seconds < window_seconds:
+            raise ValueError("overlap_seconds must be smaller than window_seconds")
+        self.hop_samples = int(hop_seconds * sample_rate)
+        self.overlap_samples = int(overlap_seconds * sample_rate)
+        self.prompt_chars = prompt_chars
+        self.vad = vad
+        self.pause_samples = int(pause_seconds * sample_rate)
+        self.min_speech_samples = int(min_speech_seconds * sample_rate)
+        self.min_final_samples = int(min_final_seconds * sample_rate)
+        self.silent_windows = 0
+        self._buffer = RingBuffer(int(window_seconds * sample_rate))
+        self._since_hop = 0
+        # Only the tail of the transcript is needed for prompts and overlap
+        # merging; callers keep the full text from what `accept` returns.
+        self._tail = ""
+        self._sample_rate = sample_rate
+        self._samples_fed = 0
+        # Samples at the start of the buffer that the last final window sent.
+        self._carried = 0
+        # Leading samples of the latest window that repeat the end of the
+        # previous final one; dropped when the two are merged into one decode.
+        self.repeated_samples = 0
+
+    @property
+    def committed_text(self) -> str:
+        """
+        The end of the committed transcript, as much as prompts and overlap
+        merging need.
+        """
+        return self._tail
+
+    @property
+    def stream_seconds(self) -> float:
+        """
+        Seconds of audio fed since the stream started, i.e. the stream
+        position where the latest window ends.
+        """
+        return self._samples_fed / self._sample_rate
+
+    def feed(self, samples: np.ndarray) -> None:
+        self._buffer.extend(samples)
+        self._since_hop += samples.size
+        self._samples_fed += samples.size
+
+    def ready(self) -> bool:
+        return self._since_hop >= self.hop_samples
+
+    def next_window(self) -> tuple:
+        """
+        Takes the current window for transcription.
+        Returns:
+            tuple: (audio, initial_prompt, is_final). initial_prompt is the
+            tail of the committed text, or None at the start of a stream.
+            audio is None when the VAD found no speech and the window
+            should not be transcribed at all.
+        """
+        self._since_hop = 0
+        audio = self._buffer.snapshot()
+        is_final = len(self._buffer) >= self._buffer.capacity
+        prompt = self._tail[-self.prompt_chars:] or None
+
+        if self.vad is None:
+            self.repeated_samples = self._carried
+            if is_final:
+                self._carried = min(self.overlap_samples, audio.size)
+                self._buffer.keep_last(self.overlap_samples)
+            return audio, prompt, is_final
+
+        frame = self.vad.frame_samples
+        speech = self.vad.speech_frames(audio)
+        if np.count_nonzero(speech) * frame < self.min_speech_samples:
+            if is_final:
+                self._carried = 0
+                self._buffer.keep_last(self.overlap_samples)
+            self.repeated_samples = 0
+            self.silent_windows += 1
+            return None, prompt, is_final
+
+        cut = audio.size
+        pause = last_pause(speech, frame, max(1, self.pause_samples // frame))
+        if pause is not None:
+            pause_start, pause_end = pause
+            if pause_end >= speech.size * frame and pause_start >= self.min_final_samples:
+                is_final = True
+                cut = pause_start
+            elif is_final and pause_start >= audio.size // 2:
+                cut = pause_start
+
+        kept = speech[:-(-cut // frame)]
+        start, end = speech_bounds(kept, frame)
+        if end >= kept.size * frame:
+            end = cut
+        end = min(end, cut)
+        self.repeated_samples = max(0, min(self._carried, end) - start)
+
+        if is_final:
+            if cut < audio.size:
+                # A cut inside a pause splits no words, so no overlap is needed.
+                self._buffer.keep_last(audio.size - cut)
+                self._carried = 0
+            else:
+                self._buffer.keep_last(self.overlap_samples)
+                kept_start = audio.size - min(self.overlap_samples, audio.size)
+                self._carried = max(0, end - kept_start) if start <= kept_start else 0
+        return audio[start:end], prompt, is_final
+
+    def accept(self, text: str, is_final: bool) -> str:
+        """
+        Records the transcription of a window taken with next_window.
+        Returns:
+            str: The de-duplicated text to show the client.
+        """
+        text = merge_overlap(self._tail, text.strip())
+        if is_final and text:
+            words = f"{self._tail} {text}".split()
+            # Keep enough words for both the prompt and the overlap merge.
+            keep, chars = 0, 0
+            while keep < len(words) and (keep < MERGE_MAX_WORDS or chars < self.prompt_chars):
+                keep += 1
+                chars += len(words[-keep]) + 1
+            self._tail = " ".join(words[-keep:]) if keep else ""
+        return text
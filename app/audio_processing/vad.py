@@ -0,0 +1,176 @@
+import logging
+import os
+import numpy as np
+
+from .audio_utils import TARGET_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+
+
+class EnergyVAD:
+    """
+    Voice-activity detection from short-time energy and zero-crossing rate.
+
+    A frame counts as speech when its energy is `margin_db` above the noise
+    floor (and above `min_energy_db`). Frames that are only slightly louder
+    than the threshold must also have a zero-crossing rate typical of speech.
+    Each speech frame is extended by `hangover_frames` so short gaps inside
+    words are not treated as pauses.
+
+    The noise floor is tracked by minimum statistics: it is the energy of the
+    quietest frame in the last `noise_window_seconds`, speech or not, so
+    steady noise such as hum or fan hiss becomes the floor however loud it
+    is, while speech, which always has quieter gaps, does not. Until that
+    much audio has been seen, the floor is at most `min_energy_db -
+    margin_db`. The floor is tracked across calls, so create one instance
+    per audio stream.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        frame_ms: int = FRAME_MS,
+        min_energy_db: float = -50.0,
+        margin_db: float = 12.0,
+        max_zcr: float = 0.35,
+        hangover_frames: int = 6,
+        noise_window_seconds: float = 3.0
+    ):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.min_energy_db = min_energy_db
+        self.margin_db = margin_db
+        self.max_zcr = max_zcr
+        self.hangover_frames = hangover_frames
+        self.noise_floor_db = min_energy_db - margin_db
+        # Energies of the latest frames, starting out at the assumed floor.
+        self._recent_db = np.full(max(1, int(noise_window_seconds * 1000 / frame_ms)), self.noise_floor_db)
+
+    def _raw_speech_frames(self, frames: np.ndarray) -> np.ndarray:
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+
+        window = self._recent_db.size
+        history = np.concatenate((self._recent_db, energy_db))
+        # The floor at each frame: the quietest frame in the window ending there.
+        floors = np.lib.stride_tricks.sliding_window_view(history, window).min(axis=1)[1:]
+        self._recent_db = history[-window:]
+        self.noise_floor_db = float(floors[-1])
+
+        threshold = np.maximum(self.min_energy_db, floors + self.margin_db)
+        return (energy_db > threshold) & ((zcr < self.max_zcr) | (energy_db > threshold + 10))
+
+    def speech_frames(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Returns one boolean per `frame_ms` frame of audio, True for speech.
+        """
+        count = audio.size // self.frame_samples
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+        frames = audio[:count * self.frame_samples].reshape(count, self.frame_samples)
+        speech = self._raw_speech_frames(frames)
+        if self.hangover_frames:
+            spread = np.convolve(speech, np.ones(self.hangover_frames + 1), mode="full")[:count]
+            speech = spread > 0
+        return speech
+
+
+class WebRtcVAD(EnergyVAD):
+    """
+    Uses the small webrtcvad model for the per-frame decision, with the same
+    framing and hangover as EnergyVAD. Requires the optional `webrtcvad` package.
+    """
+
+    def __init__(self, aggressiveness: int = 2, **kwargs):
+        import webrtcvad
+        super().__init__(**kwargs)
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def _raw_speech_frames(self, frames: np.ndarray) -> np.ndarray:
+        pcm = (np.clip(frames, -1.0, 1.0) * 32767).astype("<i2")
+        return np.array([self._vad.is_speech(frame.tobytes(), self.sample_rate) for frame in pcm], dtype=bool)
+
+
+def make_vad(backend: str = None):
+    """
+    Builds a VAD for one stream. VAD_BACKEND selects "energy" (default),
+    "webrtc" or "off". "webrtc" falls back to "energy" when webrtcvad is
+    not installed.
+    """
+    backend = (backend or os.getenv("VAD_BACKEND", "energy")).lower()
+    if backend == "off":
+        return None
+    if backend == "webrtc":
+        try:
+            return WebRtcVAD(int(os.getenv("VAD_AGGRESSIVENESS", "2")))
+        except ImportError:
+            logger.warning("webrtcvad is not installed, falling back to the energy VAD")
+    return EnergyVAD()
+
+
+def speech_bounds(speech: np.ndarray, frame_samples: int, padding_frames: int = 3) -> tuple:
+    """
+    Returns (start, end) sample offsets around the speech frames, padded by a
+    few frames on each side, or None if there is no speech.
+    """
+    active = np.flatnonzero(speech)
+    if active.size == 0:
+        return None
+    start = max(0, active[0] - padding_frames) * frame_samples
+    end = min(speech.size, active[-1] + 1 + padding_frames) * frame_samples
+    return start, end
+
+
+def last_pause(speech: np.ndarray, frame_samples: int, min_pause_frames: int) -> tuple:
+    """
+    Returns (start, end) sample offsets of the last run of at least
+    min_pause_frames silent frames, or None if there is no such pause.
+    """
+    silent = np.concatenate(([False], ~speech, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    long_runs = np.flatnonzero(ends - starts >= min_pause_frames)
+    if long_runs.size == 0:
+        return None
+    run = long_runs[-1]
+    return starts[run] * frame_samples, ends[run] * frame_samples
+
+
+def speech_segments(
+    speech: np.ndarray,
+    frame_samples: int,
+    min_pause_frames: int,
+    max_segment_frames: int,
+    padding_frames: int = 3
+) -> list:
+    """
+    Splits a whole recording into (start, end) sample ranges for offline
+    transcription. Speech separated by pauses of at least min_pause_frames
+    is packed into segments of up to max_segment_frames, so each segment
+    ends in a pause; a single run of speech longer than that is cut hard.
+    """
+    voiced = np.concatenate(([False], speech, [False]))
+    edges = np.flatnonzero(np.diff(voiced.astype(np.int8)))
+    runs = list(zip(edges[0::2], edges[1::2]))
+    # Bridge pauses too short to split on.
+    regions = []
+    for start, end in runs:
+        if regions and start - regions[-1][1] < min_pause_frames:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    segments = []
+    for start, end in regions:
+        if segments and end - segments[-1][0] <= max_segment_frames:
+            segments[-1][1] = end
+            continue
+        for cut in range(start, end, max_segment_frames):
+            segments.append([cut, min(end, cut + max_segment_frames)])
+
+    return [
+        (max(0, start - padding_frames) * frame_samples, min(speech.size, end + padding_frames) * frame_samples)
+        for start, end in segments
+    ]
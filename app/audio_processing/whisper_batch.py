@@ -0,0 +1,47 @@
+import numpy as np
+import torch
+import whisper
+
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+def transcribe_batch(model, audios: list, prompts: list, beam_size: int = None) -> list:
+    """
+    Transcribes several <=30 s windows with a single mel/encoder pass.
+    The encoder runs once over the stacked batch; each window is then decoded
+    on its own so it can keep its session's initial prompt.
+    Args:
+        model: A loaded openai-whisper model.
+        audios (list): 16 kHz float32 arrays, one per window.
+        prompts (list): Initial prompt (or None) for each window.
+        beam_size (int): Beam width, or None for greedy decoding.
+    Returns:
+        list: The transcription text for each window, in order.
+    """
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)),
+            model.dims.n_mels
+        )
+        for audio in audios
+    ]).to(model.device)
+
+    with torch.no_grad():
+        features = model.embed_audio(mels)
+
+    texts = []
+    for audio_features, prompt in zip(features, prompts):
+        options = whisper.DecodingOptions(
+            language="en",
+            fp16=False,
+            prompt=prompt,
+            beam_size=beam_size,
+            without_timestamps=True
+        )
+        result = whisper.decode(model, audio_features, options)
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            texts.append("")
+        else:
+            texts.append(result.text.strip())
+    return texts
@@ -0,0 +1,341 @@
+"""
+Offline transcription and enrichment of recorded meetings.
+
+    python -m app.batch recordings/ extra.wav --workers 8 --output results.jsonl
+
+Each file is split into speech segments with the VAD and the segments are
+transcribed across a process pool with one ASR model per worker. Entities
+are extracted per segment like on the live path, then de-duplicated across
+the whole corpus before anything is looked up upstream, so a name mentioned
+in fifty meetings is enriched once. Results are emitted as JSON lines:
+"transcript", "entities" and "error" records per file as files finish,
+then one "enrichment" record per unique entity and a final "summary".
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from .audio_processing.audio_utils import RAW_PCM_EXTENSIONS, TARGET_SAMPLE_RATE, load_audio_file
+from .audio_processing.asr_backends import make_backend
+from .audio_processing.vad import EnergyVAD, speech_segments
+from .api_utils.cache import get_cache
+from .api_utils.semantic_cache import close_semantic_caches
+from .api_utils.clients import close_async_clients
+from .api_utils.gpt_utils import extract_entities_with_gpt_async
+from .api_utils.local_extractor import get_local_extractor, merge_entities
+from .api_utils.session_memory import SessionMemory
+from .enrichment import enrich_entities, is_resolved
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = RAW_PCM_EXTENSIONS + (".wav", ".flac", ".opus", ".ogg", ".mp3", ".m4a")
+BATCH_SEGMENT_SECONDS = float(os.getenv("BATCH_SEGMENT_SECONDS", "25"))
+BATCH_PAUSE_SECONDS = float(os.getenv("BATCH_PAUSE_SECONDS", "0.5"))
+# Segments sent to a worker per call; one call is one transcribe_batch.
+BATCH_WINDOWS_PER_TASK = int(os.getenv("BATCH_WINDOWS_PER_TASK", "8"))
+BATCH_GPT_CONCURRENCY = int(os.getenv("BATCH_GPT_CONCURRENCY", "8"))
+# Directory that jobs started over REST may read from; unset disables them.
+BATCH_INPUT_ROOT = os.getenv("BATCH_INPUT_ROOT", "")
+# Finished REST jobs are kept this long, and at most this many jobs in total.
+BATCH_JOB_TTL_SECONDS = float(os.getenv("BATCH_JOB_TTL_SECONDS", "3600"))
+MAX_BATCH_JOBS = int(os.getenv("MAX_BATCH_JOBS", "32"))
+# Each running job has its own process pool, by default one process per core.
+MAX_RUNNING_BATCH_JOBS = int(os.getenv("MAX_RUNNING_BATCH_JOBS", "1"))
+
+_worker_backend = None
+_worker_model = None
+
+
+def _init_worker(threads: int) -> None:
+    global _worker_backend, _worker_model
+    _worker_backend = make_backend()
+    if not _worker_backend.threads:
+        _worker_backend.threads = threads
+    _worker_model = _worker_backend.load()
+
+
+def _transcribe_windows(windows: list) -> list:
+    return _worker_backend.transcribe_batch(_worker_model, windows, [None] * len(windows))
+
+
+def _is_under(path: str, root: str) -> bool:
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+def resolve_input_paths(paths: list, root: str) -> list:
+    """
+    Resolves request paths relative to `root`, following symlinks.
+    Raises:
+        ValueError: If a path resolves to somewhere outside `root`.
+    """
+    root = os.path.realpath(root)
+    resolved = []
+    for path in paths:
+        full_path = os.path.realpath(os.path.join(root, path))
+        if not _is_under(full_path, root):
+            raise ValueError(f"{path!r} is outside the batch input directory")
+        resolved.append(full_path)
+    return resolved
+
+
+def collect_files(paths: list, root: str = None) -> list:
+    """
+    Expands directories (recursively) into the audio files they contain.
+    With a `root`, files that link to somewhere outside it are skipped.
+    """
+    root = os.path.realpath(root) if root else None
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(directory, name) for name in sorted(names)
+                    if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS
+                )
+        else:
+            files.append(path)
+    if root is not None:
+        outside = [path for path in files if not _is_under(path, root)]
+        if outside:
+            logger.warning("Skipping %d files outside %s", len(outside), root)
+            files = [path for path in files if path not in outside]
+    return files
+
+
+def split_recording(samples) -> list:
+    """
+    Returns the (start, end) sample ranges of a recording worth transcribing.
+    """
+    vad = EnergyVAD()
+    frame = vad.frame_samples
+    return speech_segments(
+        vad.speech_frames(samples),
+        frame,
+        min_pause_frames=max(1, int(BATCH_PAUSE_SECONDS * TARGET_SAMPLE_RATE) // frame),
+        max_segment_frames=int(BATCH_SEGMENT_SECONDS * TARGET_SAMPLE_RATE) // frame
+    )
+
+
+async def _extract(text: str, gpt_slots: asyncio.Semaphore) -> dict:
+    local = get_local_extractor().extract(text)
+    if local.conclusive:
+        return local.entities
+    async with gpt_slots:
+        return merge_entities(local.entities, await extract_entities_with_gpt_async(text))
+
+
+async def process_corpus(paths: list, workers: int = None, root: str = None):
+    """
+    Transcribes and enriches every recording under `paths`, yielding result
+    records (dicts) as they become available.
+    Args:
+        paths (list): Audio files and/or directories.
+        workers (int): ASR processes; defaults to the number of cores.
+        root (str): Only read files inside this directory.
+    """
+    started = time.perf_counter()
+    files = collect_files(paths, root)
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    gpt_slots = asyncio.Semaphore(BATCH_GPT_CONCURRENCY)
+    # Bounds how many decoded recordings are held in memory at once.
+    load_slots = asyncio.Semaphore(2 * workers)
+    corpus_entities = []
+    audio_seconds = 0.0
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(max(1, (os.cpu_count() or 1) // workers),)
+    )
+
+    async def transcribe_file(path: str) -> tuple:
+        async with load_slots:
+            samples = await asyncio.to_thread(load_audio_file, path)
+            segments = await asyncio.to_thread(split_recording, samples)
+            tasks = [
+                loop.run_in_executor(pool, _transcribe_windows, [samples[start:end] for start, end in chunk])
+                for chunk in (
+                    segments[i:i + BATCH_WINDOWS_PER_TASK] for i in range(0, len(segments), BATCH_WINDOWS_PER_TASK)
+                )
+            ]
+            duration = samples.size / TARGET_SAMPLE_RATE
+            del samples
+            texts = [text for batch in await asyncio.gather(*tasks) for text in batch]
+        entities = await asyncio.gather(*(_extract(text, gpt_slots) for text in texts if text))
+        return path, duration, segments, texts, entities
+
+    async def guarded(path: str):
+        try:
+            return await transcribe_file(path)
+        except Exception as e:
+            logger.exception("Failed to process %s", path)
+            return path, e
+
+    memory = SessionMemory()
+    try:
+        for finished in asyncio.as_completed([guarded(path) for path in files]):
+            outcome = await finished
+            if len(outcome) == 2:
+                path, error = outcome
+                yield {"type": "error", "file": path, "message": str(error)}
+                continue
+            path, duration, segments, texts, entities = outcome
+            audio_seconds += duration
+            found = iter(entities)
+            for (start, end), text in zip(segments, texts):
+                if not text:
+                    continue
+                segment_entities = next(found)
+                corpus_entities.append(segment_entities)
+                span = {"file": path, "start": start / TARGET_SAMPLE_RATE, "end": end / TARGET_SAMPLE_RATE}
+                yield dict(span, type="transcript", text=text)
+                ids = [
+                    memory.entity_id(entity_key, name)
+                    for entity_key, names in segment_entities.items() for name in names
+                ]
+                if ids:
+                    yield dict(span, type="entities", ids=ids)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    unique_entities, _ = memory.split(merge_entities(*corpus_entities))
+    enriched = 0
+    async for payload_key, entity_key, entity, result in enrich_entities(unique_entities):
+        entity_id = memory.record(entity_key, entity, is_resolved(result))
+        enriched += 1
+        yield {"type": "enrichment", "id": entity_id, payload_key: [dict(result, id=entity_id)]}
+
+    wall = time.perf_counter() - started
+    yield {
+        "type": "summary",
+        "files": len(files),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "realtime_factor": audio_seconds / wall if wall else None,
+        "mentions": sum(len(names) for entities in corpus_entities for names in entities.values()),
+        "unique_entities": enriched
+    }
+
+
+class BatchJob:
+    """
+    A corpus run started through the REST endpoint. Records are kept in
+    memory so clients can stream them while the job runs and fetch them
+    again afterwards.
+    """
+
+    def __init__(self, paths: list, workers: int = None, root: str = None):
+        self.id = uuid.uuid4().hex
+        self.paths = paths
+        self.workers = workers
+        self.root = root
+        self.status = "pending"
+        self.records = []
+        self.error = None
+        self.finished_at = None
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def start(self) -> "BatchJob":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def _run(self) -> None:
+        self.status = "running"
+        try:
+            async for record in process_corpus(self.paths, self.workers, self.root):
+                self.records.append(record)
+                self._notify()
+            self.status = "done"
+        except Exception as e:
+            logger.exception("Batch job %s failed", self.id)
+            self.status = "failed"
+            self.error = str(e)
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    async def stream_jsonl(self):
+        """
+        Yields every record as a JSON line, waiting for new ones until the
+        job finishes.
+        """
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.records):
+                yield json.dumps(self.records[sent]) + "\n"
+                sent += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "files": self.paths,
+            "records": len(self.records),
+            "error": self.error
+        }
+
+
+def evict_finished_jobs(jobs: dict, max_jobs: int = MAX_BATCH_JOBS, ttl: float = BATCH_JOB_TTL_SECONDS) -> None:
+    """
+    Drops finished jobs from `jobs` ({id: BatchJob}) once they are older
+    than `ttl`, and the oldest finished ones while there are more than
+    `max_jobs`. Running jobs are kept.
+    """
+    now = time.monotonic()
+    excess = len(jobs) - max_jobs
+    for job in sorted((job for job in jobs.values() if job.finished), key=lambda job: job.finished_at):
+        if excess > 0 or now - job.finished_at > ttl:
+            del jobs[job.id]
+            excess -= 1
+
+
+async def _write_jsonl(paths: list, workers: int, output) -> None:
+    try:
+        async for record in process_corpus(paths, workers):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        await close_async_clients()
+        get_cache().close()
+        close_semantic_caches()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe and enrich recorded meetings offline.")
+    parser.add_argument("paths", nargs="+", help="audio files or directories")
+    parser.add_argument("--workers", type=int, default=None, help="ASR processes (default: one per core)")
+    parser.add_argument("--output", help="JSONL file to write (default: stdout)")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        asyncio.run(_write_jsonl(args.paths, args.workers, output))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
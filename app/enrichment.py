@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .api_utils.gpt_enrichment import get_person_summary_async, get_company_summary_async, get_term_definition_async
+from .api_utils.news_store import get_news_store
+from .api_utils.wikipedia_utils import search_wikipedia_async
+from .api_utils.course_catalog import get_catalog
+from .api_utils.course_search import get_course_search
+from .api_utils.local_extractor import get_local_extractor
+from .api_utils.session_memory import memory_key
+from .api_utils.entities import NAMES, COMPANIES, COURSES, TERMS
+from .api_utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_CONCURRENCY = int(os.getenv("ENRICHMENT_CONCURRENCY", "8"))
+ENRICHMENT_TIMEOUT_SECONDS = float(os.getenv("ENRICHMENT_TIMEOUT_SECONDS", "10"))
+# Speculative lookups one session may have running at a time.
+PREFETCH_MAX_IN_FLIGHT = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", "4"))
+
+# One semaphore per event loop: the server, the batch CLI and tests each
+# run their own loop, and a semaphore is bound to the loop it is used on.
+_lookup_slots = weakref.WeakKeyDictionary()
+
+def get_lookup_slots() -> asyncio.Semaphore:
+    """
+    The running loop's cap on in-flight upstream lookups.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _lookup_slots.get(loop)
+    if slots is None:
+        slots = _lookup_slots[loop] = asyncio.Semaphore(ENRICHMENT_CONCURRENCY)
+    return slots
+
+def get_course_description(course_code: str) -> dict:
+    catalog = get_catalog()
+    course = catalog.lookup(course_code)
+    if course is None:
+        # GPT sometimes returns a course by name ("Data Structures") rather than code.
+        index = get_course_search().best_match(course_code)
+        if index is not None:
+            course = catalog.codes[index], catalog.names[index], catalog.descriptions[index]
+    if course is not None:
+        code, name, description = course
+        return {
+            "course_code": code,
+            "course_name": name,
+            "description": description
+        }
+    else:
+        return {
+            "course_code": course_code,
+            "course_name": "Course not found",
+            "description": "N/A"
+        }
+
+async def get_person_description(person_name: str) -> dict:
+    with stage("enrich.person"):
+        description = await get_person_summary_async(person_name)
+    return {
+        "person_name": person_name,
+        "description": description
+    }
+
+def format_news(result: dict) -> list:
+    news = []
+    if "value" in result:
+        for article in result["value"]:
+            news.append({
+                "title": article.get("name", "No title"),
+                "summary": article.get("description", "No summary"),
+                "image_url": article.get("image", {}).get("thumbnail", {}).get("contentUrl", "No photo")
+            })
+    else:
+        news.append({
+            "title": "No news found",
+            "summary": "No news summary available",
+            "image_url": "No photo"
+        })
+    return news
+
+async def _timed(stage_name: str, awaitable):
+    with stage(stage_name):
+        return await awaitable
+
+async def get_company_details(company_name: str) -> dict:
+    description, news_result = await asyncio.gather(
+        _timed("enrich.wikipedia", search_wikipedia_async(company_name)),
+        _timed("enrich.bing", get_news_store().get(company_name))
+    )
+
+    if "Error" in description:
+        with stage("enrich.company"):
+            description = await get_company_summary_async(company_name)
+
+    return {
+        "company_name": company_name,
+        "description": description,
+        "news": format_news(news_result)
+    }
+
+async def get_technical_term_definition(term: str) -> dict:
+    with stage("enrich.term"):
+        description = await get_term_definition_async(term)
+    return {
+        "term": term,
+        "description": description
+    }
+
+# payload key -> (extracted entity key, resolver, fallback used on timeout or error)
+ENRICHERS = {
+    "person_descriptions": (
+        NAMES,
+        get_person_description,
+        lambda name: {"person_name": name, "description": "Could not fetch description for this person."}
+    ),
+    "technical_term_definitions": (
+        TERMS,
+        get_technical_term_definition,
+        lambda term: {"term": term, "description": "Could not fetch definition for this term."}
+    ),
+    "company_details": (
+        COMPANIES,
+        get_company_details,
+        lambda name: {"company_name": name, "description": "Could not fetch company information.", "news": []}
+    )
+}
+
+def is_resolved(result: dict) -> bool:
+    return not result.get("description", "").startswith("Could not fetch") and result.get("course_name") != "Course not found"
+
+async def _bounded_lookup(payload_key: str, entity_key: str, resolver, fallback, entity: str, started: asyncio.Event = None) -> tuple:
+    async with get_lookup_slots():
+        if started is not None:
+            started.set()
+        try:
+            result = await asyncio.wait_for(resolver(entity), ENRICHMENT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out enriching '%s' after %ss", entity, ENRICHMENT_TIMEOUT_SECONDS)
+            result = fallback(entity)
+        except Exception as e:
+            logger.warning("Error enriching '%s': %s", entity, e)
+            result = fallback(entity)
+    if is_resolved(result):
+        get_local_extractor().remember(entity_key, entity)
+    return payload_key, entity_key, entity, result
+
+async def enrich_entities(extracted_entities: dict, prefetcher: "EnrichmentPrefetcher" = None):
+    """
+    Resolves every extracted entity concurrently and yields
+    (payload_key, entity_key, entity, result) tuples in completion order, so callers can forward each one as soon as it is
+    ready. Course lookups are local and are yielded while the upstream lookups
+    are in flight. A global semaphore caps in-flight upstream lookups across
+    all sessions. Lookups the `prefetcher` already started are reused.
+    """
+    tasks = [
+        (prefetcher and prefetcher.claim(entity_key, entity))
+        or asyncio.create_task(_bounded_lookup(payload_key, entity_key, resolver, fallback, entity))
+        for payload_key, (entity_key, resolver, fallback) in ENRICHERS.items()
+        for entity in extracted_entities.get(entity_key, [])
+    ]
+    try:
+        for course in extracted_entities.get(COURSES, []):
+            with stage("enrich.course"):
+                description = get_course_description(course)
+            yield "course_descriptions", COURSES, course, description
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+PREFETCH_STATS = Counter()
+
+
+@dataclass
+class _Speculation:
+    task: asyncio.Task
+    audio_end: float
+    upstream_started: asyncio.Event
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float = None
+
+
+class EnrichmentPrefetcher:
+    """
+    Speculative enrichment for one session.
+
+    `speculate` takes what the cheap local extractor found in a partial (or
+    in a final window still waiting on GPT extraction) and starts the
+    upstream lookups for those people, companies and terms right away. When the
+    final extraction confirms an entity, `claim` hands the in-flight task to
+    enrich_entities instead of starting a new one. `settle` drops the
+    speculations a final window did not confirm: lookups still queued for a
+    slot are cancelled, and ones already upstream keep running behind the
+    cache's shielded fetch, so their result is parked in the cache.
+    """
+
+    def __init__(self, max_in_flight: int = PREFETCH_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.counters = Counter()
+        self._speculations = {}
+
+    def speculate(self, entities: dict, audio_end: float, memory=None) -> None:
+        for payload_key, (entity_key, resolver, fallback) in ENRICHERS.items():
+            for entity in entities.get(entity_key, []):
+                key = memory_key(entity_key, entity)
+                if key in self._speculations or (memory is not None and memory.knows(entity_key, entity)):
+                    continue
+                if len(self._speculations) >= self.max_in_flight:
+                    return
+                started = asyncio.Event()
+                speculation = _Speculation(
+                    asyncio.create_task(_bounded_lookup(payload_key, entity_key, resolver, fallback, entity, started)),
+                    audio_end,
+                    started
+                )
+                speculation.task.add_done_callback(lambda _, s=speculation: setattr(s, "finished_at", time.perf_counter()))
+                self._speculations[key] = speculation
+                self._count("speculated")
+
+    def claim(self, entity_key: str, entity: str):
+        """
+        Returns the speculative lookup task for a confirmed entity, or None.
+        """
+        speculation = self._speculations.pop(memory_key(entity_key, entity), None)
+        if speculation is None or speculation.task.cancelled():
+            self._count("misses")
+            return None
+        self._count("hits")
+        # The lookup's head start over a lookup started now.
+        self._count("saved_seconds", (speculation.finished_at or time.perf_counter()) - speculation.started_at)
+        return speculation.task
+
+    def settle(self, audio_end: float, confirmed: dict) -> None:
+        """
+        Drops the speculations from audio up to `audio_end` that the final
+        extraction of that audio did not confirm. Confirmed ones stay for
+        `claim`.
+        """
+        keep = {memory_key(entity_key, entity) for entity_key, entities in confirmed.items() for entity in entities}
+        for key, speculation in list(self._speculations.items()):
+            if speculation.audio_end > audio_end or key in keep:
+                continue
+            del self._speculations[key]
+            if speculation.task.done():
+                self._count("parked")
+            elif speculation.upstream_started.is_set():
+                # The cache's fetch is shielded: it finishes and is cached.
+                speculation.task.cancel()
+                self._count("parked")
+            else:
+                speculation.task.cancel()
+                self._count("cancelled")
+
+    def close(self) -> None:
+        for speculation in self._speculations.values():
+            speculation.task.cancel()
+        self._speculations.clear()
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        self.counters[name] += amount
+        PREFETCH_STATS[name] += amount
+
+    def stats(self) -> dict:
+        return prefetch_summary(self.counters)
+
+
+def prefetch_summary(counters: Counter) -> dict:
+    confirmed = counters["hits"] + counters["misses"]
+    return {
+        "speculated": counters["speculated"],
+        "hits": counters["hits"],
+        "misses": counters["misses"],
+        "cancelled": counters["cancelled"],
+        "parked": counters["parked"],
+        "hit_rate": counters["hits"] / confirmed if confirmed else 0.0,
+        "precision": counters["hits"] / counters["speculated"] if counters["speculated"] else 0.0,
+        "saved_seconds": counters["saved_seconds"]
+    }
+
+
+def prefetch_stats() -> dict:
+    """
+    Speculative enrichment across all sessions since startup.
+    """
+    return prefetch_summary(PREFETCH_STATS)
@@ -1,171 +1,465 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from contextlib import asynccontextmanager
-import whisper
-import tempfile
+import asyncio
+import copy
+import logging
 import os
-import pandas as pd
+import time
+import uuid
+from collections import Counter
 
-from .audio_processing.audio_utils import process_audio
-from .api_utils.gpt_utils import extract_entities_with_gpt
-from .api_utils.gpt_utils_name import get_person_summary
-from .api_utils.bing_utils import search_bing_news
-from .api_utils.wikipedia_utils import search_wikipedia
-from .api_utils.gpt_utils_company import get_company_summary
-from .api_utils.gpt_utils_term import get_term_definition
+from .audio_processing.codecs import CODECS, UnsupportedCodecError, make_decoder
+from .audio_processing.streaming import StreamingTranscriber
+from .audio_processing.vad import make_vad
+from .audio_processing.scheduler import InferenceScheduler
+from .audio_processing.asr_backends import make_backend
+from .audio_processing.admission import AdmissionController, LoadPolicy, NORMAL
+from .api_utils.gpt_utils import extract_entities_with_gpt_async
+from .api_utils.clients import close_async_clients, http_stats
+from .api_utils.cache import get_cache
+from .api_utils.semantic_cache import close_semantic_caches, semantic_stats
+from .api_utils.local_extractor import get_local_extractor, merge_entities
+from .api_utils.course_search import get_course_search
+from .api_utils.news_store import get_news_store
+from .api_utils.session_memory import SessionMemory
+from .api_utils.metrics import (
+    GLOBAL_METRICS, current_metrics, end_session, render_prometheus, session_metrics, session_summaries, stage
+)
+from .api_utils.entities import COURSES
+from .enrichment import EnrichmentPrefetcher, enrich_entities, is_resolved, prefetch_stats
+from .batch import (
+    BATCH_INPUT_ROOT, MAX_BATCH_JOBS, MAX_RUNNING_BATCH_JOBS, BatchJob, evict_finished_jobs, resolve_input_paths
+)
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO, which would drown out the pipeline's own logs.
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+STARTED_AT = time.perf_counter()
 
 app = FastAPI()
-model = None
+scheduler = None
+asr_backend = None
+startup_seconds = None
+startup_error = None
+
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+WHISPER_MAX_BATCH = int(os.getenv("WHISPER_MAX_BATCH", "8"))
+# Smaller model size served by one extra worker while the server is degraded.
+ASR_FALLBACK_MODEL_SIZE = os.getenv("ASR_FALLBACK_MODEL_SIZE")
+
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "32"))
+MAX_QUEUED_WINDOWS = int(os.getenv("MAX_QUEUED_WINDOWS", "4"))
+admission = AdmissionController(
+    max_sessions=MAX_SESSIONS,
+    degraded_latency=float(os.getenv("DEGRADED_QUEUE_SECONDS", "1.5")),
+    critical_latency=float(os.getenv("CRITICAL_QUEUE_SECONDS", "4"))
+)
+
+async def load_and_warm_up(backend):
+    model = await asyncio.to_thread(backend.load)
+    await asyncio.to_thread(backend.warm_up, model)
+    return model
+
+async def load_models() -> None:
+    """
+    Loads and warms up every ASR model concurrently, then starts the
+    scheduler. Runs in the background so /healthz answers while the models
+    load; /readyz turns ready once this finishes.
+    """
+    global scheduler, asr_backend, startup_seconds, startup_error
+    try:
+        backend = make_backend()
+        logger.info("Loading ASR models: %s", backend.describe())
+        loads = [load_and_warm_up(backend) for _ in range(WHISPER_WORKERS)]
+        if ASR_FALLBACK_MODEL_SIZE:
+            fast_backend = copy.copy(backend)
+            fast_backend.model_size = ASR_FALLBACK_MODEL_SIZE
+            logger.info("Loading fallback ASR model: %s", fast_backend.describe())
+            loads.append(load_and_warm_up(fast_backend))
+        # The course search index is memory-mapped (or built, the first time) meanwhile.
+        models, _ = await asyncio.gather(asyncio.gather(*loads), asyncio.to_thread(get_course_search))
+        fast_models = models[WHISPER_WORKERS:]
+        ready_scheduler = InferenceScheduler(
+            models[:WHISPER_WORKERS], backend.transcribe_batch, max_batch_size=WHISPER_MAX_BATCH, fast_models=fast_models
+        )
+        await ready_scheduler.start()
+    except Exception as e:
+        logger.exception("Failed to load the ASR models")
+        startup_error = repr(e)
+        return
+    asr_backend = backend
+    scheduler = ready_scheduler
+    startup_seconds = time.perf_counter() - STARTED_AT
+    logger.info("Ready after %.2fs", startup_seconds)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Loading Whisper model...")
-    global model
-    model = whisper.load_model("small")
+    loading = asyncio.create_task(load_models())
+    get_news_store().start()
     yield
-    print("Shutting down...")
+    logger.info("Shutting down...")
+    loading.cancel()
+    await get_news_store().stop()
+    if scheduler is not None:
+        await scheduler.stop()
+    await close_async_clients()
+    get_cache().close()
+    close_semantic_caches()
 
 app = FastAPI(lifespan=lifespan)
 
-courses_df = pd.read_csv("app/All_Courses.csv")
-def get_course_description(course_code: str) -> dict:
-    course = courses_df[courses_df['Code'] == course_code]
-    if not course.empty:
-        print(course_code)
-        print(course.iloc[0]['Name'])
-        print(course.iloc[0]['Description'])
-        return {
-            "course_code": course_code,
-            "course_name": course.iloc[0]['Name'],
-            "description": course.iloc[0]['Description']
-        }
-    else:
-        return {
-            "course_code": course_code,
-            "course_name": "Course not found",
-            "description": "N/A"
-        }
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", "10"))
+STREAM_HOP_SECONDS = float(os.getenv("STREAM_HOP_SECONDS", "1"))
+STREAM_OVERLAP_SECONDS = float(os.getenv("STREAM_OVERLAP_SECONDS", "1"))
+STREAM_PAUSE_SECONDS = float(os.getenv("STREAM_PAUSE_SECONDS", "0.6"))
 
-def get_person_description(person_name: str) -> dict:
-    try:
-        description = get_person_summary(person_name)
-        return {
-            "person_name": person_name,
-            "description": description
-        }
-    except Exception as e:
-        print(f"Error fetching description for {person_name}: {e}")
-        return {
-            "person_name": person_name,
-            "description": "Could not fetch description for this person."
-        }
+window_counters = Counter()
+entity_counters = Counter()
 
-def get_company_details(company_name: str) -> dict:
-    api_key = os.getenv("BING_API_KEY")
-    news = []
-    description = search_wikipedia(company_name)
+async def send_enrichment(
+    websocket: WebSocket,
+    send_lock: asyncio.Lock,
+    memory: SessionMemory,
+    prefetcher: EnrichmentPrefetcher,
+    transcription: str,
+    audio_end: float,
+    policy: LoadPolicy
+) -> None:
+    """
+    Extracts entities from a final transcription and sends each enrichment
+    result to the client as soon as its lookup completes. Entities this
+    session already received are not looked up again; they are sent as a
+    single "references" message listing their ids. Every message carries
+    the stream position (audio_end, in seconds) of the window it came from.
+    Under load, `policy` skips the GPT extraction fallback and the upstream
+    lookups, leaving only what can be answered locally. Lookups started
+    speculatively from partials are reused.
+    """
+    with stage("extraction.local"):
+        local = get_local_extractor().extract(transcription)
+    if local.conclusive or not policy.gpt_extraction:
+        extracted_entities = local.entities
+    else:
+        logger.debug("Local extraction inconclusive, asking GPT about: %s", local.unexplained)
+        if policy.enrichment:
+            # Start on what is already known while GPT looks for the rest.
+            prefetcher.speculate(local.entities, audio_end, memory)
+        with stage("extraction.gpt"):
+            gpt_entities = await extract_entities_with_gpt_async(transcription)
+        extracted_entities = merge_entities(local.entities, gpt_entities)
+    logger.debug("Extracted entities: %s", extracted_entities)
+    if not policy.enrichment:
+        entity_counters["shed"] += sum(len(v) for k, v in extracted_entities.items() if k != COURSES)
+        extracted_entities = {COURSES: extracted_entities.get(COURSES, [])}
 
-    if "Error" in description:
-        description = get_company_summary(company_name)
+    new_entities, repeated_ids = memory.split(extracted_entities)
+    prefetcher.settle(audio_end, new_entities)
+    entity_counters["reused"] += len(repeated_ids)
+    if repeated_ids:
+        async with send_lock:
+            with stage("send"):
+                await websocket.send_json({
+                    "type": "references",
+                    "ids": repeated_ids,
+                    "audio_end": audio_end
+                })
 
-    try:
-        result = search_bing_news(api_key=api_key, query=company_name, count=2)
-        if "value" in result:
-            for article in result["value"]:
-                news.append({
-                    "title": article.get("name", "No title"),
-                    "summary": article.get("description", "No summary"),
-                    "image_url": article.get("image", {}).get("thumbnail", {}).get("contentUrl", "No photo")
+    async for payload_key, entity_key, entity, result in enrich_entities(new_entities, prefetcher):
+        entity_counters["enriched"] += 1
+        entity_id = memory.record(entity_key, entity, is_resolved(result))
+        async with send_lock:
+            with stage("send"):
+                await websocket.send_json({
+                    "type": "enrichment",
+                    payload_key: [dict(result, id=entity_id)],
+                    "audio_end": audio_end
                 })
-        else:
-            news.append({
-                "title": "No news found",
-                "summary": "No news summary available",
-                "image_url": "No photo"
-            })
-    except Exception as e:
-        news.append({
-            "title": "Error fetching news",
-            "summary": str(e),
-            "image_url": "No photo"
-        })
 
+@app.get("/stats")
+async def stats_endpoint():
     return {
-        "company_name": company_name,
-        "description": description,
-        "news": news
+        "worker_pid": os.getpid(),
+        "asr": asr_backend.describe() if asr_backend is not None else None,
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "admission": admission.stats(),
+        "enrichment_cache": get_cache().stats(),
+        "semantic_cache": semantic_stats(),
+        "upstreams": http_stats(),
+        "local_extractor": get_local_extractor().stats(),
+        "prefetch": prefetch_stats(),
+        "news": get_news_store().stats(),
+        "windows": dict(window_counters),
+        "entities": dict(entity_counters),
+        "latency": GLOBAL_METRICS.summary(),
+        "session_latency": session_summaries()
     }
 
-def get_technical_term_definition(term: str) -> dict:
-    try:
-        definition = get_term_definiton(term)
-        return {
-            "term": term,
-            "description": description
-        }
-    except Exception as e:
-        print(f"Error fetching definition for {term}: {e}")
-        return {
-            "term": term,
-            "description": "Could not fetch definition for this term."
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving, models loaded or not.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 once every ASR model is loaded and warmed up, 503 before.
+    """
+    if scheduler is not None:
+        return {"status": "ready", "startup_seconds": startup_seconds}
+    if startup_error is not None:
+        return JSONResponse({"status": "failed", "error": startup_error}, status_code=503)
+    return JSONResponse({"status": "starting"}, status_code=503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    counters = {f"contextify_windows_{name}_total": count for name, count in window_counters.items()}
+    counters.update((f"contextify_entities_{name}_total", count) for name, count in entity_counters.items())
+    gauges = {"contextify_active_sessions": admission.active_sessions}
+    if scheduler is not None:
+        gauges["contextify_asr_queue_depth"] = scheduler.queue_depth
+        gauges["contextify_asr_queue_latency_seconds"] = scheduler.queue_latency
+    prefetch = prefetch_stats()
+    counters.update((f"contextify_prefetch_{name}_total", prefetch[name]) for name in ("speculated", "hits", "misses", "cancelled", "parked"))
+    counters["contextify_prefetch_saved_seconds_total"] = prefetch["saved_seconds"]
+    news = get_news_store().stats()
+    counters.update((f"contextify_news_{name}_total", news.get(name, 0)) for name in ("fresh_hits", "stale_hits", "cold_misses", "upstream_calls"))
+    return render_prometheus(counters, gauges)
+
+@app.get("/courses/search")
+async def search_courses(q: str, k: int = 5):
+    """
+    Top-k catalog courses for a free-text query such as "intro data structures".
+    """
+    index = get_course_search()
+    return [
+        {
+            "course_code": index.catalog.codes[row],
+            "course_name": index.catalog.names[row],
+            "score": score
         }
+        for row, score in index.search(q, max(1, min(k, 50)))
+    ]
+
+class BatchRequest(BaseModel):
+    paths: list[str] = Field(min_length=1)
+    workers: int | None = None
+
+    @field_validator("workers")
+    @classmethod
+    def clamp_workers(cls, workers):
+        return None if workers is None else max(1, min(workers, os.cpu_count() or 1))
+
+batch_jobs = {}
+
+@app.post("/jobs")
+async def create_batch_job(request: BatchRequest):
+    """
+    Starts an offline run over audio files or directories under
+    BATCH_INPUT_ROOT on the server; paths are relative to it.
+    """
+    if not BATCH_INPUT_ROOT:
+        raise HTTPException(status_code=403, detail="Batch jobs are disabled: BATCH_INPUT_ROOT is not set")
+    try:
+        paths = resolve_input_paths(request.paths, BATCH_INPUT_ROOT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Leave room for the new job; running jobs are never evicted and count too.
+    evict_finished_jobs(batch_jobs, max(0, MAX_BATCH_JOBS - 1))
+    running = sum(not job.finished for job in batch_jobs.values())
+    if running >= MAX_RUNNING_BATCH_JOBS or len(batch_jobs) >= MAX_BATCH_JOBS:
+        raise HTTPException(status_code=429, detail=f"Too many batch jobs: {running} running, try again later")
+    job = BatchJob(paths, request.workers, BATCH_INPUT_ROOT).start()
+    batch_jobs[job.id] = job
+    return job.describe()
+
+@app.get("/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    evict_finished_jobs(batch_jobs)
+    if job_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return batch_jobs[job_id].describe()
+
+@app.get("/jobs/{job_id}/results")
+async def get_batch_results(job_id: str):
+    """
+    Streams the job's records as JSON lines, live while it is running.
+    """
+    if job_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return StreamingResponse(batch_jobs[job_id].stream_jsonl(), media_type="application/x-ndjson")
+
+async def transcribe_window(session_id: str, audio, prompt, is_final: bool, fast: bool, overlap: int):
+    with stage("asr"):
+        return await scheduler.transcribe(session_id, audio, prompt, is_final=is_final, fast=fast, overlap=overlap)
+
+async def send_transcriptions(
+    websocket: WebSocket,
+    send_lock: asyncio.Lock,
+    memory: SessionMemory,
+    prefetcher: EnrichmentPrefetcher,
+    streamer: StreamingTranscriber,
+    windows: asyncio.Queue,
+    enrichment_tasks: set
+) -> None:
+    """
+    Sends each queued window's transcription in stream order and starts
+    enrichment for final ones. Partials start speculative lookups for the
+    entities the local extractor recognizes. Windows the scheduler
+    superseded or merged into an earlier window resolve to None and are
+    skipped.
+    """
+    while True:
+        job, is_final, audio_end = await windows.get()
+        try:
+            text = await job
+        except Exception:
+            # One failed batch costs its windows, not the session.
+            logger.exception("Transcription of the window ending at %.1f s failed", audio_end)
+            window_counters["failed"] += 1
+            continue
+        if text is None:
+            continue
+        transcription = streamer.accept(text, is_final)
+        logger.debug("%s transcription: %s (queue depth: %d)",
+                     "Final" if is_final else "Partial", transcription, scheduler.queue_depth)
+
+        if not is_final:
+            async with send_lock:
+                with stage("send"):
+                    await websocket.send_json({
+                        "type": "partial",
+                        "partial_transcription": transcription,
+                        "audio_end": audio_end
+                    })
+            if admission.policy.enrichment:
+                with stage("prefetch"):
+                    prefetcher.speculate(get_local_extractor().extract(text).entities, audio_end, memory)
+            continue
+
+        async with send_lock:
+            with stage("send"):
+                await websocket.send_json({
+                    "type": "final",
+                    "transcription": transcription,
+                    "audio_end": audio_end
+                })
+
+        if transcription:
+            task = asyncio.create_task(
+                send_enrichment(websocket, send_lock, memory, prefetcher, transcription, audio_end, admission.policy)
+            )
+            enrichment_tasks.add(task)
+            task.add_done_callback(enrichment_tasks.discard)
 
 @app.websocket("/ws/audio")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    audio_data = b""
+    session_id = uuid.uuid4().hex
+    if scheduler is None:
+        await websocket.send_json({"type": "status", "state": "starting"})
+        # 1013: try again later.
+        await websocket.close(code=1013)
+        return
+    # The codec is negotiated with ?codec=... on the handshake URL; without
+    # it the stream is the macOS client's raw 32-bit 44.1 kHz PCM.
+    codec = websocket.query_params.get("codec")
+    try:
+        decoder = make_decoder(codec, block_seconds=STREAM_HOP_SECONDS)
+    except UnsupportedCodecError as e:
+        logger.warning("Rejecting session %s: %s", session_id, e)
+        await websocket.send_json({"type": "error", "message": str(e), "codecs": list(CODECS)})
+        # 1003: unsupported data.
+        await websocket.close(code=1003)
+        return
+    if not admission.admit(session_id):
+        await websocket.send_json({"type": "overloaded"})
+        await websocket.close(code=1013)
+        return
+    metrics = session_metrics(session_id)
+    current_metrics.set(metrics)
+    send_lock = asyncio.Lock()
+    enrichment_tasks = set()
+    memory = SessionMemory()
+    prefetcher = EnrichmentPrefetcher()
+    streamer = StreamingTranscriber(
+        window_seconds=STREAM_WINDOW_SECONDS,
+        hop_seconds=STREAM_HOP_SECONDS,
+        overlap_seconds=STREAM_OVERLAP_SECONDS,
+        vad=make_vad(),
+        pause_seconds=STREAM_PAUSE_SECONDS
+    )
+    base_hop_samples = streamer.hop_samples
+    level = NORMAL
+    # Windows in flight, in stream order. Reading continues while ASR runs;
+    # a full queue drops partial windows and holds back final ones.
+    windows = asyncio.Queue(maxsize=MAX_QUEUED_WINDOWS)
+    sender = asyncio.create_task(
+        send_transcriptions(websocket, send_lock, memory, prefetcher, streamer, windows, enrichment_tasks)
+    )
 
     try:
         while True:
-            chunk = await websocket.receive_bytes()
-            print(f"Received audio chunk, size: {len(chunk)} bytes")
-            audio_data += chunk
-
-            if len(audio_data) > 1000000:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".raw") as raw_file:
-                    raw_file.write(audio_data)
-                    raw_file.flush()
-                    raw_path = raw_file.name
-                    print(f"[DEBUG] Temporary raw PCM file saved: {raw_path}")
-
-                try:
-                    wav_path = process_audio(raw_path)
-                    print(f"[DEBUG] Converted raw PCM to WAV: {wav_path}")
-
-                    result = model.transcribe(wav_path, fp16=False, language="en")
-                    transcription = result["text"].strip()
-                    print(f"[Whisper] Transcription: {transcription}")
-
-                    extracted_entities = extract_entities_with_gpt(transcription)
-                    print("[DEBUG] Extracted entities:", extracted_entities)
-
-                    course_descriptions = [
-                        get_course_description(course) for course in extracted_entities.get("Courses", [])
-                    ]
-                    person_descriptions = [
-                        get_person_description(person) for person in extracted_entities.get("Names", [])
-                    ]
-                    technical_term_definitions = [
-                        get_technical_term_definition(term) for term in extracted_entities.get("Terms", [])
-                    ]
-                    company_details = [
-                        get_company_details(company) for company in extracted_entities.get("Companies", [])
-                    ]
-
-                    response_payload = {
-                        "transcription": transcription,
-                        "course_descriptions": course_descriptions,
-                        "person_descriptions": person_descriptions,
-                        "technical_term_definitions": technical_term_definitions,
-                        "company_details": company_details
-                    }
-
-                    print("[DEBUG] Response payload:", response_payload)
-                    await websocket.send_json(response_payload)
-
-                finally:
-                    audio_data = b""
-                    os.remove(raw_path)
-                    os.remove(wav_path)
-                    print(f"[DEBUG] Cleaned up temporary files: {raw_path}, {wav_path}")
+            with stage("receive"):
+                chunk = await websocket.receive_bytes()
+            logger.debug("Received audio chunk, size: %d bytes", len(chunk))
+            with stage("decode"):
+                samples = decoder.decode(chunk)
+            if samples.size:
+                streamer.feed(samples)
+
+            if not streamer.ready():
+                continue
+            if sender.done():
+                # Sending failed (e.g. the client went away); surface the error.
+                sender.result()
+
+            policy = admission.update(scheduler.queue_latency)
+            streamer.hop_samples = int(base_hop_samples * policy.hop_scale)
+            if policy.level != level:
+                level = policy.level
+                async with send_lock:
+                    await websocket.send_json({"type": "status", "state": level})
+
+            with stage("vad"):
+                audio, prompt, is_final = streamer.next_window()
+                audio_end = streamer.stream_seconds
+            if audio is None:
+                # No speech in this window: skip both Whisper and GPT.
+                window_counters["silent"] += 1
+                continue
+            if not is_final and (not policy.partials or windows.full()):
+                window_counters["dropped"] += 1
+                continue
+            window_counters["transcribed"] += 1
+            job = asyncio.create_task(
+                transcribe_window(session_id, audio, prompt, is_final, policy.fast_model, streamer.repeated_samples)
+            )
+            put = asyncio.ensure_future(windows.put((job, is_final, audio_end)))
+            await asyncio.wait((put, sender), return_when=asyncio.FIRST_COMPLETED)
+            if not put.done():
+                # The sender stopped while the queue was full and will never
+                # make room; surface its error.
+                put.cancel()
+                job.cancel()
+                sender.result()
+                break
     except WebSocketDisconnect:
-        print("WebSocket connection closed")
\ No newline at end of file
+        logger.info("WebSocket connection closed")
+    finally:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Session %s latency: %s, prefetch: %s", session_id, metrics.summary(), prefetcher.stats())
+        admission.release(session_id)
+        end_session(session_id)
+        scheduler.drop_session(session_id)
+        sender.cancel()
+        while not windows.empty():
+            windows.get_nowait()[0].cancel()
+        for task in enrichment_tasks:
+            task.cancel()
+        prefetcher.close()
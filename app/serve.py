@@ -0,0 +1,62 @@
+"""
+Multi-process serving.
+
+    python -m app.serve --workers 4 --port 8000
+
+Runs N uvicorn workers on one listening socket; the kernel hands each new
+WebSocket connection to whichever worker accepts it first, so sessions
+spread across processes. Read-only state is built once here, before the
+workers start, and memory-mapped by all of them: the course catalog and
+its search index, and (for the openai-whisper backends) the model weights
+in ASR_SHARED_WEIGHTS_DIR, exported by the first worker to load them.
+Each worker gets an equal share of the cores for ASR unless ASR_THREADS
+is set.
+
+Per-process state stays per process: admission limits (MAX_SESSIONS is per
+worker), the in-memory caches and the news store. Batch jobs started over
+REST live in the worker that accepted them; use `python -m app.batch` for
+offline runs when serving with several workers.
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from .api_utils.course_search import get_course_search
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_WEIGHTS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "contextify", "weights")
+
+
+def prepare_shared_state() -> None:
+    """
+    Builds the catalog and search index files if they are missing or stale,
+    so workers only map them instead of racing to write them.
+    """
+    index = get_course_search()
+    logger.info("Course index ready: %d courses in %s", len(index), index.index_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--shared-weights-dir", default=os.getenv("ASR_SHARED_WEIGHTS_DIR", DEFAULT_SHARED_WEIGHTS_DIR),
+                        help="where the memory-mapped model weights live (empty: each worker loads its own)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    prepare_shared_state()
+    # Workers are spawned and read their settings from the environment.
+    os.environ["ASR_SHARED_WEIGHTS_DIR"] = args.shared_weights_dir
+    if not os.getenv("ASR_THREADS"):
+        os.environ["ASR_THREADS"] = str(max(1, (os.cpu_count() or 1) // args.workers))
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import unittest
+import numpy as np
+from audio_processing.admission import AdmissionController, CRITICAL, DEGRADED, NORMAL
+from audio_processing.scheduler import InferenceScheduler
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_caps_concurrent_sessions(self):
+        admission = AdmissionController(max_sessions=2)
+        self.assertTrue(admission.admit("a"))
+        self.assertTrue(admission.admit("b"))
+        self.assertFalse(admission.admit("c"))
+        admission.release("a")
+        self.assertTrue(admission.admit("c"))
+        self.assertEqual(admission.stats()["rejected_sessions"], 1)
+
+    def test_level_follows_queue_latency_with_hysteresis(self):
+        admission = AdmissionController(degraded_latency=1.0, critical_latency=3.0, recovery=0.5)
+        self.assertEqual(admission.update(0.2).level, NORMAL)
+        self.assertEqual(admission.update(1.2).level, DEGRADED)
+        # Below the threshold but above the recovery point: stays degraded.
+        self.assertEqual(admission.update(0.8).level, DEGRADED)
+        policy = admission.update(3.5)
+        self.assertEqual(policy.level, CRITICAL)
+        self.assertFalse(policy.partials)
+        self.assertFalse(policy.enrichment)
+        self.assertEqual(admission.update(2.0).level, CRITICAL)
+        self.assertEqual(admission.update(1.0).level, DEGRADED)
+        self.assertEqual(admission.update(0.1).level, NORMAL)
+
+class TestSchedulerBackpressure(unittest.TestCase):
+
+    def run_blocked(self, submit):
+        """
+        Runs `submit(scheduler)` while the only worker is busy with a
+        blocking window, so everything submitted stays queued.
+        """
+        release = threading.Event()
+        batches = []
+
+        def transcribe_batch(model, audios, prompts):
+            if not batches:
+                release.wait(5)
+            batches.append([audio.size for audio in audios])
+            return [f"{audio.size}" for audio in audios]
+
+        async def scenario():
+            scheduler = InferenceScheduler([object()], transcribe_batch)
+            await scheduler.start()
+            blocker = asyncio.create_task(scheduler.transcribe("other", np.zeros(1, dtype=np.float32)))
+            await asyncio.sleep(0.05)
+            results = await submit(scheduler, release)
+            await blocker
+            await scheduler.stop()
+            return results, scheduler.stats()
+
+        return asyncio.run(scenario()) + (batches,)
+
+    def test_newer_window_supersedes_queued_partial(self):
+        async def submit(scheduler, release):
+            partial = asyncio.create_task(scheduler.transcribe("s", np.zeros(10, dtype=np.float32), is_final=False))
+            await asyncio.sleep(0)
+            final = asyncio.create_task(scheduler.transcribe("s", np.zeros(20, dtype=np.float32)))
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(partial, final)
+
+        results, stats, batches = self.run_blocked(submit)
+        self.assertEqual(results, [None, "20"])
+        self.assertEqual(stats["superseded"], 1)
+
+    def test_queued_finals_are_merged(self):
+        async def submit(scheduler, release):
+            first = asyncio.create_task(scheduler.transcribe("s", np.zeros(10, dtype=np.float32)))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(scheduler.transcribe("s", np.zeros(20, dtype=np.float32)))
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(first, second)
+
+        results, stats, batches = self.run_blocked(submit)
+        self.assertEqual(results, [None, "30"])
+        self.assertEqual(stats["merged"], 1)
+        self.assertEqual(batches[-1], [30])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import unittest
+from unittest import mock
+from audio_processing.asr_backends import AsrBackend, FasterWhisperBackend, QuantizedWhisperBackend, WhisperBackend, make_backend
+
+class TestMakeBackend(unittest.TestCase):
+
+    def test_defaults_to_reference_whisper(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            backend = make_backend()
+        self.assertIsInstance(backend, WhisperBackend)
+        self.assertEqual(backend.describe(), {"backend": "whisper", "model_size": "small", "threads": 0, "beam_size": None})
+
+    def test_reads_settings_from_environment(self):
+        settings = {"ASR_BACKEND": "faster-whisper", "ASR_MODEL_SIZE": "base.en", "ASR_THREADS": "4", "ASR_BEAM_SIZE": "3"}
+        with mock.patch.dict(os.environ, settings, clear=True):
+            backend = make_backend()
+        self.assertIsInstance(backend, FasterWhisperBackend)
+        self.assertEqual((backend.model_size, backend.threads, backend.beam_size), ("base.en", 4, 3))
+        self.assertEqual(backend.describe()["compute_type"], "int8")
+
+    def test_shared_weights_dir(self):
+        with mock.patch.dict(os.environ, {"ASR_BACKEND": "whisper-int8", "ASR_SHARED_WEIGHTS_DIR": "/srv/weights"}, clear=True):
+            backend = make_backend()
+        self.assertEqual(backend.describe()["shared_weights_dir"], "/srv/weights")
+
+    def test_explicit_name_and_unknown_backend(self):
+        self.assertIsInstance(make_backend("whisper-int8"), QuantizedWhisperBackend)
+        with self.assertRaises(ValueError):
+            make_backend("kaldi")
+
+class TestWarmUp(unittest.TestCase):
+
+    def test_runs_the_bundled_clip(self):
+        calls = []
+
+        class RecordingBackend(AsrBackend):
+            def transcribe_batch(self, model, audios, prompts):
+                calls.append((model, audios, prompts))
+                return [""]
+
+        RecordingBackend().warm_up("model")
+        (model, audios, prompts), = calls
+        self.assertEqual((model, prompts, audios[0].size), ("model", [None], 16000))
+        self.assertLess(abs(audios[0]).max(), 0.05)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("ENRICHMENT_CACHE_PATH", "")
+os.environ.setdefault("SEMANTIC_CACHE_PATH", "")
+
+from fastapi.testclient import TestClient
+from . import batch, main
+from .batch import BatchJob, collect_files, evict_finished_jobs, process_corpus, resolve_input_paths
+
+def write_wav(path, seconds, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+def thread_pool(max_workers, mp_context=None, initializer=None, initargs=()):
+    return ThreadPoolExecutor(max_workers)
+
+async def fake_corpus(records, error=None):
+    for record in records:
+        await asyncio.sleep(0)
+        yield record
+    if error is not None:
+        raise error
+
+class TestInputPaths(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmpdir.name)
+        os.makedirs(os.path.join(self.root, "meetings"))
+        write_wav(os.path.join(self.root, "meetings", "a.wav"), 0.1)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_paths_resolve_under_the_root(self):
+        self.assertEqual(resolve_input_paths(["meetings"], self.root), [os.path.join(self.root, "meetings")])
+        for path in ("../etc", "/etc/passwd", "meetings/../../x"):
+            with self.assertRaises(ValueError):
+                resolve_input_paths([path], self.root)
+
+    def test_links_out_of_the_root_are_skipped(self):
+        outside = tempfile.NamedTemporaryFile(suffix=".wav")
+        self.addCleanup(outside.close)
+        os.symlink(outside.name, os.path.join(self.root, "meetings", "b.wav"))
+        files = collect_files([os.path.join(self.root, "meetings")], self.root)
+        self.assertEqual(files, [os.path.join(self.root, "meetings", "a.wav")])
+
+class TestProcessCorpus(unittest.TestCase):
+
+    def test_records_for_each_file_then_summary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_wav(os.path.join(tmpdir, "a.wav"), 1.0)
+            missing = os.path.join(tmpdir, "missing.wav")
+
+            async def collect():
+                return [record async for record in process_corpus([tmpdir, missing], workers=1)]
+
+            with mock.patch.object(batch, "ProcessPoolExecutor", thread_pool), \
+                    mock.patch.object(batch, "_transcribe_windows", lambda windows: ["so we met"] * len(windows)):
+                records = asyncio.run(collect())
+
+        self.assertEqual([record["type"] for record in records], ["error", "transcript", "summary"])
+        self.assertEqual(records[0]["file"], missing)
+        self.assertEqual(records[1]["text"], "so we met")
+        self.assertEqual(records[-1]["files"], 2)
+        self.assertAlmostEqual(records[-1]["audio_seconds"], 1.0)
+
+class TestBatchJob(unittest.TestCase):
+
+    def run_job(self, corpus):
+        async def scenario():
+            with mock.patch.object(batch, "process_corpus", lambda paths, workers, root: corpus):
+                job = BatchJob(["x"]).start()
+                lines = [line async for line in job.stream_jsonl()]
+            return job, lines
+
+        return asyncio.run(scenario())
+
+    def test_streams_records_until_done(self):
+        job, lines = self.run_job(fake_corpus([{"type": "transcript"}, {"type": "summary"}]))
+        self.assertEqual(lines, ['{"type": "transcript"}\n', '{"type": "summary"}\n'])
+        self.assertEqual(job.describe()["status"], "done")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_is_reported(self):
+        job, lines = self.run_job(fake_corpus([{"type": "transcript"}], RuntimeError("pool died")))
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((job.status, job.error), ("failed", "pool died"))
+
+    def test_evicts_expired_and_excess_finished_jobs(self):
+        jobs = {}
+        for i, (status, finished_at) in enumerate([("done", 1.0), ("failed", 2.0), ("running", None), ("done", 1e12)]):
+            job = BatchJob([str(i)])
+            job.status, job.finished_at = status, finished_at
+            jobs[job.id] = job
+        running, newest = list(jobs.values())[2:]
+
+        evict_finished_jobs(jobs, max_jobs=10, ttl=1e9)
+        self.assertEqual(len(jobs), 4)
+        evict_finished_jobs(jobs, max_jobs=3, ttl=1e9)
+        self.assertEqual(len(jobs), 3)
+        evict_finished_jobs(jobs, max_jobs=10, ttl=0)
+        self.assertEqual(list(jobs.values()), [running, newest])
+
+class TestJobRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmpdir.name)
+        write_wav(os.path.join(self.root, "a.wav"), 0.1)
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.batch_jobs.clear()
+        self.tmpdir.cleanup()
+
+    def test_disabled_without_an_input_root(self):
+        with mock.patch.object(main, "BATCH_INPUT_ROOT", ""):
+            self.assertEqual(self.client.post("/jobs", json={"paths": ["a.wav"]}).status_code, 403)
+
+    def test_rejects_paths_outside_the_root(self):
+        with mock.patch.object(main, "BATCH_INPUT_ROOT", self.root):
+            response = self.client.post("/jobs", json={"paths": ["../../etc/passwd"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(main.batch_jobs, {})
+
+    def test_validates_the_request(self):
+        with mock.patch.object(main, "BATCH_INPUT_ROOT", self.root):
+            self.assertEqual(self.client.post("/jobs", json={"paths": []}).status_code, 422)
+            self.assertEqual(self.client.post("/jobs", json={"paths": ["a.wav"], "workers": "many"}).status_code, 422)
+        self.assertEqual(main.BatchRequest(paths=["a.wav"], workers=0).workers, 1)
+        self.assertEqual(main.BatchRequest(paths=["a.wav"], workers=10 ** 6).workers, os.cpu_count())
+
+    def test_running_jobs_are_capped(self):
+        running = BatchJob(["x"])
+        running.status = "running"
+        main.batch_jobs[running.id] = running
+        with mock.patch.object(main, "BATCH_INPUT_ROOT", self.root), mock.patch.object(main, "MAX_RUNNING_BATCH_JOBS", 1):
+            self.assertEqual(self.client.post("/jobs", json={"paths": ["a.wav"]}).status_code, 429)
+        # Running jobs also count against the stored job limit.
+        with mock.patch.object(main, "BATCH_INPUT_ROOT", self.root), mock.patch.object(main, "MAX_RUNNING_BATCH_JOBS", 5), \
+                mock.patch.object(main, "MAX_BATCH_JOBS", 1):
+            self.assertEqual(self.client.post("/jobs", json={"paths": ["a.wav"]}).status_code, 429)
+        self.assertEqual(list(main.batch_jobs), [running.id])
+
+    def test_job_lifecycle(self):
+        records = [{"type": "transcript", "text": "hi"}, {"type": "summary"}]
+        # One event loop for the whole block, so the job keeps running between requests.
+        with TestClient(main.app) as client, mock.patch.object(main, "BATCH_INPUT_ROOT", self.root), \
+                mock.patch.object(batch, "process_corpus", lambda paths, workers, root: fake_corpus(records)):
+            created = client.post("/jobs", json={"paths": ["a.wav"], "workers": 1}).json()
+            self.assertEqual(created["files"], [os.path.join(self.root, "a.wav")])
+            results = client.get(f"/jobs/{created['id']}/results")
+            self.assertEqual(client.get(f"/jobs/{created['id']}").json()["status"], "done")
+
+        self.assertEqual(results.text.splitlines(), ['{"type": "transcript", "text": "hi"}', '{"type": "summary"}'])
+        self.assertEqual(self.client.get("/jobs/unknown").status_code, 404)
+        self.assertEqual(self.client.get("/jobs/unknown/results").status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
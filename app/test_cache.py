@@ -0,0 +1,76 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from api_utils.cache import EnrichmentCache, MISS, ERROR
+
+class TestEnrichmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_normalized_keys_share_entry(self):
+        cache = EnrichmentCache(self.path)
+        cache.put("company", "  Amazon ", "An American company.")
+
+        found, value = cache.get("company", "amazon")
+        self.assertTrue(found)
+        self.assertEqual(value, "An American company.")
+        cache.close()
+
+    def test_survives_restart(self):
+        cache = EnrichmentCache(self.path)
+        cache.put("term", "quantum computing", "A type of computation.")
+        cache.close()
+
+        reopened = EnrichmentCache(self.path)
+        self.assertEqual(reopened.get("term", "Quantum Computing"), (True, "A type of computation."))
+        self.assertEqual(reopened.stats()["term"]["disk_hits"], 1)
+        reopened.close()
+
+    def test_lru_eviction_and_expiry(self):
+        cache = EnrichmentCache(max_entries=2, ttls={"person": -1})
+        cache.put("term", "a", 1)
+        cache.put("term", "b", 2)
+        cache.get("term", "a")
+        cache.put("term", "c", 3)
+
+        self.assertFalse(cache.get("term", "b")[0])
+        self.assertTrue(cache.get("term", "a")[0])
+
+        cache.put("person", "Ada Lovelace", "expired")
+        self.assertFalse(cache.get("person", "Ada Lovelace")[0])
+
+    def test_negative_and_error_outcomes(self):
+        cache = EnrichmentCache()
+        cache.put("wikipedia", "zzzz", "not found", MISS)
+        cache.put("person", "nobody", "Could not fetch summary", ERROR)
+
+        self.assertEqual(cache.get("wikipedia", "zzzz"), (True, "not found"))
+        self.assertFalse(cache.get("person", "nobody")[0])
+
+    def test_single_flight(self):
+        cache = EnrichmentCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "summary"
+
+        async def run():
+            return await asyncio.gather(*[
+                cache.get_or_fetch("person", "Alan Turing", fetch) for _ in range(5)
+            ])
+
+        self.assertEqual(asyncio.run(run()), ["summary"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["person"]["coalesced"], 4)
+        self.assertEqual(cache.get("person", "alan turing"), (True, "summary"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import importlib.util
+import io
+import unittest
+import numpy as np
+from audio_processing.audio_utils import decode_pcm
+from audio_processing.codecs import UnsupportedCodecError, make_decoder, split_flac_stream
+
+AV_AVAILABLE = importlib.util.find_spec("av") is not None
+
+def tone(seconds: float, rate: int) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+def encode_flac(samples: np.ndarray, rate: int) -> bytes:
+    import av
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="flac") as container:
+        stream = container.add_stream("flac", rate=rate, layout="mono")
+        stream.format = "s16"
+        frame = av.AudioFrame.from_ndarray((samples * 32767).astype(np.int16)[None, :], format="s16", layout="mono")
+        frame.sample_rate = rate
+        for packet in list(stream.encode(frame)) + list(stream.encode(None)):
+            container.mux(packet)
+    return buffer.getvalue()
+
+def encode_opus(samples: np.ndarray) -> list:
+    import av
+    encoder = av.CodecContext.create("libopus", "w")
+    encoder.sample_rate = 48000
+    encoder.layout = "mono"
+    encoder.format = "s16"
+    pcm = (samples * 32767).astype(np.int16)
+    packets = []
+    for offset in range(0, pcm.size, 960):
+        frame = av.AudioFrame.from_ndarray(pcm[None, offset:offset + 960], format="s16", layout="mono")
+        frame.sample_rate = 48000
+        frame.pts = offset
+        packets += [bytes(packet) for packet in encoder.encode(frame)]
+    return packets
+
+class TestPcmDecoders(unittest.TestCase):
+
+    def test_int16_samples_split_across_messages(self):
+        samples = tone(0.5, 16000)
+        data = (samples * 32767).astype("<i2").tobytes()
+        decoder = make_decoder("pcm_s16le_16k")
+        decoded = np.concatenate([decoder.decode(data[i:i + 333]) for i in range(0, len(data), 333)])
+        np.testing.assert_allclose(decoded, samples, atol=1e-4)
+
+    def test_default_is_client_pcm_resampled_in_blocks(self):
+        data = (tone(2.0, 44100) * 2 ** 31).astype("<i4").tobytes()
+        decoder = make_decoder(None, block_seconds=1.0)
+        self.assertEqual(decoder.decode(data[:4410 * 4]).size, 0)
+        total = sum(decoder.decode(data[i:i + 17640]).size for i in range(4410 * 4, len(data), 17640))
+        total += decoder.flush().size
+        self.assertEqual(total, 32000)
+
+    def test_streamed_pcm_matches_whole_recording(self):
+        data = (tone(2.0, 44100) * 2 ** 31).astype("<i4").tobytes()
+        expected = decode_pcm(data)
+        for block_seconds, size in ((1.0, 17640), (0.1, 1234), (0.25, len(data))):
+            decoder = make_decoder(None, block_seconds=block_seconds)
+            decoded = np.concatenate([decoder.decode(data[i:i + size]) for i in range(0, len(data), size)] + [decoder.flush()])
+            self.assertEqual(decoded.size, expected.size)
+            np.testing.assert_allclose(decoded, expected, atol=1e-5)
+
+    def test_unknown_codec_is_rejected(self):
+        with self.assertRaises(UnsupportedCodecError):
+            make_decoder("mp3")
+
+@unittest.skipUnless(AV_AVAILABLE, "PyAV is not installed")
+class TestCompressedDecoders(unittest.TestCase):
+
+    def test_flac_stream_in_arbitrary_slices(self):
+        data = encode_flac(tone(2.0, 44100), 44100)
+        for size in (7, 1000, len(data)):
+            decoder = make_decoder("flac")
+            total = sum(decoder.decode(data[i:i + size]).size for i in range(0, len(data), size))
+            total += decoder.flush().size
+            self.assertAlmostEqual(total, 32000, delta=64)
+            self.assertEqual(decoder.errors, 0)
+
+    def test_flac_frames_wait_for_the_next_header(self):
+        data = encode_flac(tone(1.0, 44100), 44100)
+        streaminfo, frames, consumed = split_flac_stream(bytearray(data))
+        self.assertEqual(len(streaminfo), 34)
+        self.assertGreater(len(frames), 0)
+        self.assertLess(consumed, len(data))
+
+    def test_opus_packets(self):
+        samples = tone(1.0, 48000)
+        decoder = make_decoder("opus")
+        decoded = np.concatenate([decoder.decode(packet) for packet in encode_opus(samples)])
+        self.assertAlmostEqual(decoded.size, 16000, delta=400)
+        self.assertGreater(np.abs(decoded[4000:]).max(), 0.1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from api_utils.course_catalog import CourseCatalog, MappedStrings, CATALOG_CSV_PATH
+
+class TestCourseCatalog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.index_path = os.path.join(cls.tmpdir.name, "catalog.pickle")
+        cls.catalog = CourseCatalog(CATALOG_CSV_PATH, cls.index_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_code_spellings_hit_same_course(self):
+        for spelling in ["CMPSC 130A", "cmpsc130a", "CMPSC130A"]:
+            self.assertEqual(self.catalog.lookup(spelling, fuzzy=False)[0], "CMPSC130A")
+
+    def test_fuzzy_near_miss(self):
+        self.assertIsNone(self.catalog.find("CMPSC13OA"))
+        self.assertEqual(self.catalog.lookup("CMPSC13OA")[0], "CMPSC130A")
+        self.assertIsNone(self.catalog.lookup("XYZ999"))
+
+    def test_prefix(self):
+        codes = [self.catalog.codes[i] for i in self.catalog.with_prefix("cmpsc 130")]
+        self.assertEqual(codes, ["CMPSC130A", "CMPSC130B"])
+
+    def test_reloads_from_binary_index(self):
+        reloaded = CourseCatalog(CATALOG_CSV_PATH, self.index_path)
+        self.assertEqual(len(reloaded), len(self.catalog))
+        self.assertEqual(reloaded.lookup("PSTAT 160A")[1], "Applied Stochastic Processes")
+
+    def test_rebuild_leaves_mapped_files_intact(self):
+        path = os.path.join(self.tmpdir.name, "strings")
+        MappedStrings.pack(["first", "second"]).save(path)
+        mapped = MappedStrings.load(path)
+        MappedStrings.pack(["x"]).save(path)
+
+        self.assertEqual(list(mapped), ["first", "second"])
+        self.assertEqual(list(MappedStrings.load(path)), ["x"])
+        self.assertEqual(sorted(name for name in os.listdir(self.tmpdir.name) if name.startswith("strings")),
+                         ["strings.data.npy", "strings.offsets.npy"])
+
+if __name__ == "__main__":
+    unittest.main()
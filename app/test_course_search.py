@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+import unittest
+from api_utils.course_catalog import CourseCatalog, CATALOG_CSV_PATH
+from api_utils.course_search import CourseSearchIndex, tokenize
+
+class TestCourseSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.catalog = CourseCatalog(CATALOG_CSV_PATH, os.path.join(cls.tmpdir.name, "catalog.pickle"))
+        cls.index_dir = os.path.join(cls.tmpdir.name, "search")
+        cls.index = CourseSearchIndex(cls.catalog, cls.index_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def codes(self, query, k=2):
+        return [self.catalog.codes[row] for row, _ in self.index.search(query, k)]
+
+    def test_tokenize_expands_aliases(self):
+        self.assertEqual(tokenize("the Intro to Data Structures", aliases=True), ["introduction", "data", "structur"])
+
+    def test_free_text_queries(self):
+        self.assertEqual(self.codes("intro data structures"), ["CMPSC130A", "CMPSC130B"])
+        self.assertEqual(sorted(self.codes("applied stochastic processes")), ["PSTAT160A", "PSTAT160B"])
+        self.assertEqual(self.codes("xyzzy"), [])
+
+    def test_best_match_needs_confidence(self):
+        self.assertEqual(self.catalog.codes[self.index.best_match("the data structures")], "CMPSC130A")
+        self.assertIsNone(self.index.best_match("the history"))
+
+    def test_reloads_memory_mapped(self):
+        reloaded = CourseSearchIndex(self.catalog, self.index_dir)
+        self.assertEqual(reloaded.postings.shape, self.index.postings.shape)
+        self.assertEqual(reloaded.search("organic chemistry", 1), self.index.search("organic chemistry", 1))
+
+    def test_query_is_fast(self):
+        self.index.search("machine learning")
+        started = time.perf_counter()
+        for _ in range(100):
+            self.index.search("intro data structures")
+        self.assertLess((time.perf_counter() - started) / 100, 0.005)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import unittest
+from collections import Counter
+from unittest import mock
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+# enrichment.py uses package-relative imports, so this test runs as part of
+# the app package.
+from . import enrichment
+from .api_utils.entities import COMPANIES, COURSES, NAMES, TERMS
+from .api_utils.session_memory import memory_key
+
+def resolver(delays, calls=None, in_flight=None):
+    async def resolve(name):
+        if calls is not None:
+            calls.append(name)
+        if in_flight is not None:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(max(delays[name], 0))
+        finally:
+            if in_flight is not None:
+                in_flight["now"] -= 1
+        if delays[name] < 0:
+            raise RuntimeError("upstream down")
+        return {"name": name, "description": f"About {name}"}
+    return resolve
+
+def fallback(name):
+    return {"name": name, "description": "Could not fetch it."}
+
+class TestEnrichEntities(unittest.TestCase):
+
+    def enrich(self, entities, delays, timeout=5.0):
+        in_flight = Counter()
+        enrichers = {
+            "person_descriptions": (NAMES, resolver(delays, in_flight=in_flight), fallback),
+            "technical_term_definitions": (TERMS, resolver(delays, in_flight=in_flight), fallback),
+            "company_details": (COMPANIES, resolver(delays, in_flight=in_flight), fallback)
+        }
+
+        async def collect():
+            results = [item async for item in enrichment.enrich_entities(entities)]
+            return results, in_flight["peak"]
+
+        with mock.patch.dict(enrichment.ENRICHERS, enrichers, clear=True), \
+                mock.patch.object(enrichment, "ENRICHMENT_TIMEOUT_SECONDS", timeout):
+            return asyncio.run(collect())
+
+    def test_lookups_run_concurrently_and_yield_in_completion_order(self):
+        entities = {NAMES: ["Ada Lovelace"], TERMS: ["recursion"], COMPANIES: ["Amazon"], COURSES: ["CMPSC 130A"]}
+        results, peak = self.enrich(entities, {"Ada Lovelace": 0.2, "recursion": 0.05, "Amazon": 0.1})
+
+        self.assertEqual([entity for _, _, entity, _ in results], ["CMPSC 130A", "recursion", "Amazon", "Ada Lovelace"])
+        self.assertEqual(results[0][3]["course_code"], "CMPSC130A")
+        self.assertEqual(peak, 3)
+
+    def test_lookups_are_capped_per_loop(self):
+        entities = {NAMES: ["Ada Lovelace", "Alan Turing", "Grace Hopper"]}
+        with mock.patch.object(enrichment, "ENRICHMENT_CONCURRENCY", 2):
+            results, peak = self.enrich(entities, {"Ada Lovelace": 0.01, "Alan Turing": 0.01, "Grace Hopper": 0.01})
+        self.assertEqual(len(results), 3)
+        self.assertEqual(peak, 2)
+
+    def test_timeouts_and_errors_fall_back(self):
+        entities = {NAMES: ["Slow Person"], TERMS: ["broken term"]}
+        results, _ = self.enrich(entities, {"Slow Person": 1.0, "broken term": -1}, timeout=0.1)
+
+        self.assertEqual(sorted(result["description"] for _, _, _, result in results), ["Could not fetch it."] * 2)
+        self.assertFalse(any(enrichment.is_resolved(result) for _, _, _, result in results))
+
+class TestEnrichmentPrefetcher(unittest.TestCase):
+
+    def run_with_enrichers(self, scenario, delays, calls=None):
+        enrichers = {
+            "person_descriptions": (NAMES, resolver(delays, calls), fallback),
+            "company_details": (COMPANIES, resolver(delays, calls), fallback)
+        }
+        with mock.patch.dict(enrichment.ENRICHERS, enrichers, clear=True):
+            return asyncio.run(scenario())
+
+    def test_claims_in_flight_lookup(self):
+        calls = []
+
+        async def scenario():
+            prefetcher = enrichment.EnrichmentPrefetcher()
+            prefetcher.speculate({NAMES: ["Ada Lovelace"]}, audio_end=1.0)
+            await asyncio.sleep(0.01)
+            results = [item async for item in enrichment.enrich_entities({NAMES: ["Ada Lovelace"], COMPANIES: ["Amazon"]}, prefetcher)]
+            return prefetcher, results
+
+        prefetcher, results = self.run_with_enrichers(scenario, {"Ada Lovelace": 0.05, "Amazon": 0.0}, calls)
+        self.assertEqual(sorted(entity for _, _, entity, _ in results), ["Ada Lovelace", "Amazon"])
+        self.assertEqual(sorted(calls), ["Ada Lovelace", "Amazon"])
+        stats = prefetcher.stats()
+        self.assertEqual((stats["speculated"], stats["hits"], stats["misses"]), (1, 1, 1))
+        self.assertGreater(stats["saved_seconds"], 0)
+
+    def test_settle_discards_unconfirmed_speculations(self):
+        async def scenario():
+            prefetcher = enrichment.EnrichmentPrefetcher()
+            prefetcher.speculate({NAMES: ["Ada Lovelace", "Alan Turing"], COMPANIES: ["Amazon"]}, audio_end=1.0)
+            prefetcher.speculate({NAMES: ["Grace Hopper"]}, audio_end=3.0)
+            await asyncio.sleep(0.01)
+            tasks = {entity: prefetcher._speculations[memory_key(key, entity)].task for key, entity in ((NAMES, "Alan Turing"), (COMPANIES, "Amazon"))}
+            prefetcher.settle(2.0, {NAMES: ["Ada Lovelace"]})
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            # Confirmed and later speculations are still there to claim.
+            claimed = [prefetcher.claim(NAMES, name) is not None for name in ("Ada Lovelace", "Grace Hopper", "Alan Turing")]
+            prefetcher.close()
+            return prefetcher, tasks, claimed
+
+        # Amazon is already done when settled, Alan Turing is still upstream.
+        prefetcher, tasks, claimed = self.run_with_enrichers(scenario, {"Ada Lovelace": 1, "Alan Turing": 1, "Amazon": 0, "Grace Hopper": 1})
+        self.assertEqual(claimed, [True, True, False])
+        self.assertTrue(tasks["Alan Turing"].cancelled())
+        self.assertEqual(prefetcher.stats()["parked"], 2)
+
+    def test_queued_speculations_are_cancelled(self):
+        async def scenario():
+            with mock.patch.object(enrichment, "ENRICHMENT_CONCURRENCY", 0):
+                prefetcher = enrichment.EnrichmentPrefetcher()
+                prefetcher.speculate({NAMES: ["Ada Lovelace"]}, audio_end=1.0)
+                await asyncio.sleep(0.01)
+                task = prefetcher._speculations[memory_key(NAMES, "Ada Lovelace")].task
+                prefetcher.settle(1.0, {})
+                await asyncio.gather(task, return_exceptions=True)
+            return prefetcher, task
+
+        prefetcher, task = self.run_with_enrichers(scenario, {"Ada Lovelace": 0})
+        self.assertTrue(task.cancelled())
+        self.assertEqual(prefetcher.stats()["cancelled"], 1)
+
+    def test_close_cancels_every_speculation(self):
+        async def scenario():
+            prefetcher = enrichment.EnrichmentPrefetcher(max_in_flight=2)
+            prefetcher.speculate({NAMES: ["Ada Lovelace", "Alan Turing", "Grace Hopper"]}, audio_end=1.0)
+            tasks = [speculation.task for speculation in prefetcher._speculations.values()]
+            await asyncio.sleep(0.01)
+            prefetcher.close()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return prefetcher, tasks
+
+        prefetcher, tasks = self.run_with_enrichers(scenario, {"Ada Lovelace": 1, "Alan Turing": 1, "Grace Hopper": 1})
+        self.assertEqual(len(tasks), 2)
+        self.assertTrue(all(task.cancelled() for task in tasks))
+        self.assertIsNone(prefetcher.claim(NAMES, "Ada Lovelace"))
+
+if __name__ == "__main__":
+    unittest.main()
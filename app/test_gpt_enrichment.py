@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from api_utils.gpt_enrichment import (
+    COMPANY, PERSON, TERM, SummaryBatcher, build_summary_messages, chunk_by_token_budget, parse_batch_output,
+    summarize_entities_async
+)
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeCompletions:
+
+    def __init__(self, skip_names=()):
+        self.skip_names = set(skip_names)
+        self.calls = []
+
+    async def create(self, messages, response_format=None, **kwargs):
+        self.calls.append(messages[-1]["content"])
+        if response_format is None:
+            return completion("Single summary.")
+        items = json.loads(messages[-1]["content"])
+        summaries = [
+            {"id": item["id"], "summary": f"About {item['name']}."}
+            for item in items if item["name"] not in self.skip_names
+        ]
+        return completion(json.dumps({"summaries": summaries}))
+
+class TestBatchSummaries(unittest.TestCase):
+
+    def test_chunks_by_token_budget(self):
+        entities = [(TERM, f"term {i}") for i in range(5)]
+        chunks = chunk_by_token_budget(entities, budget=260)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(chunk_by_token_budget([(TERM, "x")], budget=1), [[(TERM, "x")]])
+
+    def test_parse_batch_output_drops_bad_entries(self):
+        raw = json.dumps({"summaries": [{"id": 0, "summary": "A."}, {"id": 7, "summary": "B."}, {"id": 1, "summary": " "}]})
+        self.assertEqual(parse_batch_output(raw, 2), {0: "A."})
+        self.assertEqual(parse_batch_output("not json", 2), {})
+
+    def test_one_call_for_mixed_entities(self):
+        fake = FakeCompletions()
+        entities = [(PERSON, "Ada Lovelace"), (COMPANY, "Amazon"), (TERM, "recursion")]
+        summaries = asyncio.run(summarize_entities_async(entities, fake.create))
+
+        self.assertEqual(summaries, ["About Ada Lovelace.", "About Amazon.", "About recursion."])
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_falls_back_per_entity_for_unanswered_entries(self):
+        fake = FakeCompletions(skip_names={"Amazon"})
+        entities = [(PERSON, "Ada Lovelace"), (COMPANY, "Amazon")]
+        summaries = asyncio.run(summarize_entities_async(entities, fake.create))
+
+        self.assertEqual(summaries, ["About Ada Lovelace.", "Single summary."])
+        self.assertEqual(len(fake.calls), 2)
+
+    def test_single_summaries_do_not_ask_for_json(self):
+        system, user = build_summary_messages(TERM, "recursion")
+        self.assertNotIn("JSON", system["content"])
+        self.assertIn("recursion", user["content"])
+
+    def test_batcher_coalesces_concurrent_requests(self):
+        fake = FakeCompletions()
+        batcher = SummaryBatcher(window=0.001, create=fake.create)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.summarize(PERSON, "Ada Lovelace"),
+                batcher.summarize(TERM, "recursion"),
+                batcher.summarize(TERM, "recursion")
+            )
+
+        self.assertEqual(asyncio.run(run()), ["About Ada Lovelace.", "About recursion.", "About recursion."])
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(len(json.loads(fake.calls[0])), 2)
+        self.assertEqual(batcher._tasks, set())
+
+if __name__ == "__main__":
+    unittest.main()
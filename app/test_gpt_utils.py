@@ -0,0 +1,31 @@
+import json
+import os
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api_utils.entities import ENTITY_KEYS, EXTRACTION_SCHEMA
+from api_utils.gpt_utils import build_extraction_request, parse_extraction_output
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data", "extraction_outputs.json")
+
+class TestExtractionParsing(unittest.TestCase):
+
+    def test_recorded_outputs(self):
+        with open(CORPUS_PATH) as f:
+            corpus = json.load(f)
+        for case in corpus:
+            with self.subTest(case["description"]):
+                self.assertEqual(parse_extraction_output(case["raw_output"]), case["expected"])
+
+    def test_prompt_prefix_is_static(self):
+        first = build_extraction_request("We talked about Amazon.")
+        second = build_extraction_request("Completely different words.")
+
+        self.assertEqual(first["messages"][0], second["messages"][0])
+        self.assertEqual(first["messages"][1]["content"], "We talked about Amazon.")
+        self.assertEqual(first["response_format"]["json_schema"]["schema"], EXTRACTION_SCHEMA)
+        self.assertEqual(EXTRACTION_SCHEMA["required"], list(ENTITY_KEYS))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from api_utils import wikipedia_utils
+from api_utils.http_client import CircuitOpenError, ResilientAsyncClient, ResilientClient
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers with the next scripted (status, body) for the path, repeating the last one.
+    """
+
+    def do_GET(self):
+        script = self.server.scripts.get(self.path.split("?")[0], [(404, {})])
+        self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        status, body = script.pop(0) if len(script) > 1 else script[0]
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+class StubServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.scripts = {}
+        self.server.hits = {}
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class TestResilientClient(StubServerTestCase):
+
+    def test_retries_server_errors(self):
+        self.server.scripts["/flaky"] = [(503, {}), (429, {}), (200, {"ok": True})]
+        client = ResilientClient(max_retries=2)
+
+        response = client.get(f"{self.base_url}/flaky")
+        self.assertEqual(response.json(), {"ok": True})
+        self.assertEqual(self.server.hits["/flaky"], 3)
+        client.close()
+
+    def test_client_errors_are_not_retried(self):
+        client = ResilientClient(max_retries=2)
+        self.assertEqual(client.get(f"{self.base_url}/missing").status_code, 404)
+        self.assertEqual(self.server.hits["/missing"], 1)
+        client.close()
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.server.scripts["/down"] = [(500, {})]
+        client = ResilientClient(max_retries=0, breaker_threshold=2, breaker_reset=60)
+
+        client.get(f"{self.base_url}/down")
+        client.get(f"{self.base_url}/down")
+        with self.assertRaises(CircuitOpenError):
+            client.get(f"{self.base_url}/down")
+        self.assertEqual(self.server.hits["/down"], 2)
+        self.assertEqual(client.stats()[self.base_url[7:]]["circuit"], "open")
+        client.close()
+
+    def test_half_open_trial_closes_circuit(self):
+        self.server.scripts["/recovering"] = [(500, {}), (200, {})]
+        client = ResilientClient(max_retries=0, breaker_threshold=1, breaker_reset=0)
+
+        client.get(f"{self.base_url}/recovering")
+        self.assertEqual(client.get(f"{self.base_url}/recovering").status_code, 200)
+        self.assertEqual(client.stats()[self.base_url[7:]]["circuit"], "closed")
+        client.close()
+
+    def test_cancelled_trial_releases_circuit(self):
+        self.server.scripts["/recovering"] = [(500, {}), (200, {})]
+        url = f"{self.base_url}/recovering"
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        async def run():
+            client = ResilientAsyncClient(max_retries=0, breaker_threshold=1, breaker_reset=0)
+            await client.get(url)
+            with mock.patch.object(client._client, "request", hang):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.get(url), 0.05)
+            response = await client.get(url)
+            await client.aclose()
+            return response
+
+        self.assertEqual(asyncio.run(run()).status_code, 200)
+
+class TestWikipediaOnStub(StubServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.original_base_url = wikipedia_utils.WIKIPEDIA_BASE_URL
+        wikipedia_utils.WIKIPEDIA_BASE_URL = self.base_url
+        self.client = ResilientAsyncClient(max_retries=1)
+
+    def tearDown(self):
+        wikipedia_utils.WIKIPEDIA_BASE_URL = self.original_base_url
+        asyncio.run(self.client.aclose())
+        super().tearDown()
+
+    def test_batch_lookup_is_one_request_with_company_fallbacks(self):
+        self.server.scripts["/w/api.php"] = [(502, {}), (200, {"query": {
+            "normalized": [{"from": "amazon", "to": "Amazon"}, {"from": "amazon (company)", "to": "Amazon (company)"}],
+            "redirects": [{"from": "Acme (company)", "to": "Acme Corporation"}],
+            "pages": [
+                {"title": "Amazon", "pageprops": {"disambiguation": ""}},
+                {"title": "Amazon (company)", "extract": "Amazon is a company. It sells things. It is big."},
+                {"title": "Acme", "missing": True},
+                {"title": "Acme Corporation", "extract": "Acme is fictional."},
+                {"title": "Zzq", "missing": True},
+                {"title": "Zzq (company)", "missing": True}
+            ]
+        }})]
+        with mock.patch.object(wikipedia_utils, "get_async_http", return_value=self.client):
+            results = asyncio.run(wikipedia_utils.search_wikipedia_batch_async(["amazon", "Acme", "Zzq"]))
+
+        self.assertEqual(results, {
+            "amazon": "Amazon is a company. It sells things.",
+            "Acme": "Acme is fictional.",
+            "Zzq": wikipedia_utils.NOT_FOUND_MESSAGE
+        })
+        self.assertEqual(sum(self.server.hits.values()), 2)
+
+    def test_concurrent_single_lookups_share_a_request(self):
+        self.server.scripts["/w/api.php"] = [(200, {"query": {"pages": [
+            {"title": "Alpha", "extract": "Alpha one. Alpha two. Alpha three."},
+            {"title": "Beta", "extract": "Beta one."}
+        ]}})]
+        batcher = wikipedia_utils.WikipediaBatcher(0.001)
+
+        async def run():
+            return await asyncio.gather(batcher.submit(("en", "Alpha")), batcher.submit(("en", "Beta")))
+
+        with mock.patch.object(wikipedia_utils, "get_async_http", return_value=self.client):
+            self.assertEqual(asyncio.run(run()), ["Alpha one. Alpha two.", "Beta one."])
+        self.assertEqual(sum(self.server.hits.values()), 1)
+
+    def test_failed_batch_is_an_error_not_a_miss(self):
+        self.server.scripts["/w/api.php"] = [(500, {})]
+        with mock.patch.object(wikipedia_utils, "get_async_http", return_value=self.client):
+            results = asyncio.run(wikipedia_utils.search_wikipedia_batch_async(["Acme"]))
+        self.assertEqual(wikipedia_utils.wikipedia_outcome(results["Acme"]), "error")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from api_utils.local_extractor import LocalEntityExtractor, spoken_number_to_digits
+
+class TestSpokenNumbers(unittest.TestCase):
+
+    def test_course_style_numbers(self):
+        self.assertEqual(spoken_number_to_digits(["one", "thirty"]), "130")
+        self.assertEqual(spoken_number_to_digits(["one", "thirty", "two"]), "132")
+        self.assertEqual(spoken_number_to_digits(["one", "hundred", "thirty"]), "130")
+        self.assertEqual(spoken_number_to_digits(["sixteen"]), "16")
+        self.assertEqual(spoken_number_to_digits(["thirty", "apples"]), "")
+
+class TestLocalEntityExtractor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = LocalEntityExtractor()
+
+    def test_written_and_spoken_courses(self):
+        result = self.extractor.extract("We covered CMPSC 130A and Statistics one sixty a today.")
+        self.assertEqual(result.entities["Courses"], ["CMPSC130A", "PSTAT160A"])
+        self.assertTrue(result.conclusive)
+
+    def test_course_described_by_name(self):
+        result = self.extractor.extract("I'm retaking the intro data structures class this fall.")
+        self.assertEqual(result.entities["Courses"], ["CMPSC130A"])
+        self.assertEqual(self.extractor.extract("Did you like the history class?").entities["Courses"], [])
+
+    def test_short_codes_need_capitals(self):
+        result = self.extractor.extract("Give me 5 minutes.")
+        self.assertEqual(result.entities["Courses"], [])
+
+    def test_unknown_names_need_gpt(self):
+        result = self.extractor.extract("Yesterday I think Ada Lovelace came up again.")
+        self.assertFalse(result.conclusive)
+        self.assertEqual(result.unexplained, ["Ada", "Lovelace"])
+
+    def test_unknown_names_starting_a_sentence_need_gpt(self):
+        result = self.extractor.extract("Bitcoin is up again. Tesla too.")
+        self.assertFalse(result.conclusive)
+        self.assertEqual(result.unexplained, ["Bitcoin", "Tesla"])
+
+    def test_short_windows_with_unknown_names_need_gpt(self):
+        for text, names in (("Tesla too.", ["Tesla"]), ("Ask Jeff Bezos.", ["Ask", "Jeff", "Bezos"])):
+            with self.subTest(text=text):
+                result = self.extractor.extract(text)
+                self.assertFalse(result.conclusive)
+                self.assertEqual(result.unexplained, names)
+        self.assertTrue(self.extractor.extract("Okay, sure.").conclusive)
+
+    def test_gazetteer(self):
+        extractor = LocalEntityExtractor(self.extractor.catalog)
+        extractor.remember("Companies", "Amazon")
+        extractor.wait_for_gazetteer()
+        result = extractor.extract("Well, I heard Amazon is hiring.")
+        self.assertEqual(result.entities["Companies"], ["Amazon"])
+        self.assertTrue(result.conclusive)
+        self.assertEqual(extractor.stats()["gpt_calls_avoided"], 1)
+
+    def test_gazetteer_keeps_the_most_recent_names(self):
+        extractor = LocalEntityExtractor(self.extractor.catalog, max_gazetteer_size=2)
+        for name in ("Amazon", "Nvidia", "Stripe"):
+            extractor.remember("Companies", name)
+        extractor.wait_for_gazetteer()
+        result = extractor.extract("So Amazon, Nvidia and Stripe are hiring.")
+        self.assertEqual(result.entities["Companies"], ["Nvidia", "Stripe"])
+        self.assertEqual(result.unexplained, ["Amazon"])
+        self.assertEqual(extractor.stats()["gazetteer_size"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from api_utils import metrics
+from api_utils.metrics import Histogram, StageMetrics, current_metrics, render_prometheus, stage
+
+class TestHistogram(unittest.TestCase):
+
+    def test_quantiles_use_bucket_bounds(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1.0)
+        self.assertEqual(histogram.quantile(0.99), float("inf"))
+
+class TestStageMetrics(unittest.TestCase):
+
+    def test_session_observations_reach_parent(self):
+        parent = StageMetrics()
+        session = StageMetrics(parent=parent)
+        with session.time("asr"):
+            pass
+
+        self.assertEqual(session.summary()["asr"]["count"], 1)
+        self.assertEqual(parent.summary()["asr"]["count"], 1)
+
+    def test_tasks_inherit_the_session(self):
+        session = StageMetrics()
+
+        async def lookup():
+            with stage("enrich.wikipedia"):
+                await asyncio.sleep(0)
+
+        async def handler():
+            current_metrics.set(session)
+            await asyncio.gather(asyncio.create_task(lookup()), asyncio.create_task(lookup()))
+
+        asyncio.run(handler())
+        self.assertEqual(session.summary()["enrich.wikipedia"]["count"], 2)
+
+    def test_prometheus_rendering(self):
+        session = metrics.session_metrics("abc")
+        session.observe("decode", 0.003)
+        text = render_prometheus({"contextify_windows_silent_total": 4}, {"contextify_active_sessions": 2})
+        summaries = metrics.session_summaries()
+        metrics.end_session("abc")
+
+        self.assertIn('contextify_stage_seconds_bucket{stage="decode",le="0.005"}', text)
+        self.assertIn('contextify_stage_seconds_count{stage="decode"}', text)
+        self.assertNotIn("session=", text)
+        self.assertEqual(summaries["abc"]["decode"]["count"], 1)
+        self.assertIn('contextify_stage_seconds_bucket{stage="decode",le="+Inf"}', text)
+        self.assertIn("# TYPE contextify_windows_silent_total counter\ncontextify_windows_silent_total 4", text)
+        self.assertIn("# TYPE contextify_active_sessions gauge\ncontextify_active_sessions 2", text)
+        self.assertNotIn("abc", metrics.session_summaries())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from api_utils.news_store import NewsStore, split_news
+
+def article(title):
+    return {"name": title, "description": ""}
+
+class FakeBing:
+
+    def __init__(self):
+        self.queries = []
+
+    async def __call__(self, query, count):
+        self.queries.append((query, count))
+        await asyncio.sleep(0.01)
+        if "Acme" in query and " OR " not in query:
+            return {"value": []}
+        names = [part.strip('"') for part in query.split(" OR ")]
+        return {"value": [article(f"{name} news") for name in names if name != "Acme"]}
+
+class TestNewsStore(unittest.TestCase):
+
+    def test_split_news(self):
+        split = split_news({"value": [article("Amazon and Google team up"), article("Amazon earnings")]}, ["Amazon", "Google"], 1)
+        self.assertEqual([a["name"] for a in split["Amazon"]], ["Amazon and Google team up"])
+        self.assertEqual([a["name"] for a in split["Google"]], ["Amazon and Google team up"])
+
+    def test_cold_misses_share_one_fetch_and_later_reads_do_not_block(self):
+        bing = FakeBing()
+        store = NewsStore(fetch=bing)
+
+        async def scenario():
+            results = await asyncio.gather(store.get("Amazon"), store.get(" amazon "))
+            again = await store.get("AMAZON")
+            return results, again
+
+        results, again = asyncio.run(scenario())
+        self.assertEqual(len(bing.queries), 1)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(again["value"][0]["name"], "Amazon news")
+        self.assertEqual(store.stats()["cold_misses"], 2)
+        self.assertEqual(store.stats()["fresh_hits"], 1)
+
+    def test_refresh_batches_active_companies(self):
+        bing = FakeBing()
+        store = NewsStore(fetch=bing, refresh_interval=0, batch_size=5)
+        for company in ("Amazon", "Google", "Acme", "Amazon", "Nvidia"):
+            store.peek(company)
+        store._entries["nvidia"].last_seen -= store.active_seconds + 1
+
+        due = asyncio.run(store.refresh_once())
+        self.assertEqual(due, 3)
+        # One combined query, plus one of its own for the company it did not cover.
+        self.assertEqual(bing.queries, [('"Amazon" OR "Google" OR "Acme"', 6), ("Acme", 2)])
+        self.assertEqual(store.peek("Google")["value"][0]["name"], "Google news")
+        self.assertEqual(store.peek("Acme"), {"value": []})
+        self.assertEqual(store.stats()["companies"], 3)
+
+    def test_leftovers_are_fetched_concurrently(self):
+        bing = FakeBing()
+        in_flight = []
+        peaks = []
+
+        async def nothing_combined(query, count):
+            # Combined queries say nothing about any company.
+            if " OR " in query:
+                return {"value": []}
+            in_flight.append(query)
+            try:
+                return await bing(query, count)
+            finally:
+                in_flight.remove(query)
+                peaks.append(len(in_flight) + 1)
+
+        store = NewsStore(fetch=nothing_combined, refresh_interval=0, batch_size=4, concurrency=2)
+        for company in ("Amazon", "Google", "Nvidia", "Intel"):
+            store.peek(company)
+
+        asyncio.run(store.refresh_once())
+        self.assertEqual(sorted(query for query, _ in bing.queries), ["Amazon", "Google", "Intel", "Nvidia"])
+        # Under the refresh concurrency limit, but not one at a time.
+        self.assertEqual(max(peaks), 2)
+        self.assertEqual(store.peek("Intel")["value"][0]["name"], "Intel news")
+
+    def test_errors_are_not_stored(self):
+        async def failing(query, count):
+            return {"error": "503"}
+
+        store = NewsStore(fetch=failing)
+        self.assertIn("error", asyncio.run(store.get("Amazon")))
+        self.assertIsNone(store.peek("Amazon"))
+        self.assertEqual(store.stats()["refresh_errors"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import unittest
+import numpy as np
+from audio_processing.scheduler import InferenceScheduler, MAX_MERGED_SAMPLES
+
+# Longer than half of MAX_MERGED_SAMPLES, so queued finals are never merged.
+LONG = MAX_MERGED_SAMPLES // 2 + 1
+
+def window(extra):
+    return np.zeros(LONG + extra, dtype=np.float32)
+
+class TestInferenceScheduler(unittest.TestCase):
+
+    def run_scenario(self, transcribe_batch, submit, max_batch_size=8, models=None, fast_models=()):
+        async def scenario():
+            scheduler = InferenceScheduler(
+                models or [object()], transcribe_batch, max_batch_size=max_batch_size, fast_models=fast_models
+            )
+            await scheduler.start()
+            try:
+                return await submit(scheduler)
+            finally:
+                await scheduler.stop()
+
+        return asyncio.run(scenario())
+
+    def test_sessions_are_served_round_robin(self):
+        release = threading.Event()
+        batches = []
+
+        def transcribe_batch(model, audios, prompts):
+            if not batches:
+                release.wait(5)
+            batches.append([audio.size - LONG for audio in audios])
+            return ["" for _ in audios]
+
+        async def submit(scheduler):
+            blocker = asyncio.create_task(scheduler.transcribe("other", window(0)))
+            await asyncio.sleep(0.05)
+            jobs = [asyncio.create_task(scheduler.transcribe("busy", window(i))) for i in (1, 2, 3)]
+            await asyncio.sleep(0)
+            jobs.append(asyncio.create_task(scheduler.transcribe("quiet", window(10))))
+            await asyncio.sleep(0)
+            release.set()
+            await asyncio.gather(blocker, *jobs)
+
+        self.run_scenario(transcribe_batch, submit, max_batch_size=2)
+        # The quiet session is served in the first batch, not after the busy one drains.
+        self.assertEqual(batches[1:], [[1, 10], [2], [3]])
+
+    def test_queued_partial_is_superseded(self):
+        release = threading.Event()
+
+        def transcribe_batch(model, audios, prompts):
+            release.wait(5)
+            return [str(audio.size) for audio in audios]
+
+        async def submit(scheduler):
+            blocker = asyncio.create_task(scheduler.transcribe("other", np.zeros(1, dtype=np.float32)))
+            await asyncio.sleep(0.05)
+            partial = asyncio.create_task(scheduler.transcribe("s", np.zeros(5, dtype=np.float32), is_final=False))
+            await asyncio.sleep(0)
+            newer = asyncio.create_task(scheduler.transcribe("s", np.zeros(7, dtype=np.float32), is_final=False))
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(blocker, partial, newer), scheduler.stats()
+
+        results, stats = self.run_scenario(transcribe_batch, submit)
+        self.assertEqual(results, ["1", None, "7"])
+        self.assertEqual(stats["superseded"], 1)
+
+    def test_batch_error_fails_every_job_in_it(self):
+        release = threading.Event()
+        failing = threading.Event()
+
+        def transcribe_batch(model, audios, prompts):
+            if not release.is_set():
+                release.wait(5)
+            elif failing.is_set():
+                raise RuntimeError("model crashed")
+            return ["" for _ in audios]
+
+        async def submit(scheduler):
+            blocker = asyncio.create_task(scheduler.transcribe("other", np.zeros(1, dtype=np.float32)))
+            await asyncio.sleep(0.05)
+            jobs = [asyncio.create_task(scheduler.transcribe(name, np.zeros(3, dtype=np.float32))) for name in "ab"]
+            await asyncio.sleep(0)
+            failing.set()
+            release.set()
+            await blocker
+            results = await asyncio.gather(*jobs, return_exceptions=True)
+            # The scheduler keeps serving after a failed batch.
+            failing.clear()
+            return results, await scheduler.transcribe("c", np.zeros(3, dtype=np.float32))
+
+        results, after = self.run_scenario(transcribe_batch, submit)
+        self.assertEqual([type(result) for result in results], [RuntimeError, RuntimeError])
+        self.assertEqual(after, "")
+
+    def test_merged_finals_drop_the_repeated_overlap(self):
+        release = threading.Event()
+        batches = []
+
+        def transcribe_batch(model, audios, prompts):
+            release.wait(5)
+            batches.append(list(zip([audio.tolist() for audio in audios], prompts)))
+            return [str(audio.size) for audio in audios]
+
+        async def submit(scheduler):
+            blocker = asyncio.create_task(scheduler.transcribe("other", np.zeros(1, dtype=np.float32)))
+            await asyncio.sleep(0.05)
+            first = asyncio.create_task(scheduler.transcribe("s", np.arange(4, dtype=np.float32), "a"))
+            await asyncio.sleep(0)
+            # Starts with the last two samples of the first window.
+            second = asyncio.create_task(scheduler.transcribe("s", np.arange(2, 7, dtype=np.float32), "b", overlap=2))
+            await asyncio.sleep(0)
+            release.set()
+            await blocker
+            return await asyncio.gather(first, second)
+
+        results = self.run_scenario(transcribe_batch, submit)
+        self.assertEqual(results, [None, "7"])
+        self.assertEqual(batches[-1], [([0, 1, 2, 3, 4, 5, 6], "b")])
+
+    def test_fast_workers_do_not_swallow_wakeups(self):
+        def transcribe_batch(model, audios, prompts):
+            return [model for _ in audios]
+
+        async def submit(scheduler):
+            results = []
+            for name, fast in (("a", False), ("b", True), ("c", False), ("d", False)):
+                # Once the normal worker has served a window, the idle fast
+                # worker waits ahead of it for the next wakeup.
+                job = scheduler.transcribe(name, np.zeros(3, dtype=np.float32), fast=fast)
+                results.append(await asyncio.wait_for(job, 2))
+            return results
+
+        results = self.run_scenario(transcribe_batch, submit, models=["normal"], fast_models=["fast"])
+        self.assertEqual([results[0], results[2], results[3]], ["normal"] * 3)
+        self.assertIn(results[1], ("normal", "fast"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from api_utils.semantic_cache import SemanticCache, embed
+
+class TestSemanticCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "semantic.term")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_embeddings_are_normalized_and_stable(self):
+        vectors = embed(["quantum computing", ""])
+        self.assertAlmostEqual(float(vectors[0] @ vectors[0]), 1.0, places=5)
+        self.assertFalse(vectors[1].any())
+        self.assertTrue((embed(["quantum computing"])[0] == vectors[0]).all())
+
+    def test_near_duplicates_hit_and_distinct_terms_miss(self):
+        cache = SemanticCache(threshold=0.85)
+        cache.put("quantum computing", "A type of computation.")
+
+        self.assertEqual(cache.get("Quantum  Computing"), (True, "A type of computation.", "quantum computing"))
+        self.assertFalse(cache.get("quantum chromodynamics")[0])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_inflected_variants_hit(self):
+        cache = SemanticCache(threshold=0.85)
+        cache.put("quantum computing", "A type of computation.")
+        for query in ("quantum computer", "Quantum Computer", "quantum computers"):
+            with self.subTest(query=query):
+                self.assertEqual(cache.get(query), (True, "A type of computation.", "quantum computing"))
+        self.assertFalse(cache.get("quantum compilers")[0])
+
+    def test_different_terms_miss(self):
+        pairs = [
+            ("C++", "C#"), ("C++", "C"), ("C#", "C"), ("F#", "F"),
+            ("transformer", "transformation"), ("cookies", "cooking"), ("marketing", "markets"),
+            ("encoder", "encoding"), ("compiler", "compilation"), ("neural network", "neural network pruning"),
+            ("quantum computing", "quantum compilation")
+        ]
+        for stored, query in pairs:
+            with self.subTest(stored=stored, query=query):
+                cache = SemanticCache(threshold=0.85)
+                cache.put(stored, stored)
+                self.assertFalse(cache.get(query)[0])
+                self.assertTrue(cache.get(stored.upper())[0])
+
+    def test_plurals_hit(self):
+        cache = SemanticCache(threshold=0.85)
+        cache.put("transformer", 1)
+        self.assertEqual(cache.get("Transformers")[1], 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = SemanticCache(capacity=2)
+        cache.put("neural network", 1)
+        cache.put("gradient descent", 2)
+        cache.get("neural networks")
+        cache.put("backpropagation", 3)
+
+        self.assertTrue(cache.get("neural network")[0])
+        self.assertFalse(cache.get("gradient descent")[0])
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entries_are_ignored(self):
+        cache = SemanticCache(ttl=-1)
+        cache.put("graph theory", 1)
+        self.assertFalse(cache.get("graph theory")[0])
+
+    def test_survives_restart(self):
+        cache = SemanticCache(self.path, capacity=4)
+        cache.put("quantum computing", "A type of computation.")
+        cache.put("quantum computing", "Computation with qubits.")
+        cache.close()
+
+        reopened = SemanticCache(self.path, capacity=4)
+        self.assertEqual(reopened.get("quantum computers")[1], "Computation with qubits.")
+        self.assertEqual(len(reopened), 1)
+        reopened.close()
+
+    def test_second_opener_stays_in_memory(self):
+        owner = SemanticCache(self.path, capacity=4)
+        other = SemanticCache(self.path, capacity=4)
+        other.put("graph theory", 1)
+        owner.close()
+        other.close()
+
+        reopened = SemanticCache(self.path, capacity=4)
+        self.assertFalse(reopened.get("graph theory")[0])
+        reopened.close()
+
+if __name__ == "__main__":
+    unittest.main()
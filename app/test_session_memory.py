@@ -0,0 +1,39 @@
+import unittest
+from api_utils.entities import NAMES, COURSES, TERMS
+from api_utils.session_memory import SessionMemory
+
+class TestSessionMemory(unittest.TestCase):
+
+    def test_repeats_are_referenced_by_id(self):
+        memory = SessionMemory()
+        new, repeated = memory.split({NAMES: ["Jeff Bezos"], COURSES: ["CMPSC 130A"]})
+        self.assertEqual(new[NAMES], ["Jeff Bezos"])
+        self.assertEqual(repeated, [])
+        person_id = memory.record(NAMES, "Jeff Bezos")
+        course_id = memory.record(COURSES, "CMPSC 130A")
+
+        new, repeated = memory.split({NAMES: ["jeff  bezos"], COURSES: ["CMPSC130A"], TERMS: ["recursion"]})
+        self.assertEqual(new[NAMES], [])
+        self.assertEqual(new[TERMS], ["recursion"])
+        self.assertEqual(repeated, [person_id, course_id])
+        self.assertEqual((person_id, course_id), ("person-1", "course-1"))
+
+    def test_in_flight_entities_are_not_enriched_twice(self):
+        memory = SessionMemory()
+        memory.split({TERMS: ["recursion"]})
+        new, repeated = memory.split({TERMS: ["Recursion"]})
+        self.assertEqual(new[TERMS], [])
+        self.assertEqual(repeated, ["term-1"])
+
+    def test_failed_lookups_are_retried_under_the_same_id(self):
+        memory = SessionMemory()
+        memory.split({TERMS: ["recursion"]})
+        self.assertEqual(memory.record(TERMS, "recursion", resolved=False), "term-1")
+
+        new, repeated = memory.split({TERMS: ["recursion"]})
+        self.assertEqual(new[TERMS], ["recursion"])
+        self.assertEqual(memory.record(TERMS, "recursion"), "term-1")
+        self.assertEqual(memory.stats(), {"known": 1, "enriched": 1, "reused": 0})
+
+if __name__ == "__main__":
+    unittest.main()
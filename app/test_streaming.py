@@ -0,0 +1,138 @@
+import unittest
+import numpy as np
+from audio_processing.streaming import RingBuffer, StreamingTranscriber, merge_overlap
+from audio_processing.vad import EnergyVAD, speech_segments
+
+def tone(seconds, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def silence(seconds, sample_rate=16000):
+    return np.zeros(int(seconds * sample_rate), dtype=np.float32)
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_keeps_most_recent_samples_in_order(self):
+        buffer = RingBuffer(5)
+        buffer.extend(np.arange(3, dtype=np.float32))
+        buffer.extend(np.arange(3, 7, dtype=np.float32))
+
+        np.testing.assert_array_equal(buffer.snapshot(), [2, 3, 4, 5, 6])
+
+    def test_keep_last(self):
+        buffer = RingBuffer(4)
+        buffer.extend(np.arange(6, dtype=np.float32))
+        buffer.keep_last(2)
+        buffer.extend(np.array([9], dtype=np.float32))
+
+        np.testing.assert_array_equal(buffer.snapshot(), [4, 5, 9])
+
+class TestMergeOverlap(unittest.TestCase):
+
+    def test_drops_repeated_words(self):
+        result = merge_overlap("we talked about CMPSC 130A today", "130A today, and then Amazon")
+        self.assertEqual(result, "and then Amazon")
+
+    def test_no_overlap(self):
+        self.assertEqual(merge_overlap("hello there", "general Kenobi"), "general Kenobi")
+
+class TestStreamingTranscriber(unittest.TestCase):
+
+    def test_partials_then_final_with_overlap(self):
+        streamer = StreamingTranscriber(window_seconds=3, hop_seconds=1, overlap_seconds=1, sample_rate=10)
+        finals = []
+        for _ in range(3):
+            streamer.feed(np.ones(10, dtype=np.float32))
+            self.assertTrue(streamer.ready())
+            audio, prompt, is_final = streamer.next_window()
+            finals.append(is_final)
+
+        self.assertEqual(finals, [False, False, True])
+        self.assertEqual(audio.size, 30)
+        self.assertEqual(streamer.accept("one two three", True), "one two three")
+
+        streamer.feed(np.ones(10, dtype=np.float32))
+        audio, prompt, is_final = streamer.next_window()
+        self.assertEqual(audio.size, 20)
+        self.assertEqual(streamer.repeated_samples, 10)
+        self.assertEqual(prompt, "one two three")
+        self.assertEqual(streamer.accept("three four", is_final), "four")
+
+    def test_long_transcript_keeps_a_bounded_tail(self):
+        streamer = StreamingTranscriber(prompt_chars=20, sample_rate=10)
+        texts = [streamer.accept(f"word{i} and more", True) for i in range(2000)]
+
+        self.assertLessEqual(len(streamer.committed_text.split()), 16)
+        texts.append(streamer.accept("word1999 and more next", True))
+        self.assertEqual(texts[-1], "next")
+        streamer.feed(np.ones(10, dtype=np.float32))
+        self.assertEqual(streamer.next_window()[1], "more word1999 and more next"[-20:])
+        self.assertTrue(" ".join(texts).startswith("word0 and more word1 and more"))
+        self.assertTrue(streamer.committed_text.endswith("word1999 and more next"))
+
+def stream_speech_fraction(vad, audio, chunk_seconds=1, sample_rate=16000):
+    """
+    Speech fraction of each chunk, fed to `vad` one chunk at a time.
+    """
+    chunk = int(chunk_seconds * sample_rate)
+    return [float(vad.speech_frames(audio[i:i + chunk]).mean()) for i in range(0, audio.size, chunk)]
+
+class TestEnergyVAD(unittest.TestCase):
+
+    def test_steady_noise_above_min_energy_is_not_speech(self):
+        rng = np.random.default_rng(0)
+        t = np.arange(10 * 16000) / 16000
+        noises = {
+            "white noise at -35 dB": (10 ** (-35 / 20) * rng.standard_normal(t.size)).astype(np.float32),
+            "120 Hz hum at -42 dB": (10 ** (-42 / 20) * np.sqrt(2) * np.sin(2 * np.pi * 120 * t)).astype(np.float32)
+        }
+        for name, noise in noises.items():
+            with self.subTest(name):
+                vad = EnergyVAD()
+                fractions = stream_speech_fraction(vad, noise)
+                # Only the first noise window is judged against the assumed floor.
+                self.assertEqual(fractions[4:], [0.0] * 6)
+                self.assertGreater(vad.noise_floor_db, -50)
+
+                speech = noise.copy()
+                speech[:16000] += tone(1)
+                self.assertGreater(stream_speech_fraction(vad, speech)[0], 0.9)
+
+class TestVoiceActivityGate(unittest.TestCase):
+
+    def test_silent_windows_are_skipped(self):
+        streamer = StreamingTranscriber(window_seconds=2, hop_seconds=1, overlap_seconds=0.5, vad=EnergyVAD())
+        for _ in range(4):
+            streamer.feed(silence(1))
+            audio, prompt, is_final = streamer.next_window()
+            self.assertIsNone(audio)
+        self.assertEqual(streamer.silent_windows, 4)
+
+    def test_silence_is_trimmed(self):
+        streamer = StreamingTranscriber(window_seconds=10, hop_seconds=1, vad=EnergyVAD())
+        streamer.feed(np.concatenate([silence(1), tone(1), silence(0.3)]))
+        audio, prompt, is_final = streamer.next_window()
+
+        self.assertFalse(is_final)
+        self.assertLess(audio.size, 1.6 * 16000)
+        self.assertGreaterEqual(audio.size, 16000)
+
+    def test_pause_finalizes_early(self):
+        streamer = StreamingTranscriber(window_seconds=10, hop_seconds=1, vad=EnergyVAD(), min_final_seconds=2)
+        streamer.feed(np.concatenate([tone(2.5), silence(1)]))
+        audio, prompt, is_final = streamer.next_window()
+
+        self.assertTrue(is_final)
+        self.assertLess(audio.size, 3 * 16000)
+        streamer.feed(silence(1))
+        self.assertIsNone(streamer.next_window()[0])
+
+    def test_recording_is_packed_into_segments_at_pauses(self):
+        speech = np.array([1, 1, 0, 1, 1, 0, 0, 0, 1, 1, 1, 0, 0, 0] + [1] * 15, dtype=bool)
+        segments = speech_segments(speech, 10, min_pause_frames=3, max_segment_frames=12, padding_frames=0)
+        # The one-frame gap is bridged, the first two regions share a
+        # segment, and the final 15-frame run is cut at the maximum.
+        self.assertEqual(segments, [(0, 110), (140, 260), (260, 290)])
+
+if __name__ == "__main__":
+    unittest.main()
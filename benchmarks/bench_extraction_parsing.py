@@ -0,0 +1,50 @@
+"""
+Compares parsing cost of the structured (JSON) extraction output with the
+legacy bracket-list output, using the recorded model outputs from the test
+corpus.
+
+    python -m benchmarks.bench_extraction_parsing [--number 20000]
+"""
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.api_utils.gpt_utils import parse_extraction_output, process_output_as_dict
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "test_data", "extraction_outputs.json")
+
+
+def to_legacy(entities: dict) -> str:
+    return "\n".join([
+        f"Names: [{', '.join(entities['Names'])}]",
+        f"Companies: [{', '.join(entities['Companies'])}]",
+        f"Courses: [{', '.join(entities['Courses'])}]",
+        f"Technical terms: [{', '.join(entities['Terms'])}]"
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    structured_cases = [case for case in corpus if case["raw_output"].startswith("{")]
+    structured = [case["raw_output"] for case in structured_cases]
+    legacy = [to_legacy(case["expected"]) for case in structured_cases]
+
+    for label, outputs, parse in (
+        ("structured json", structured, parse_extraction_output),
+        ("legacy brackets", legacy, process_output_as_dict)
+    ):
+        seconds = timeit.timeit(lambda: [parse(raw) for raw in outputs], number=args.number)
+        per_output = seconds / (args.number * len(outputs)) * 1e6
+        print(f"{label:>16}: {per_output:7.2f} us per output ({len(outputs)} outputs x {args.number})")
+
+
+if __name__ == "__main__":
+    main()
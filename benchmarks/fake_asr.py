@@ -0,0 +1,42 @@
+"""
+Stand-in ASR backend for load tests on hosts without Whisper weights.
+Select it with ASR_BACKEND=benchmarks.fake_asr:FakeAsrBackend.
+
+Each batch sleeps for FAKE_ASR_BATCH_SECONDS plus FAKE_ASR_SECONDS_PER_AUDIO_SECOND
+times the audio it was given, to mimic model cost, and returns a rotating
+sentence that mentions people, companies, courses and terms so the
+extraction and enrichment stages get exercised.
+"""
+import itertools
+import os
+import time
+
+from app.audio_processing.asr_backends import AsrBackend
+from app.audio_processing.audio_utils import TARGET_SAMPLE_RATE
+
+SENTENCES = (
+    "Today we will talk about CMPSC 130A and how Amazon uses dynamic programming.",
+    "Ada Lovelace wrote the first published algorithm for a computing machine.",
+    "The quantum computing group at Google collaborates with Alan Turing Institute researchers.",
+    "For PSTAT 120A you need to understand Bayesian inference and Markov chains.",
+    "Microsoft and Nvidia both announced new hardware for transformer models."
+)
+
+
+class FakeAsrBackend(AsrBackend):
+
+    name = "fake"
+
+    def __init__(self, model_size: str = "fake", threads: int = 0, beam_size: int = None):
+        super().__init__(model_size, threads, beam_size)
+        self.batch_seconds = float(os.getenv("FAKE_ASR_BATCH_SECONDS", "0.05"))
+        self.seconds_per_audio_second = float(os.getenv("FAKE_ASR_SECONDS_PER_AUDIO_SECOND", "0.02"))
+        self._sentences = itertools.cycle(SENTENCES)
+
+    def load(self):
+        return None
+
+    def transcribe_batch(self, model, audios: list, prompts: list) -> list:
+        audio_seconds = sum(len(audio) for audio in audios) / TARGET_SAMPLE_RATE
+        time.sleep(self.batch_seconds + self.seconds_per_audio_second * audio_seconds)
+        return [next(self._sentences) for _ in audios]
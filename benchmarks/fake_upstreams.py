@@ -0,0 +1,232 @@
+"""
+Local stand-ins for the OpenAI chat completions, Wikipedia (REST and
+MediaWiki query) and Bing News APIs, with injectable latency and errors.
+
+    python -m benchmarks.fake_upstreams --port 8900 --latency-ms 150 --error-rate 0.02
+
+Point the service at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    WIKIPEDIA_BASE_URL=http://127.0.0.1:8900
+    BING_NEWS_ENDPOINT=http://127.0.0.1:8900/v7.0/news/search
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Names the fake extractor recognizes, by entity key.
+KNOWN_ENTITIES = {
+    "Names": ("Ada Lovelace", "Alan Turing"),
+    "Companies": ("Amazon", "Google", "Microsoft", "Nvidia"),
+    "Terms": ("dynamic programming", "quantum computing", "Bayesian inference", "Markov chains", "transformer models")
+}
+COURSE_RE = re.compile(r"\b([A-Z]{2,5}) ?(\d{1,3}[A-Z]?)\b")
+
+
+@dataclass
+class UpstreamBehavior:
+    """
+    Latency (mean +- uniform jitter, in ms) and the share of requests
+    answered with a 503, for one fake upstream.
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    async def apply(self):
+        """
+        Sleeps for the configured latency; returns an error response to
+        send instead of the real one, or None.
+        """
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"error": {"message": "injected failure"}}, status_code=503)
+        return None
+
+
+@dataclass
+class FakeUpstreams:
+    openai: UpstreamBehavior = field(default_factory=UpstreamBehavior)
+    wikipedia: UpstreamBehavior = field(default_factory=UpstreamBehavior)
+    bing: UpstreamBehavior = field(default_factory=UpstreamBehavior)
+    requests: dict = field(default_factory=dict)
+
+    def count(self, upstream: str) -> None:
+        self.requests[upstream] = self.requests.get(upstream, 0) + 1
+
+
+def fake_summary(name: str) -> str:
+    return f"{name} is a subject of this benchmark. This sentence stands in for its description. It is deliberately bland."
+
+
+def chat_completion(content: str, model: str) -> dict:
+    return {
+        "id": f"chatcmpl-fake-{random.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+def answer_chat(body: dict) -> str:
+    """
+    Produces a plausible reply for each kind of request the service sends:
+    entity extraction, batched summaries and single summaries.
+    """
+    user = body["messages"][-1]["content"]
+    schema_name = (body.get("response_format") or {}).get("json_schema", {}).get("name")
+    if schema_name == "entities":
+        entities = {key: [name for name in names if name.lower() in user.lower()] for key, names in KNOWN_ENTITIES.items()}
+        entities["Courses"] = [f"{subject} {number}" for subject, number in COURSE_RE.findall(user)]
+        return json.dumps(entities)
+    if schema_name == "summaries":
+        items = json.loads(user)
+        return json.dumps({"summaries": [{"id": item["id"], "summary": fake_summary(item["name"])} for item in items]})
+    name = re.search(r"Name: (.*)", user)
+    return fake_summary(name.group(1).strip() if name else "This entity")
+
+
+def create_app(upstreams: FakeUpstreams) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        upstreams.count("openai")
+        body = await request.json()
+        error = await upstreams.openai.apply()
+        return error or chat_completion(answer_chat(body), body.get("model", "gpt-4o"))
+
+    @app.get("/w/api.php")
+    async def mediawiki_query(titles: str = ""):
+        upstreams.count("wikipedia")
+        error = await upstreams.wikipedia.apply()
+        if error:
+            return error
+        pages = []
+        for title in titles.split("|"):
+            if title.endswith("(company)") or "Unknown" in title:
+                pages.append({"title": title, "missing": True})
+            else:
+                pages.append({"title": title, "extract": fake_summary(title)})
+        return {"query": {"pages": pages}}
+
+    @app.get("/api/rest_v1/page/summary/{title}")
+    async def rest_summary(title: str):
+        upstreams.count("wikipedia")
+        error = await upstreams.wikipedia.apply()
+        if error:
+            return error
+        if "Unknown" in title:
+            return JSONResponse({"type": "not_found"}, status_code=404)
+        return {"type": "standard", "title": title, "extract": fake_summary(title)}
+
+    @app.get("/v7.0/news/search")
+    async def news_search(q: str = "", count: int = 10):
+        upstreams.count("bing")
+        error = await upstreams.bing.apply()
+        if error:
+            return error
+        return {"value": [
+            {
+                "name": f"{q} in the news, part {i + 1}",
+                "description": f"A fake article about {q}.",
+                "image": {"thumbnail": {"contentUrl": "https://example.invalid/thumb.jpg"}}
+            }
+            for i in range(count)
+        ]}
+
+    @app.get("/_stats")
+    async def stats():
+        return upstreams.requests
+
+    return app
+
+
+class FakeUpstreamServer:
+    """
+    Runs the fake upstreams with uvicorn on a background thread.
+    """
+
+    def __init__(self, upstreams: FakeUpstreams, host: str = "127.0.0.1", port: int = 8900):
+        self.upstreams = upstreams
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(create_app(upstreams), host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def environment(self) -> dict:
+        """
+        Environment variables that point the service at this server.
+        """
+        return {
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "WIKIPEDIA_BASE_URL": self.base_url,
+            "BING_API_KEY": "fake",
+            "BING_NEWS_ENDPOINT": f"{self.base_url}/v7.0/news/search"
+        }
+
+    def start(self) -> "FakeUpstreamServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mean latency of every upstream")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    for upstream in ("openai", "wikipedia", "bing"):
+        parser.add_argument(f"--{upstream}-latency-ms", type=float, default=None)
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=None)
+
+
+def upstreams_from_args(args: argparse.Namespace) -> FakeUpstreams:
+    def behavior(upstream: str) -> UpstreamBehavior:
+        latency = getattr(args, f"{upstream}_latency_ms")
+        error_rate = getattr(args, f"{upstream}_error_rate")
+        return UpstreamBehavior(
+            latency_ms=args.latency_ms if latency is None else latency,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate if error_rate is None else error_rate
+        )
+    return FakeUpstreams(openai=behavior("openai"), wikipedia=behavior("wikipedia"), bing=behavior("bing"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(upstreams_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
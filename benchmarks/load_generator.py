@@ -0,0 +1,273 @@
+"""
+Opens N concurrent /ws/audio sessions, streams PCM at real-time (or faster)
+pace and reports time-to-transcript, time-to-enrichment and throughput.
+
+    python -m benchmarks.load_generator --url ws://127.0.0.1:8000/ws/audio --sessions 8 --speed 1
+
+Audio comes from --pcm (raw little-endian int32, 44.1 kHz mono, exactly what
+the macOS client sends), --wav (any mono WAV, converted), or a synthetic
+stream of tone bursts separated by pauses.
+
+--codec picks the format negotiated on the handshake (pcm_s32le_44k,
+pcm_s16le_16k, flac or opus); the compressed ones are encoded up front
+with PyAV, and the report includes the bytes sent per audio second.
+
+Latencies are measured against the "audio_end" stream position the server
+puts on every message: the time from sending the chunk that completed that
+position to receiving the message.
+"""
+import argparse
+import asyncio
+import bisect
+import io
+import json
+import os
+import time
+import wave
+
+import numpy as np
+import websockets
+
+SOURCE_SAMPLE_RATE = 44100
+
+
+def synthetic_pcm(seconds: float, burst_seconds: float = 2.5, pause_seconds: float = 0.8) -> bytes:
+    """
+    Voiced-sounding tone bursts with pauses, so the VAD gate sees speech.
+    """
+    t = np.arange(int(seconds * SOURCE_SAMPLE_RATE)) / SOURCE_SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.1 * np.sin(2 * np.pi * 720 * t)
+    period = burst_seconds + pause_seconds
+    signal[(t % period) >= burst_seconds] = 0.0
+    return (signal * 2 ** 30).astype("<i4").tobytes()
+
+
+def wav_to_pcm(path: str) -> bytes:
+    with wave.open(path, "rb") as wav:
+        if wav.getnchannels() != 1:
+            raise ValueError("expected a mono WAV file")
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}[width]
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float64)
+    if width == 1:
+        samples -= 128
+    samples /= float(2 ** (8 * width - 1))
+    if rate != SOURCE_SAMPLE_RATE:
+        positions = np.arange(int(len(samples) * SOURCE_SAMPLE_RATE / rate)) * rate / SOURCE_SAMPLE_RATE
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return (np.clip(samples, -1, 1) * (2 ** 31 - 1)).astype("<i4").tobytes()
+
+
+def to_messages(pcm: bytes, codec: str, chunk_ms: int) -> list:
+    """
+    Encodes client-format PCM for `codec` and slices it into WebSocket
+    messages. Returns (message, seconds of audio) pairs.
+    """
+    samples = np.frombuffer(pcm, dtype="<i4").astype(np.float32) / 2 ** 31
+    seconds = samples.size / SOURCE_SAMPLE_RATE
+    if codec == "pcm_s32le_44k":
+        data = pcm
+    elif codec == "pcm_s16le_16k":
+        positions = np.arange(int(seconds * 16000)) * SOURCE_SAMPLE_RATE / 16000
+        data = (np.interp(positions, np.arange(samples.size), samples) * 32767).astype("<i2").tobytes()
+    elif codec == "opus":
+        # One raw Opus packet per message, 20 ms each.
+        import av
+        encoder = av.CodecContext.create("libopus", "w")
+        encoder.sample_rate = 48000
+        encoder.layout = "mono"
+        encoder.format = "s16"
+        encoder.bit_rate = 24000
+        positions = np.arange(int(seconds * 48000)) * SOURCE_SAMPLE_RATE / 48000
+        pcm48 = (np.interp(positions, np.arange(samples.size), samples) * 32767).astype(np.int16)
+        messages = []
+        for offset in range(0, pcm48.size - 959, 960):
+            frame = av.AudioFrame.from_ndarray(pcm48[None, offset:offset + 960], format="s16", layout="mono")
+            frame.sample_rate = 48000
+            frame.pts = offset
+            messages += [(bytes(packet), 0.02) for packet in encoder.encode(frame)]
+        return messages
+    elif codec == "flac":
+        import av
+        buffer = io.BytesIO()
+        with av.open(buffer, "w", format="flac") as container:
+            stream = container.add_stream("flac", rate=SOURCE_SAMPLE_RATE, layout="mono")
+            stream.format = "s16"
+            frame = av.AudioFrame.from_ndarray((samples * 32767).astype(np.int16)[None, :], format="s16", layout="mono")
+            frame.sample_rate = SOURCE_SAMPLE_RATE
+            for packet in list(stream.encode(frame)) + list(stream.encode(None)):
+                container.mux(packet)
+        data = buffer.getvalue()
+    else:
+        raise ValueError(f"unknown codec {codec!r}")
+    chunk_bytes = max(1, int(len(data) * chunk_ms / 1000 / seconds))
+    return [(data[i:i + chunk_bytes], len(data[i:i + chunk_bytes]) / len(data) * seconds) for i in range(0, len(data), chunk_bytes)]
+
+
+class SessionResult:
+
+    def __init__(self):
+        self.transcript_latencies = []
+        self.final_latencies = []
+        self.enrichment_latencies = []
+        self.audio_seconds = 0.0
+        self.bytes_sent = 0
+        self.messages = 0
+        self.error = None
+
+
+async def run_session(url: str, messages: list, speed: float, drain_seconds: float) -> SessionResult:
+    result = SessionResult()
+    sent_positions = []
+    sent_times = []
+
+    def latency(audio_end: float) -> float:
+        index = bisect.bisect_left(sent_positions, audio_end - 1e-6)
+        if index >= len(sent_times):
+            index = len(sent_times) - 1
+        return time.perf_counter() - sent_times[index]
+
+    async def receive(websocket):
+        async for message in websocket:
+            data = json.loads(message)
+            result.messages += 1
+            if "audio_end" not in data or not sent_times:
+                continue
+            kind = data.get("type")
+            if kind in ("partial", "final"):
+                result.transcript_latencies.append(latency(data["audio_end"]))
+                if kind == "final":
+                    result.final_latencies.append(latency(data["audio_end"]))
+            elif kind in ("enrichment", "references"):
+                result.enrichment_latencies.append(latency(data["audio_end"]))
+
+    try:
+        async with websockets.connect(url, max_size=None) as websocket:
+            receiver = asyncio.create_task(receive(websocket))
+            start = time.perf_counter()
+            position = 0.0
+            for chunk, seconds in messages:
+                position += seconds
+                await websocket.send(chunk)
+                result.bytes_sent += len(chunk)
+                sent_positions.append(position)
+                sent_times.append(time.perf_counter())
+                # Pace against the start time so slow sends do not accumulate drift.
+                delay = start + position / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            result.audio_seconds = position
+            await asyncio.sleep(drain_seconds)
+            receiver.cancel()
+    except Exception as e:
+        result.error = repr(e)
+    return result
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000}
+
+
+async def run_load(
+    url: str,
+    pcm: bytes,
+    sessions: int,
+    chunk_ms: int,
+    speed: float,
+    drain_seconds: float,
+    ramp_seconds: float,
+    codec: str = "pcm_s32le_44k"
+) -> dict:
+    messages = to_messages(pcm, codec, chunk_ms)
+    if codec != "pcm_s32le_44k":
+        url = f"{url}?codec={codec}"
+
+    async def delayed(i):
+        await asyncio.sleep(ramp_seconds * i / max(1, sessions))
+        return await run_session(url, messages, speed, drain_seconds)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(delayed(i) for i in range(sessions)))
+    wall = time.perf_counter() - start
+
+    audio_seconds = sum(r.audio_seconds for r in results)
+    cores = os.cpu_count() or 1
+    return {
+        "sessions": sessions,
+        "codec": codec,
+        "ingress_bytes_per_audio_second": sum(r.bytes_sent for r in results) / audio_seconds if audio_seconds else 0.0,
+        "failed_sessions": [r.error for r in results if r.error],
+        "speed": speed,
+        "wall_seconds": wall,
+        "audio_seconds": audio_seconds,
+        "audio_seconds_per_second": audio_seconds / wall,
+        "audio_seconds_per_second_per_core": audio_seconds / wall / cores,
+        "messages": sum(r.messages for r in results),
+        "time_to_transcript": percentiles([x for r in results for x in r.transcript_latencies]),
+        "time_to_final": percentiles([x for r in results for x in r.final_latencies]),
+        "time_to_enrichment": percentiles([x for r in results for x in r.enrichment_latencies])
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"sessions: {report['sessions']} ({len(report['failed_sessions'])} failed), speed x{report['speed']}")
+    print(f"codec: {report['codec']}, {report['ingress_bytes_per_audio_second'] / 1000:.1f} KB per audio second")
+    print(f"audio: {report['audio_seconds']:.1f} s in {report['wall_seconds']:.1f} s wall, "
+          f"{report['audio_seconds_per_second']:.2f} audio-s/s, "
+          f"{report['audio_seconds_per_second_per_core']:.3f} audio-s/s per core")
+    for key in ("time_to_transcript", "time_to_final", "time_to_enrichment"):
+        stats = report[key]
+        if stats["count"]:
+            print(f"{key:>20}: p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+                  f"p99 {stats['p99_ms']:8.1f} ms  (n={stats['count']})")
+        else:
+            print(f"{key:>20}: no samples")
+    for error in report["failed_sessions"][:5]:
+        print(f"  session error: {error}")
+
+
+def add_load_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 streams in real time, 2 twice as fast")
+    parser.add_argument("--seconds", type=float, default=30.0, help="length of the synthetic stream")
+    parser.add_argument("--pcm", help="raw int32 little-endian 44.1 kHz mono recording")
+    parser.add_argument("--wav", help="mono WAV recording, converted to the client format")
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--codec", default="pcm_s32le_44k", choices=("pcm_s32le_44k", "pcm_s16le_16k", "flac", "opus"))
+    parser.add_argument("--drain-seconds", type=float, default=5.0, help="wait for late messages after the audio ends")
+    parser.add_argument("--ramp-seconds", type=float, default=1.0, help="spread session starts over this long")
+    parser.add_argument("--json", help="also write the report to this file")
+
+
+def load_audio(args: argparse.Namespace) -> bytes:
+    if args.pcm:
+        with open(args.pcm, "rb") as f:
+            return f.read()
+    if args.wav:
+        return wav_to_pcm(args.wav)
+    return synthetic_pcm(args.seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws/audio")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        args.url, load_audio(args), args.sessions, args.chunk_ms, args.speed, args.drain_seconds, args.ramp_seconds,
+        args.codec
+    ))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+End-to-end benchmark: starts the fake upstreams and the service, drives it
+with the load generator and reports latency percentiles and throughput.
+
+    python -m benchmarks.run_e2e --sessions 16 --speed 2 --latency-ms 120 --error-rate 0.01
+
+The service runs in a subprocess with ASR_BACKEND set to the stand-in
+backend unless --asr-backend names a real one (e.g. whisper-int8), so the
+harness also works on hosts without model weights. Throughput per core is
+reported both per host core and per CPU-second the server actually used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .fake_upstreams import FakeUpstreamServer, add_behavior_arguments, upstreams_from_args
+from .load_generator import add_load_arguments, load_audio, print_report, run_load
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_ASR_BACKEND = "benchmarks.fake_asr:FakeAsrBackend"
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """
+    User plus system CPU time of a process, from /proc (Linux only).
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return float("nan")
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float, path: str = "/readyz", poll: float = 0.2) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"service exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}{path}", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(poll)
+    raise TimeoutError(f"service not ready after {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--asr-backend", default=FAKE_ASR_BACKEND)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    add_behavior_arguments(parser)
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    upstream_server = FakeUpstreamServer(upstreams_from_args(args), port=args.upstream_port).start()
+    env = dict(
+        os.environ,
+        **upstream_server.environment(),
+        ASR_BACKEND=args.asr_backend,
+        ENRICHMENT_CACHE_PATH="",
+        SEMANTIC_CACHE_PATH="",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING")
+    )
+    service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, service, args.startup_timeout)
+        cpu_before = process_cpu_seconds(service.pid)
+        report = asyncio.run(run_load(
+            f"ws://127.0.0.1:{args.port}/ws/audio", load_audio(args), args.sessions,
+            args.chunk_ms, args.speed, args.drain_seconds, args.ramp_seconds, args.codec
+        ))
+        server_cpu = process_cpu_seconds(service.pid) - cpu_before
+        report["server_cpu_seconds"] = server_cpu
+        report["audio_seconds_per_server_cpu_second"] = report["audio_seconds"] / server_cpu if server_cpu else None
+        report["upstream_requests"] = dict(upstream_server.upstreams.requests)
+        report["server_stats"] = httpx.get(f"{base_url}/stats", timeout=5).json()
+    finally:
+        service.terminate()
+        service.wait(timeout=10)
+        upstream_server.stop()
+
+    print_report(report)
+    print(f"server CPU: {report['server_cpu_seconds']:.1f} s, "
+          f"{report['audio_seconds_per_server_cpu_second'] or 0:.1f} audio-s per CPU-s")
+    print(f"upstream requests: {report['upstream_requests']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
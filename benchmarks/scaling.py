@@ -0,0 +1,154 @@
+"""
+Multi-process scaling benchmark: serves the API with `python -m app.serve`
+at several worker counts and reports throughput and memory per worker.
+
+    python -m benchmarks.scaling --workers 1 2 4 --sessions-per-worker 4
+    python -m benchmarks.scaling --asr-backend whisper --workers 1 2 4
+
+Sessions grow with the worker count, so ideal scaling keeps audio-s/s per
+worker flat. Memory is read from /proc: RSS counts every page a worker
+maps, including shared weights and indexes; PSS divides shared pages
+among the processes mapping them, so the PSS total is what N workers
+actually cost. Uses the stand-in ASR backend unless --asr-backend names a
+real one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .fake_upstreams import FakeUpstreamServer, add_behavior_arguments, upstreams_from_args
+from .load_generator import add_load_arguments, load_audio, run_load
+from .run_e2e import FAKE_ASR_BACKEND, REPO_ROOT, wait_until_ready
+
+
+def memory_kb(pid: int) -> dict:
+    """
+    {"rss": ..., "pss": ...} in kB from /proc/<pid>/smaps_rollup (Linux only).
+    """
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    usage[name.lower()] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def wait_for_workers(base_url: str, workers: int, timeout: float) -> set:
+    """
+    Polls /stats over fresh connections until `workers` distinct processes
+    have answered. Returns their pids.
+    """
+    pids = set()
+    deadline = time.monotonic() + timeout
+    while len(pids) < workers and time.monotonic() < deadline:
+        try:
+            response = httpx.get(f"{base_url}/stats", timeout=2)
+            if response.status_code == 200 and response.json()["asr"] is not None:
+                pids.add(response.json()["worker_pid"])
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    if len(pids) < workers:
+        raise TimeoutError(f"only {len(pids)} of {workers} workers ready after {timeout}s")
+    return pids
+
+
+def measure(args: argparse.Namespace, workers: int, env: dict, pcm: bytes) -> dict:
+    service = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(args.port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url, service, args.startup_timeout)
+        pids = wait_for_workers(base_url, workers, args.startup_timeout)
+        sessions = args.sessions_per_worker * workers
+        report = asyncio.run(run_load(
+            f"ws://127.0.0.1:{args.port}/ws/audio", pcm, sessions,
+            args.chunk_ms, args.speed, args.drain_seconds, args.ramp_seconds, args.codec
+        ))
+        memory = [memory_kb(pid) for pid in sorted(pids)]
+    finally:
+        service.terminate()
+        service.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "sessions": sessions,
+        "failed_sessions": len(report["failed_sessions"]),
+        "audio_seconds_per_second": report["audio_seconds_per_second"],
+        "time_to_final_p95_ms": report["time_to_final"]["p95_ms"],
+        "rss_mb_per_worker": sum(m.get("rss", 0) for m in memory) / len(memory) / 1024,
+        "pss_mb_per_worker": sum(m.get("pss", 0) for m in memory) / len(memory) / 1024,
+        "pss_mb_total": sum(m.get("pss", 0) for m in memory) / 1024
+    }
+
+
+def print_table(rows: list) -> None:
+    base = rows[0]["audio_seconds_per_second"] if rows else 0
+    print(f"{'workers':>7} {'sessions':>8} {'audio-s/s':>10} {'speedup':>8} {'final p95':>10} "
+          f"{'RSS/worker':>11} {'PSS/worker':>11} {'PSS total':>10}")
+    for row in rows:
+        p95 = row["time_to_final_p95_ms"]
+        print(f"{row['workers']:>7} {row['sessions']:>8} {row['audio_seconds_per_second']:>10.2f} "
+              f"{row['audio_seconds_per_second'] / base if base else 0:>7.2f}x "
+              f"{f'{p95:.0f} ms' if p95 is not None else '-':>10} "
+              f"{row['rss_mb_per_worker']:>8.0f} MB {row['pss_mb_per_worker']:>8.0f} MB {row['pss_mb_total']:>7.0f} MB")
+        if row["failed_sessions"]:
+            print(f"        {row['failed_sessions']} sessions failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions-per-worker", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--asr-backend", default=FAKE_ASR_BACKEND)
+    parser.add_argument("--shared-weights-dir", default=None,
+                        help="passed to app.serve; empty makes every worker load its own weights")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    add_behavior_arguments(parser)
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    upstream_server = FakeUpstreamServer(upstreams_from_args(args), port=args.upstream_port).start()
+    env = dict(
+        os.environ,
+        **upstream_server.environment(),
+        ASR_BACKEND=args.asr_backend,
+        ENRICHMENT_CACHE_PATH="",
+        SEMANTIC_CACHE_PATH="",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING")
+    )
+    if args.shared_weights_dir is not None:
+        env["ASR_SHARED_WEIGHTS_DIR"] = args.shared_weights_dir
+    pcm = load_audio(args)
+    rows = []
+    try:
+        for workers in args.workers:
+            rows.append(measure(args, workers, env, pcm))
+            print(f"{workers} workers: {rows[-1]['audio_seconds_per_second']:.2f} audio-s/s", file=sys.stderr)
+    finally:
+        upstream_server.stop()
+
+    print(f"host cores: {os.cpu_count()}, ASR backend: {args.asr_backend}")
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
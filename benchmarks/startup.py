@@ -0,0 +1,109 @@
+"""
+Cold-start benchmark: how long `import app.main` takes in a fresh
+interpreter, and how long a new service process takes to answer /healthz,
+to turn ready on /readyz (models loaded and warmed up) and to return the
+first transcript.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --asr-backend whisper-int8 --runs 3
+
+Uses the stand-in ASR backend unless --asr-backend names a real one, so the
+import and framework overhead can be tracked on any host.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from .load_generator import run_session, synthetic_pcm, to_messages
+from .run_e2e import FAKE_ASR_BACKEND, REPO_ROOT, wait_until_ready
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(env: dict) -> tuple:
+    """
+    Imports app.main in a fresh interpreter. Returns (seconds, slowest
+    direct imports of app.main as (module, seconds) pairs).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, module = int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)
+        if module == "app.main" and depth == 1:
+            total = cumulative
+        elif depth == 3:
+            # Indented one level under app.main: its direct imports.
+            children.append((module, cumulative))
+    return total, sorted(children, key=lambda item: -item[1])[:8]
+
+
+def measure_service(env: dict, port: int, timeout: float) -> dict:
+    started = time.perf_counter()
+    service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, service, timeout, path="/healthz", poll=0.01)
+        healthy = time.perf_counter() - started
+        wait_until_ready(base_url, service, timeout, path="/readyz", poll=0.01)
+        ready = time.perf_counter() - started
+        messages = to_messages(synthetic_pcm(3.0), "pcm_s32le_44k", 100)
+        session = asyncio.run(run_session(f"ws://127.0.0.1:{port}/ws/audio", messages, 4.0, 2.0))
+        first = min(session.transcript_latencies) if session.transcript_latencies else None
+    finally:
+        service.terminate()
+        service.wait(timeout=10)
+    return {"healthz_seconds": healthy, "readyz_seconds": ready, "first_transcript_seconds": first}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--asr-backend", default=FAKE_ASR_BACKEND)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, ASR_BACKEND=args.asr_backend, ENRICHMENT_CACHE_PATH="", SEMANTIC_CACHE_PATH="", LOG_LEVEL="WARNING")
+    imports = [measure_import(env) for _ in range(args.runs)]
+    services = [measure_service(env, args.port, args.startup_timeout) for _ in range(args.runs)]
+
+    report = {
+        "asr_backend": args.asr_backend,
+        "runs": args.runs,
+        "import_seconds": statistics.median(seconds for seconds, _ in imports),
+        "slowest_imports": imports[-1][1]
+    }
+    for key in ("healthz_seconds", "readyz_seconds", "first_transcript_seconds"):
+        values = [run[key] for run in services if run[key] is not None]
+        report[key] = statistics.median(values) if values else None
+
+    print(f"import app.main: {report['import_seconds'] * 1000:.0f} ms (median of {args.runs})")
+    for module, seconds in report["slowest_imports"]:
+        print(f"  {module:<40} {seconds * 1000:7.1f} ms")
+    for key in ("healthz_seconds", "readyz_seconds", "first_transcript_seconds"):
+        value = report[key]
+        print(f"{key:>26}: {'n/a' if value is None else f'{value * 1000:.0f} ms'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()